@@ -0,0 +1,272 @@
+import argparse
+import copyreg
+import pickle
+import random
+import textwrap
+import timeit
+
+from isolation import Isolation
+
+import my_custom_player
+from my_custom_player import CustomPlayer, HEURISTICS_FUNCTIONS
+from incremental import IncrementalEvaluator
+from sample_players import MinimaxPlayer, AlphaBetaMinimaxPlayer
+from features import compose
+from bitboard import flood_layers, popcount, voronoi
+import knight_graph
+import codec
+from geometry import get_geometry
+
+
+NUM_POSITIONS = 200  # number of sampled midgame positions used by each benchmark
+SEARCH_DEPTH = 3
+LATE_CELLS = 60  # positions with at most this many open cells count as late
+
+
+def sample_positions(num_positions, seed=0):
+    """ Collect non-terminal positions (after the opening moves) from random games """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        state = Isolation()
+        while not state.terminal_test():
+            if state.ply_count >= 2:
+                positions.append(state)
+            state = state.result(rng.choice(state.actions()))
+    return positions[:num_positions]
+
+
+def _report(label, seconds, calls):
+    print("{:<48} {:>10.2f} us/call".format(label, 1e6 * seconds / calls))
+
+
+def bench_incremental(positions):
+    """ Child-node evaluation and full search cost: from-scratch vs incremental """
+    children = [(s, a) for s in positions for a in s.actions()]
+
+    for name, score in (("heuristics_liberties", IncrementalEvaluator.liberties_score),
+                        ("heuristics_liberties_deep", IncrementalEvaluator.deep_liberties_score)):
+        heuristic = HEURISTICS_FUNCTIONS[name]
+
+        def scratch():
+            for state, action in children:
+                heuristic(state.result(action), 0)
+
+        evaluators = [(IncrementalEvaluator(s), a) for s, a in children]
+
+        def incremental():
+            for evaluator, action in evaluators:
+                evaluator.apply(action)
+                score(evaluator, 0)
+                evaluator.undo()
+
+        _report(name + " result()+eval", min(timeit.repeat(scratch, number=1, repeat=3)), len(children))
+        _report(name + " apply()+eval+undo()", min(timeit.repeat(incremental, number=1, repeat=3)), len(children))
+
+    agent = CustomPlayer(0)
+    saved = my_custom_player.INCREMENTAL_HEURISTICS
+    for label, table in (("search depth {} (from scratch)", {}),
+                         ("search depth {} (incremental)", saved)):
+        my_custom_player.INCREMENTAL_HEURISTICS = table
+        try:
+            def search():
+                for state in positions:
+                    agent.player = state.player()
+                    agent.get_next_move(state, max_depth=SEARCH_DEPTH)
+            _report(label.format(SEARCH_DEPTH), min(timeit.repeat(search, number=1, repeat=3)), len(positions))
+        finally:
+            my_custom_player.INCREMENTAL_HEURISTICS = saved
+
+
+def bench_compose(positions):
+    """ Hand-written heuristics vs the same formula compiled by features.compose """
+    for name, expression in (("heuristics_liberties", "own_liberties - opp_liberties"),
+                             ("heuristics_liberties_and_keep_enemy_close_2",
+                              "own_liberties - opp_liberties - distance / 2"),
+                             ("heuristics_liberties_deep", "own_deep_liberties - opp_deep_liberties")):
+        for label, func in ((name, HEURISTICS_FUNCTIONS[name]), (expression, compose(expression))):
+            def evaluate():
+                for state in positions:
+                    func(state, 0)
+            _report(label, min(timeit.repeat(evaluate, number=1, repeat=3)), len(positions))
+
+
+def bench_flood(positions):
+    """ Per-call cost of the bit-parallel flood fill features """
+    for label, func in (("flood_layers", lambda s, p: flood_layers(s.board, s.locs[p])),
+                        ("voronoi", lambda s, p: voronoi(s.board, s.locs[p], s.locs[1 - p])),
+                        ("own_area - opp_area", compose("own_area - opp_area")),
+                        ("own_voronoi - opp_voronoi", compose("own_voronoi - opp_voronoi")),
+                        ("heuristics_liberties (reference)", HEURISTICS_FUNCTIONS["heuristics_liberties"])):
+        def evaluate():
+            for state in positions:
+                func(state, 0)
+        _report(label, min(timeit.repeat(evaluate, number=1, repeat=3)), len(positions))
+
+
+def bench_knight_graph(positions):
+    """ Per-node cost of the articulation analysis, and its effect on search time """
+    children = [(s, s.locs[s.player()] + a) for s in positions for a in s.actions()]
+
+    def cold():
+        for state, cell in children:
+            knight_graph._cache.clear()
+            knight_graph.analyze(state.board ^ (1 << cell))
+
+    def memoized():
+        for state, cell in children:
+            knight_graph.analyze(state.board ^ (1 << cell))
+
+    analyzers = [(knight_graph.KnightGraphAnalyzer(s.board), c) for s, c in children]
+
+    def incremental():
+        for analyzer, cell in analyzers:
+            analyzer.block(cell)
+            analyzer.regions
+            analyzer.undo()
+
+    _report("analyze() from scratch", min(timeit.repeat(cold, number=1, repeat=3)), len(children))
+    _report("analyze() memoized", min(timeit.repeat(memoized, number=1, repeat=3)), len(children))
+    _report("KnightGraphAnalyzer block()+regions+undo()", min(timeit.repeat(incremental, number=1, repeat=3)), len(children))
+
+    # the graph analysis pays off only if it saves search: compare the plain
+    # search, the exact cutoff of partitioned positions and the chokepoint
+    # features in time and nodes per position, on all positions and on the
+    # late ones, where partitions happen
+    chokepoints = "own_liberties - opp_liberties - own_chokepoints + opp_chokepoints"
+    late = [state for state in positions if popcount(state.board) <= LATE_CELLS]
+    for label, agent, depths in (
+            ("liberties", CustomPlayer(0), (SEARCH_DEPTH, SEARCH_DEPTH + 2)),
+            ("liberties, partition cutoff", CustomPlayer(0, partition_cutoff=True), (SEARCH_DEPTH, SEARCH_DEPTH + 2)),
+            (chokepoints, CustomPlayer(0, heuristic=compose(chokepoints)), (SEARCH_DEPTH,))):
+        for sample, states in (("all", positions), ("late", late)):
+            for depth in depths:
+                def search():
+                    agent.nodes = 0
+                    for state in states:
+                        agent.player = state.player()
+                        agent.get_next_move(state, max_depth=depth)
+                seconds = min(timeit.repeat(search, number=1, repeat=1))
+                _report("search depth {} ({}): {}".format(depth, sample, label), seconds, len(states))
+                print("{:<48} {:>10.0f} nodes/call".format("", agent.nodes / len(states)))
+
+
+def bench_minimax(positions):
+    """ Reference depth-3 MinimaxPlayer vs the alpha-beta drop-in """
+    for agent_class in (MinimaxPlayer, AlphaBetaMinimaxPlayer):
+        def search():
+            for state in positions:
+                agent_class(state.player()).minimax(state, depth=3)
+        _report(agent_class.__name__ + ".minimax(depth=3)", min(timeit.repeat(search, number=1, repeat=3)),
+                len(positions))
+
+
+def bench_codec(positions):
+    """ Serialization time and size: pickle vs the fixed-width binary codec """
+    def pickled():
+        return pickle.loads(pickle.dumps(positions, pickle.HIGHEST_PROTOCOL))
+
+    def encoded():
+        return codec.decode_states(codec.encode_states(positions))
+
+    size = len(pickle.dumps(positions, pickle.HIGHEST_PROTOCOL)) / len(positions)
+    _report("pickle list dumps+loads ({:.0f} B/state)".format(size),
+            min(timeit.repeat(pickled, number=1, repeat=5)), len(positions))
+    _report("codec encode_states+decode_states ({} B/state)".format(codec.STATE_BYTES),
+            min(timeit.repeat(encoded, number=1, repeat=5)), len(positions))
+
+    def one_by_one():
+        for state in positions:
+            pickle.loads(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+    for label in ("pickle single state", "pickle single state (register_pickle)"):
+        if label.endswith("(register_pickle)"):
+            codec.register_pickle()
+        size = sum(len(pickle.dumps(s, pickle.HIGHEST_PROTOCOL)) for s in positions) / len(positions)
+        _report("{} ({:.0f} B/state)".format(label, size),
+                min(timeit.repeat(one_by_one, number=1, repeat=5)), len(positions))
+    copyreg.dispatch_table.pop(codec.Isolation, None)
+
+
+BOARD_SIZES = ((5, 5), (7, 7), (11, 9), (16, 16), (24, 24), (32, 32))
+
+
+def bench_geometry(positions):
+    """ Move generation and search cost against board area """
+    num_games = max(1, len(positions) // 20)
+    for width, height in BOARD_SIZES:
+        geometry = get_geometry(width, height)
+        rng = random.Random(0)
+        moves = 0
+        starts = []
+
+        def playouts():
+            nonlocal moves
+            for _ in range(num_games):
+                state = geometry.initial_state()
+                while not state.terminal_test():
+                    state = state.result(rng.choice(state.actions()))
+                    moves += 1
+                    if state.ply_count == 6: starts.append(state)
+
+        seconds = timeit.timeit(playouts, number=1)
+        _report("{}x{} (area {}) random playout move".format(width, height, width * height), seconds, moves)
+
+        agent = CustomPlayer(0)
+        starts = [s for s in starts if not s.terminal_test()][:10]
+
+        def search():
+            for state in starts:
+                agent.player = state.player()
+                agent.get_next_move(state, max_depth=SEARCH_DEPTH)
+        _report("{}x{} (area {}) search depth {}".format(width, height, width * height, SEARCH_DEPTH),
+                timeit.timeit(search, number=1), max(len(starts), 1))
+
+
+BENCHMARKS = {
+    "incremental": bench_incremental,
+    "compose": bench_compose,
+    "flood": bench_flood,
+    "knight_graph": bench_knight_graph,
+    "minimax": bench_minimax,
+    "codec": bench_codec,
+    "geometry": bench_geometry,
+}
+
+
+def main(args):
+    positions = sample_positions(args.positions, args.seed)
+    for name in args.benchmarks or BENCHMARKS:
+        print("--- {} ---".format(name))
+        BENCHMARKS[name](positions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Micro-benchmarks for the search and evaluation code.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Run every benchmark on the default position sample:
+
+                $python benchmarks.py
+
+            - Compare incremental and from-scratch evaluation on 1000 positions:
+
+                $python benchmarks.py -b incremental -n 1000
+        """)
+    )
+    parser.add_argument(
+        '-b', '--benchmark', action='append', dest='benchmarks', choices=list(BENCHMARKS.keys()),
+        help="Benchmark to run; repeat the flag to run several (default: all)."
+    )
+    parser.add_argument(
+        '-n', '--positions', type=int, default=NUM_POSITIONS,
+        help="Number of sampled positions to benchmark on."
+    )
+    parser.add_argument(
+        '-s', '--seed', type=int, default=0,
+        help="Seed for the random games used to sample positions."
+    )
+    main(parser.parse_args())
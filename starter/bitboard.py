@@ -0,0 +1,100 @@
+"""Precomputed knight-move tables for the Isolation bitboard
+
+The tables are built once at import time for the standard 11x9 board
+(see geometry.Geometry for other sizes), so lookups during search are
+plain tuple indexing instead of re-deriving the neighbourhood of a cell
+from the Action enum.
+"""
+from geometry import get_geometry
+
+
+_STANDARD = get_geometry()
+
+# integer offsets of the eight knight moves, in the same order as Action
+OFFSETS = _STANDARD.offsets
+
+# indices of every playable cell on the blank board (border bits excluded)
+CELLS = _STANDARD.cells
+
+# NEIGHBORS[c] lists the playable cells one knight move away from index c
+NEIGHBORS = _STANDARD.neighbors
+
+# NEIGHBOR_MASKS[c] is the bitboard of NEIGHBORS[c]; AND it with a board to
+# get the open neighbours of c in a single operation
+NEIGHBOR_MASKS = _STANDARD.neighbor_masks
+
+_LEFT_SHIFTS = tuple(a for a in OFFSETS if a > 0)
+_RIGHT_SHIFTS = tuple(-a for a in OFFSETS if a < 0)
+
+popcount = getattr(int, "bit_count", None) or (lambda x: bin(x).count("1"))
+
+
+def knight_step(cells):
+    """ Return the bitboard of every index one knight move away from any
+    cell set in `cells`. The result is NOT masked; AND it with a board to
+    drop the border columns (which also stops moves wrapping around rows).
+    """
+    out = 0
+    for a in _LEFT_SHIFTS:
+        out |= cells << a
+    for a in _RIGHT_SHIFTS:
+        out |= cells >> a
+    return out
+
+
+def flood_layers(board, loc):
+    """ Breadth-first flood fill over the open cells of `board`
+
+    The whole frontier advances one knight move per iteration with eight
+    shifts, so the cost depends on the depth of the search, not on the
+    number of cells reached.
+
+    Returns
+    -------
+    list
+        layers[d] is the bitboard of open cells first reached after d + 1
+        knight moves from `loc`; the union of all layers is the region
+        reachable from `loc`
+    """
+    layers = []
+    frontier = seen = 1 << loc
+    while True:
+        frontier = knight_step(frontier) & board & ~seen
+        if not frontier:
+            return layers
+        layers.append(frontier)
+        seen |= frontier
+
+
+def flood(board, cell):
+    """ Return the bitboard of the open cells connected to `cell` (inclusive) """
+    frontier = seen = 1 << cell
+    while frontier:
+        frontier = knight_step(frontier) & board & ~seen
+        seen |= frontier
+    return seen
+
+
+def voronoi(board, own_loc, opp_loc):
+    """ Split the open cells by which player reaches them in fewer moves
+
+    Both floods advance in lockstep; cells reached by both players on the
+    same iteration are contested and belong to neither side.
+
+    Returns
+    -------
+    (int, int)
+        Bitboards of the cells reached strictly first by the player at
+        `own_loc` and by the player at `opp_loc`
+    """
+    own_front = own_seen = 1 << own_loc
+    opp_front = opp_seen = 1 << opp_loc
+    own_first = opp_first = 0
+    while own_front or opp_front:
+        own_front = knight_step(own_front) & board & ~own_seen
+        opp_front = knight_step(opp_front) & board & ~opp_seen
+        own_first |= own_front & ~opp_seen & ~opp_front
+        opp_first |= opp_front & ~own_seen & ~own_front
+        own_seen |= own_front
+        opp_seen |= opp_front
+    return own_first, opp_first
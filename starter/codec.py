@@ -0,0 +1,151 @@
+"""Compact fixed-width binary encoding of Isolation states and game records
+
+A state is 18 bytes: the 115-bit board (border bits included, so the
+encoding is a plain copy of Isolation.board) in 15 little-endian bytes,
+the ply count in one byte and each player's location in one byte, with
+UNPLACED (0xFF) for a piece that is not on the board yet. An action is a
+signed byte: a cell index on the two opening moves and a knight offset
+(Action) afterwards. Arrays of states or actions are plain concatenations
+of fixed-width items, so they can be sliced, memory-mapped or sent
+through a Pipe with send_bytes() without any framing.
+
+A game record is the initial state, the index of the winner in the
+match's players (UNPLACED if unknown), the number of moves and the moves.
+write_games() and read_games() stream records to and from binary files,
+e.g. the file written by run_match.py --record.
+"""
+import copyreg
+import struct
+
+from array import array
+from collections import namedtuple
+
+from isolation import Isolation
+from isolation.isolation import Action, _SIZE
+
+
+BOARD_BYTES = (_SIZE + 7) // 8
+STATE_BYTES = BOARD_BYTES + 3
+UNPLACED = 0xFF
+
+GameRecord = namedtuple("GameRecord", "initial_state history winner")
+GameRecord.__doc__ = """ One stored game
+
+initial_state: Isolation
+    State before the first move in history
+
+history: list
+    Actions in the order they were played (ints on opening moves,
+    Action values afterwards), as returned by isolation.play()
+
+winner: int or None
+    Index of the winning agent in the match's players, None if unknown
+"""
+
+_RECORD_HEADER = struct.Struct("<BB")  # winner, number of moves
+_ACTIONS = {int(a): a for a in Action}
+
+
+# decoded location of every byte value, and a constructor that skips
+# Isolation.__new__ (its keyword defaults cost more than the decoding)
+_LOCS = tuple(range(UNPLACED)) + (None,)
+_new_state = tuple.__new__
+
+
+def encode_state(state):
+    """ Return the 18-byte encoding of an Isolation state """
+    loc0, loc1 = state.locs
+    return state.board.to_bytes(BOARD_BYTES, "little") + bytes((
+        state.ply_count,
+        UNPLACED if loc0 is None else loc0,
+        UNPLACED if loc1 is None else loc1,
+    ))
+
+
+def decode_state(data, offset=0):
+    """ Return the Isolation state encoded at data[offset:offset + STATE_BYTES] """
+    end = offset + BOARD_BYTES
+    return _new_state(Isolation, (int.from_bytes(data[offset:end], "little"), data[end],
+                                  (_LOCS[data[end + 1]], _LOCS[data[end + 2]])))
+
+
+def encode_states(states):
+    """ Encode a sequence of states into one contiguous bytes object """
+    out = bytearray()
+    for board, ply_count, (loc0, loc1) in states:
+        out += board.to_bytes(BOARD_BYTES, "little")
+        out.append(ply_count)
+        out.append(UNPLACED if loc0 is None else loc0)
+        out.append(UNPLACED if loc1 is None else loc1)
+    return bytes(out)
+
+
+def decode_states(data):
+    """ Decode every state in a buffer written by encode_states() """
+    if len(data) % STATE_BYTES:
+        raise ValueError("buffer length {} is not a multiple of {}".format(len(data), STATE_BYTES))
+    view = memoryview(data)
+    from_bytes, locs = int.from_bytes, _LOCS
+    return [_new_state(Isolation, (from_bytes(view[i:i + BOARD_BYTES], "little"), view[i + BOARD_BYTES],
+                                   (locs[view[i + BOARD_BYTES + 1]], locs[view[i + BOARD_BYTES + 2]])))
+            for i in range(0, len(data), STATE_BYTES)]
+
+
+def encode_actions(actions):
+    """ Encode an action history as one signed byte per action """
+    return array("b", actions).tobytes()
+
+
+def decode_actions(data, ply_count=0):
+    """ Decode an action history that starts at ply_count
+
+    Actions on the two opening moves are cell indices (ints), later ones
+    are Action values, exactly as in the history returned by play().
+    """
+    actions = array("b")
+    actions.frombytes(data)
+    opening = max(0, 2 - ply_count)
+    return list(actions[:opening]) + [_ACTIONS[a] for a in actions[opening:]]
+
+
+def encode_game(record):
+    """ Return the binary encoding of a GameRecord """
+    winner = UNPLACED if record.winner is None else record.winner
+    return (encode_state(record.initial_state) + _RECORD_HEADER.pack(winner, len(record.history)) +
+            encode_actions(record.history))
+
+
+def write_games(f, records):
+    """ Append GameRecords to a file opened in binary mode """
+    for record in records:
+        f.write(encode_game(record))
+
+
+def read_games(f):
+    """ Yield the GameRecords of a file opened in binary mode, one at a time """
+    while True:
+        head = f.read(STATE_BYTES + _RECORD_HEADER.size)
+        if not head:
+            return
+        if len(head) < STATE_BYTES + _RECORD_HEADER.size:
+            raise ValueError("truncated game record")
+        state = decode_state(head)
+        winner, length = _RECORD_HEADER.unpack_from(head, STATE_BYTES)
+        moves = f.read(length)
+        if len(moves) < length:
+            raise ValueError("truncated game record")
+        yield GameRecord(state, decode_actions(moves, state.ply_count), None if winner == UNPLACED else winner)
+
+
+def _reduce_isolation(state):
+    return decode_state, (encode_state(state),)
+
+
+def register_pickle():
+    """ Pickle Isolation states with this codec from now on
+
+    This applies to every pickler using copyreg, including the Pipe that
+    fork_get_action() sends states and contexts through; pickles written
+    this way need this module to load.
+    """
+    copyreg.pickle(Isolation, _reduce_isolation)
@@ -0,0 +1,347 @@
+"""Run matches on worker daemons across several machines
+
+A Coordinator serves match descriptions over TCP to any number of worker
+daemons and collects the results. Workers pull one game per free slot, so
+fast and slow machines stay busy until the last game instead of splitting
+the work up front. A game assigned to a worker whose connection drops (or
+that exceeds job_timeout) goes back to the queue and is retried on another
+worker, up to max_attempts times.
+
+The protocol is one JSON object per line:
+
+    worker -> coordinator   {"type": "ready"}                 one per free slot
+    coordinator -> worker   {"type": "match", "job": id, "match": description}
+    worker -> coordinator   {"type": "result", "job": id, "winner": index, "history": [...]}
+    worker -> coordinator   {"type": "error", "job": id, "error": message}  retried elsewhere
+    coordinator -> worker   {"type": "done"}                  all games finished
+
+A match description is a JSON version of run_match.Match:
+
+    {"players": ["CUSTOM:heuristics_liberties", "MINIMAX"],
+     "initial_state": "<codec.encode_state() hex>", "time_limit": 150,
+     "match_id": 0, "clock": null or [step, node_cost],
+     "node_budget": null, "seed": null}
+
+Players are run_match.TEST_AGENTS keys or "CUSTOM:<heuristic>", where the
+heuristic is a HEURISTICS_FUNCTIONS name or a feature expression. Sweep
+every heuristic against the minimax agent on three machines:
+
+    $python distributed.py serve --port 5500 -r 50 -n 20000 -s 1
+    $python distributed.py work --host coordinator.local --port 5500 --slots 8   # on each machine
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import textwrap
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from codec import GameRecord, decode_state, encode_state, write_games
+from isolation import Agent, Isolation, VirtualClock, play
+from isolation.isolation import Action
+from my_custom_player import CustomPlayer, HEURISTICS_FUNCTIONS, get_heuristic
+from run_match import Match, TEST_AGENTS
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+CUSTOM_PREFIX = "CUSTOM:"
+
+
+def agent_from_spec(spec):
+    """ Return the isolation.Agent named by a player spec (see module docstring) """
+    if spec.startswith(CUSTOM_PREFIX):
+        heuristic = spec[len(CUSTOM_PREFIX):]
+        return Agent(functools.partial(CustomPlayer, heuristic=get_heuristic(heuristic)),
+                     "Custom Agent " + heuristic)
+    if spec not in TEST_AGENTS:
+        raise ValueError("unknown player {!r}".format(spec))
+    return TEST_AGENTS[spec]
+
+
+def describe_match(players, match_id, initial_state=None, time_limit=150, clock=None, node_budget=None,
+                   seed=None):
+    """ Return the description of a match between two player specs; clock is
+    None or the (step, node_cost) of a VirtualClock """
+    return {"players": list(players), "initial_state": encode_state(initial_state or Isolation()).hex(),
+            "time_limit": time_limit, "match_id": match_id, "clock": None if clock is None else list(clock),
+            "node_budget": node_budget, "seed": seed}
+
+
+def match_from_description(description):
+    """ Return the run_match.Match of a match description """
+    clock = description["clock"]
+    return Match(players=tuple(agent_from_spec(spec) for spec in description["players"]),
+                 initial_state=decode_state(bytes.fromhex(description["initial_state"])),
+                 time_limit=description["time_limit"],
+                 match_id=description["match_id"],
+                 debug_flag=False,
+                 clock=None if clock is None else VirtualClock(*clock),
+                 node_budget=description["node_budget"],
+                 seed=description["seed"])
+
+
+def play_description(description):
+    """ Play a described match; returns (winner index, history as ints) """
+    match = match_from_description(description)
+    winner, history, _ = play(match)
+    return next(i for i, agent in enumerate(match.players) if agent is winner), [int(a) for a in history]
+
+
+def game_record(description, winner, history):
+    """ Return the codec.GameRecord of a match result sent by a worker """
+    state = decode_state(bytes.fromhex(description["initial_state"]))
+    actions = [a if ply < 2 else Action(a) for ply, a in enumerate(history, state.ply_count)]
+    return GameRecord(state, actions, winner)
+
+
+async def _send(writer, message):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+class Coordinator:
+    """ Serve match descriptions to workers and collect their results
+
+    Attributes
+    ----------
+    results: list
+        results[job] is the codec.GameRecord of descriptions[job] once it is
+        finished, or None for a job that failed max_attempts times
+
+    attempts: list
+        Number of times each job was sent to a worker
+    """
+    def __init__(self, descriptions, max_attempts=MAX_ATTEMPTS, job_timeout=None):
+        self.descriptions = list(descriptions)
+        self.max_attempts = max_attempts
+        self.job_timeout = job_timeout
+        self.results = [None] * len(self.descriptions)
+        self.attempts = [0] * len(self.descriptions)
+        self.port = None
+        self._todo = deque(range(len(self.descriptions)))
+        self._remaining = len(self.descriptions)
+        self._idle = deque()  # (writer, assigned) of worker slots waiting for a job
+        self._workers = {}  # writer -> task serving that worker
+        self._done = None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """ Start listening; port 0 picks a free port (see self.port) """
+        self._done = asyncio.Event()
+        if not self._remaining: self._done.set()
+        self._server = await asyncio.start_server(self._serve_worker, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def wait(self):
+        """ Wait until every job finished or failed, then stop the server """
+        await self._done.wait()
+        for writer in list(self._workers):
+            try:
+                await _send(writer, {"type": "done"})
+            except ConnectionError:
+                pass
+        if self._workers:  # let the workers hang up first
+            await asyncio.wait(list(self._workers.values()), timeout=5)
+        for writer in list(self._workers):
+            writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+        return self.results
+
+    async def run(self, host="127.0.0.1", port=0):
+        await self.start(host, port)
+        return await self.wait()
+
+    def _finish(self, job, result):
+        self.results[job] = result
+        self._remaining -= 1
+        if not self._remaining:
+            self._done.set()
+
+    async def _dispatch(self):
+        """ Hand queued jobs to idle worker slots """
+        while self._todo and self._idle:
+            writer, assigned = self._idle.popleft()
+            if writer.is_closing():
+                continue
+            job = self._todo.popleft()
+            self.attempts[job] += 1
+            timer = None
+            if self.job_timeout is not None:
+                timer = asyncio.get_running_loop().call_later(self.job_timeout, writer.close)
+            assigned[job] = timer
+            try:
+                await _send(writer, {"type": "match", "job": job, "match": self.descriptions[job]})
+            except ConnectionError:
+                pass  # _serve_worker requeues the job when it sees the connection drop
+
+    def _requeue(self, job):
+        if self.attempts[job] >= self.max_attempts:
+            logger.error("match job {} failed {} times: {}".format(job, self.attempts[job], self.descriptions[job]))
+            self._finish(job, None)
+        else:
+            self._todo.appendleft(job)
+
+    async def _serve_worker(self, reader, writer):
+        assigned = {}  # job -> timeout handle of the jobs this worker is playing
+        self._workers[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                message = json.loads(line)
+                if message["type"] == "result":
+                    job = message["job"]
+                    if job in assigned:
+                        timer = assigned.pop(job)
+                        if timer is not None: timer.cancel()
+                        self._finish(job, game_record(self.descriptions[job], message["winner"],
+                                                      message["history"]))
+                elif message["type"] == "error":
+                    job = message["job"]
+                    if job in assigned:
+                        timer = assigned.pop(job)
+                        if timer is not None: timer.cancel()
+                        logger.warning("job {} failed on a worker: {}".format(job, message["error"]))
+                        self._requeue(job)
+                elif message["type"] == "ready":
+                    self._idle.append((writer, assigned))
+                await self._dispatch()
+        finally:
+            self._workers.pop(writer, None)
+            writer.close()
+            for job, timer in assigned.items():
+                if timer is not None: timer.cancel()
+                logger.warning("worker connection lost while playing job {}".format(job))
+                self._requeue(job)
+            assigned.clear()
+            if not self._done.is_set():
+                await self._dispatch()
+
+
+async def _work(host, port, slots):
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    lock = asyncio.Lock()
+
+    async def play_job(job, description):
+        try:
+            winner, history = await loop.run_in_executor(executor, play_description, description)
+            message = {"type": "result", "job": job, "winner": winner, "history": history}
+        except Exception as err:
+            message = {"type": "error", "job": job, "error": repr(err)}
+        async with lock:
+            await _send(writer, message)
+            await _send(writer, {"type": "ready"})
+
+    games = 0
+    tasks = set()
+    with ThreadPoolExecutor(slots) as executor:
+        for _ in range(slots):
+            await _send(writer, {"type": "ready"})
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message["type"] == "done":
+                break
+            task = asyncio.ensure_future(play_job(message["job"], message["match"]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            games += 1
+        for task in tasks:
+            task.cancel()
+    writer.close()
+    return games
+
+
+def run_worker(host, port, slots=1):
+    """ Play matches for the coordinator at host:port until it is done;
+    returns the number of games received """
+    return asyncio.run(_work(host, port, slots))
+
+
+def sweep(heuristics, opponent, rounds, time_limit=150, clock=None, node_budget=None, seed=None):
+    """ Describe `rounds` rounds (both sides) of every heuristic against opponent """
+    descriptions = []
+    for heuristic in heuristics:
+        for round_id in range(rounds):
+            for players in ((CUSTOM_PREFIX + heuristic, opponent), (opponent, CUSTOM_PREFIX + heuristic)):
+                descriptions.append(describe_match(players, len(descriptions), time_limit=time_limit,
+                                                   clock=clock, node_budget=node_budget, seed=seed))
+    return descriptions
+
+
+def main(args):
+    if args.command == "work":
+        print("Played {} games".format(run_worker(args.host, args.port, args.slots)))
+        return
+    heuristics = args.heuristics or list(HEURISTICS_FUNCTIONS)
+    clock = None if args.virtual_clock is None else (args.virtual_clock / 1000, 0.)
+    descriptions = sweep(heuristics, args.opponent.upper(), args.rounds, args.time_limit, clock,
+                         args.node_budget, args.seed)
+    coordinator = Coordinator(descriptions, job_timeout=args.job_timeout)
+    print("Serving {} games on port {}".format(len(descriptions), args.port))
+    results = asyncio.run(coordinator.run(args.host, args.port))
+    if args.record:
+        with open(args.record, "ab") as f:
+            write_games(f, [record for record in results if record is not None])
+    wins = {heuristic: [0, 0] for heuristic in heuristics}
+    for description, record in zip(descriptions, results):
+        if record is None: continue
+        for index, spec in enumerate(description["players"]):
+            if spec.startswith(CUSTOM_PREFIX):
+                stats = wins[spec[len(CUSTOM_PREFIX):]]
+                stats[0] += int(record.winner == index)
+                stats[1] += 1
+    for heuristic, (won, played) in sorted(wins.items(), key=lambda item: -item[1][0] / max(item[1][1], 1)):
+        print("{:<48} {:>6.1f}% of {} games".format(heuristic[:48], 100. * won / max(played, 1), played))
+    failed = sum(result is None for result in results)
+    if failed:
+        print("{} games failed on every attempt".format(failed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Play heuristic sweeps on worker daemons over TCP.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Serve 50 rounds of every heuristic against the minimax agent and start
+              two workers with 4 slots each:
+
+                $python distributed.py serve --port 5500 -r 50 -n 20000 -s 1
+                $python distributed.py work --host 127.0.0.1 --port 5500 --slots 4
+                $python distributed.py work --host 127.0.0.1 --port 5500 --slots 4
+        """)
+    )
+    parser.add_argument('command', choices=("serve", "work"))
+    parser.add_argument('--host', type=str, default="0.0.0.0",
+                        help="Address to listen on (serve) or of the coordinator (work).")
+    parser.add_argument('--port', type=int, default=5500)
+    parser.add_argument('--slots', type=int, default=1, help="Games a worker plays at once.")
+    parser.add_argument('-e', '--heuristic', action='append', dest='heuristics',
+                        help="Heuristic to sweep; repeat the flag for several (default: all registered).")
+    parser.add_argument('-o', '--opponent', type=str, default='MINIMAX')
+    parser.add_argument('-r', '--rounds', type=int, default=5)
+    parser.add_argument('-t', '--time_limit', type=int, default=150)
+    parser.add_argument('-c', '--virtual_clock', type=float, default=None, metavar='STEP_MS')
+    parser.add_argument('-n', '--node_budget', type=int, default=None)
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('--record', type=str, default=None, metavar='FILE',
+                        help="Append the finished games to FILE (see codec.py).")
+    parser.add_argument('--job_timeout', type=float, default=None,
+                        help="Seconds before a game is taken from its worker and retried elsewhere.")
+    main(parser.parse_args())
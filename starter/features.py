@@ -0,0 +1,211 @@
+"""Named evaluation features and a compiler for weighted feature expressions
+
+A heuristic can be described as an arithmetic expression over the feature
+names in FEATURES, e.g. "own_liberties - opp_liberties - distance / 2".
+compose() checks that the expression is a weighted sum of features and
+compiles it into a single Python function with the same (state, player)
+signature as the functions in my_custom_player.HEURISTICS_FUNCTIONS, and
+also accepts an incremental.IncrementalEvaluator in place of the state.
+Every feature the expression uses is computed exactly once per call,
+including the intermediate values that several features share.
+"""
+import ast
+import math
+import re
+
+from functools import lru_cache
+
+from isolation import DebugState
+from isolation.isolation import _HEIGHT, _SIZE, _WIDTH
+from bitboard import NEIGHBORS, flood_layers, popcount, voronoi
+from knight_graph import analyze, block_area, chokepoints, partitioned
+
+
+# board coordinates of every index and their distance from the board center
+XY = tuple(DebugState.ind2xy(c) for c in range(_SIZE))
+CENTER_DISTANCE = tuple(
+    math.sqrt((x - (_WIDTH - 1) / 2) ** 2 + (y - (_HEIGHT - 1) / 2) ** 2) for x, y in XY
+)
+
+# name: (names it depends on, statement computing it); statements may only
+# use `state`, `player` and the names of their dependencies
+_DEFINITIONS = {
+    "board": ((), "board = state.board"),
+    "own_loc": ((), "own_loc = state.locs[player]"),
+    "opp_loc": ((), "opp_loc = state.locs[1 - player]"),
+    "own_cells": (("board", "own_loc"), "own_cells = [n for n in NEIGHBORS[own_loc] if board & (1 << n)]"),
+    "opp_cells": (("board", "opp_loc"), "opp_cells = [n for n in NEIGHBORS[opp_loc] if board & (1 << n)]"),
+    "own_layers": (("board", "own_loc"), "own_layers = flood_layers(board, own_loc)"),
+    "opp_layers": (("board", "opp_loc"), "opp_layers = flood_layers(board, opp_loc)"),
+    "voronoi_cells": (("board", "own_loc", "opp_loc"), "voronoi_cells = voronoi(board, own_loc, opp_loc)"),
+    "regions": (("board",), "regions = state.graph.regions if getattr(state, 'graph', None) is not None "
+                            "else analyze(board)"),
+}
+
+# public features, usable in compose() expressions
+FEATURES = {
+    "own_liberties": (("own_cells",), "own_liberties = len(own_cells)",
+                      "number of legal moves of the player"),
+    "opp_liberties": (("opp_cells",), "opp_liberties = len(opp_cells)",
+                      "number of legal moves of the opponent"),
+    "own_deep_liberties": (("board", "own_cells", "own_liberties"),
+                           "own_deep_liberties = own_liberties + sum("
+                           "1 for c in own_cells for n in NEIGHBORS[c] if board & (1 << n))",
+                           "moves plus the moves available after each of them (player)"),
+    "opp_deep_liberties": (("board", "opp_cells", "opp_liberties"),
+                           "opp_deep_liberties = opp_liberties + sum("
+                           "1 for c in opp_cells for n in NEIGHBORS[c] if board & (1 << n))",
+                           "moves plus the moves available after each of them (opponent)"),
+    "distance": (("own_loc", "opp_loc"),
+                 "distance = math.sqrt((XY[opp_loc][0] - XY[own_loc][0]) ** 2 + "
+                 "(XY[opp_loc][1] - XY[own_loc][1]) ** 2)",
+                 "euclidean distance between the two players"),
+    "ply_count": ((), "ply_count = state.ply_count",
+                  "number of moves played so far"),
+    "own_centrality": (("own_loc",), "own_centrality = -CENTER_DISTANCE[own_loc]",
+                       "negative distance of the player from the board center"),
+    "opp_centrality": (("opp_loc",), "opp_centrality = -CENTER_DISTANCE[opp_loc]",
+                       "negative distance of the opponent from the board center"),
+    "own_area": (("own_layers",), "own_area = sum(map(popcount, own_layers))",
+                 "open cells reachable by the player"),
+    "opp_area": (("opp_layers",), "opp_area = sum(map(popcount, opp_layers))",
+                 "open cells reachable by the opponent"),
+    "own_area3": (("own_layers",), "own_area3 = sum(map(popcount, own_layers[:3]))",
+                  "open cells within three moves of the player"),
+    "opp_area3": (("opp_layers",), "opp_area3 = sum(map(popcount, opp_layers[:3]))",
+                  "open cells within three moves of the opponent"),
+    "own_voronoi": (("voronoi_cells",), "own_voronoi = popcount(voronoi_cells[0])",
+                    "open cells the player reaches in fewer moves than the opponent"),
+    "opp_voronoi": (("voronoi_cells",), "opp_voronoi = popcount(voronoi_cells[1])",
+                    "open cells the opponent reaches in fewer moves than the player"),
+    "own_chokepoints": (("regions", "board", "own_loc"), "own_chokepoints = chokepoints(regions, own_loc, board)",
+                        "legal moves of the player that are articulation points"),
+    "opp_chokepoints": (("regions", "board", "opp_loc"), "opp_chokepoints = chokepoints(regions, opp_loc, board)",
+                        "legal moves of the opponent that are articulation points"),
+    "own_block_area": (("regions", "board", "own_loc"), "own_block_area = block_area(regions, own_loc, board)",
+                       "size of the largest biconnected region next to the player"),
+    "opp_block_area": (("regions", "board", "opp_loc"), "opp_block_area = block_area(regions, opp_loc, board)",
+                       "size of the largest biconnected region next to the opponent"),
+    "partitioned": (("regions", "board", "own_loc", "opp_loc"),
+                    "partitioned = int(is_partitioned(regions, own_loc, opp_loc, board))",
+                    "1 if the players can no longer reach a common cell, else 0"),
+}
+_DEFINITIONS.update({name: (deps, code) for name, (deps, code, _) in FEATURES.items()})
+
+_NAMESPACE = {"math": math, "NEIGHBORS": NEIGHBORS, "XY": XY, "CENTER_DISTANCE": CENTER_DISTANCE,
+              "flood_layers": flood_layers, "popcount": popcount, "voronoi": voronoi,
+              "analyze": analyze, "chokepoints": chokepoints, "block_area": block_area,
+              "is_partitioned": partitioned}
+
+_OPERATORS = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+
+
+def _is_constant(node):
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.UnaryOp):
+        return _is_constant(node.operand)
+    if isinstance(node, ast.BinOp):
+        return _is_constant(node.left) and _is_constant(node.right)
+    return False
+
+
+def _emit(node, used):
+    """ Validate one node of a weighted-sum expression and return its source """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return repr(node.value)
+    if isinstance(node, ast.Name) and node.id in FEATURES:
+        used.add(node.id)
+        return node.id
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        return "({}{})".format("-" if isinstance(node.op, ast.USub) else "+", _emit(node.operand, used))
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        if isinstance(node.op, ast.Mult) and not (_is_constant(node.left) or _is_constant(node.right)):
+            raise ValueError("features can only be multiplied by constant weights")
+        if isinstance(node.op, ast.Div) and not _is_constant(node.right):
+            raise ValueError("features can only be divided by constant weights")
+        return "({} {} {})".format(_emit(node.left, used), _OPERATORS[type(node.op)], _emit(node.right, used))
+    if isinstance(node, ast.Name):
+        raise ValueError("unknown feature '{}' (choose from {})".format(node.id, ", ".join(FEATURES)))
+    raise ValueError("unsupported syntax in heuristic expression")
+
+
+def _resolve(names):
+    """ Return `names` and all their dependencies, in evaluation order """
+    ordered = []
+
+    def visit(name):
+        if name in ordered: return
+        for dep in _DEFINITIONS[name][0]:
+            visit(dep)
+        ordered.append(name)
+
+    for name in sorted(names):
+        visit(name)
+    return ordered
+
+
+@lru_cache(maxsize=None)
+def compose(expression: str):
+    """ Compile a weighted sum of FEATURES into a heuristic function
+
+    Parameters
+    ----------
+    expression : str
+        e.g. "own_liberties - 2 * opp_liberties + ply_count / 10"
+
+    Returns
+    -------
+    function
+        A function (state, player) -> float, named after the expression;
+        its uses_graph attribute tells whether it needs the articulation
+        analysis (see incremental.IncrementalEvaluator)
+
+    Raises
+    ------
+    ValueError
+        If the expression is not a weighted sum of known feature names
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as err:
+        raise ValueError("invalid heuristic expression: {}".format(err.msg))
+    used = set()
+    body = _emit(tree.body, used)
+    func = _compile(used, body)
+    func.__name__ = "composed_" + re.sub(r"[^0-9A-Za-z]+", "_", expression).strip("_")
+    func.__doc__ = expression
+    return func
+
+
+@lru_cache(maxsize=None)
+def compose_vector(names: tuple):
+    """ Compile a function (state, player) -> tuple of the FEATURES in
+    `names`, in that order, sharing intermediate values like compose()
+
+    Raises
+    ------
+    ValueError
+        If a name is not in FEATURES
+    """
+    for name in names:
+        if name not in FEATURES:
+            raise ValueError("unknown feature '{}' (choose from {})".format(name, ", ".join(FEATURES)))
+    func = _compile(set(names), "({},)".format(", ".join(names)))
+    func.__name__ = "features_" + "_".join(names)
+    return func
+
+
+def _compile(used, body):
+    """ Compile a (state, player) function computing the features in `used` and returning `body` """
+    names = _resolve(used)
+    lines = ["def composed(state, player):"]
+    lines += ["    " + _DEFINITIONS[name][1] for name in names]
+    lines += ["    return " + body]
+    namespace = dict(_NAMESPACE)
+    exec("\n".join(lines), namespace)
+
+    func = namespace["composed"]
+    func.source = "\n".join(lines)
+    func.uses_graph = "regions" in names
+    return func
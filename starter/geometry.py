@@ -0,0 +1,157 @@
+"""Knight's Isolation on boards of any size
+
+isolation.isolation fixes the board at 11x9 through module constants
+(_WIDTH, _HEIGHT, _SIZE, _BLANK_BOARD, Action). A Geometry holds the same
+constants for any width and height, the knight-move tables that
+bitboard.py builds for the standard board, and a state class with the
+Isolation interface (actions, result, terminal_test, utility, liberties)
+that uses them. The standard geometry's state class is Isolation itself,
+so the fixed-size code paths are untouched.
+
+Boards keep the layout of isolation.isolation: every row is width + 2 bits
+wide, and the two blocked border bits stop knight moves from wrapping
+around rows. Actions on other geometries are plain int offsets (Action is
+specific to the 11-column layout). The liberty-based heuristics, CustomPlayer
+and IncrementalEvaluator work on every geometry; features.py and codec.py
+assume the standard board.
+
+    >>> state = get_geometry(32, 32).initial_state()
+    >>> state = state.result(state.actions()[0])
+"""
+from functools import lru_cache
+
+from isolation import Isolation
+from isolation.isolation import _HEIGHT, _WIDTH
+
+
+class Geometry:
+    """ Board constants and knight-move tables for one board size
+
+    Attributes
+    ----------
+    width, height: int
+        Number of playable columns and rows
+
+    size: int
+        Number of bits of a board, including the border columns
+
+    blank_board: int
+        Bitboard with every playable cell open
+
+    offsets: tuple
+        Index offsets of the eight knight moves, in the order of Action
+
+    cells: tuple
+        Indices of all playable cells
+
+    neighbors: tuple
+        neighbors[c] lists the playable cells one knight move away from c
+
+    neighbor_masks: tuple
+        neighbor_masks[c] is the bitboard of neighbors[c]
+
+    state_class: type
+        Isolation (standard geometry) or an Isolation subclass for this size
+    """
+    def __init__(self, width, height):
+        if width < 1 or height < 1:
+            raise ValueError("invalid board size {}x{}".format(width, height))
+        self.width = width
+        self.height = height
+        row = width + 2
+        self.size = row * height - 2
+        self.blank_board = 0
+        for _ in range(height):
+            self.blank_board = (self.blank_board << row) | ((1 << width) - 1)
+        S, N, W, E = -row, row, 1, -1
+        self.offsets = (N + N + E, E + N + E, E + S + E, S + S + E, S + S + W, W + S + W, W + N + W, N + N + W)
+        self.cells = tuple(c for c in range(self.size) if self.blank_board & (1 << c))
+        self.neighbors = tuple(
+            tuple(c + a for a in self.offsets if 0 <= c + a < self.size and self.blank_board & (1 << (c + a)))
+            for c in range(self.size)
+        )
+        self.neighbor_masks = tuple(sum(1 << n for n in neighbors) for neighbors in self.neighbors)
+        self._left_shifts = tuple(a for a in self.offsets if a > 0)
+        self._right_shifts = tuple(-a for a in self.offsets if a < 0)
+        if (width, height) == (_WIDTH, _HEIGHT):
+            self.state_class = Isolation
+        else:
+            self.state_class = _make_state_class(self)
+
+    def __repr__(self):
+        return "Geometry({}, {})".format(self.width, self.height)
+
+    def initial_state(self):
+        """ Return the empty board of this geometry """
+        return self.state_class(self.blank_board, 0, (None, None))
+
+    def ind2xy(self, ind):
+        """ Same coordinate frame as DebugState.ind2xy() """
+        return (ind % (self.width + 2), ind // (self.width + 2))
+
+    def knight_step(self, cells):
+        """ Unmasked bitboard of every index one knight move from `cells`
+        (see bitboard.knight_step) """
+        out = 0
+        for a in self._left_shifts:
+            out |= cells << a
+        for a in self._right_shifts:
+            out |= cells >> a
+        return out
+
+
+@lru_cache(maxsize=None)
+def get_geometry(width=_WIDTH, height=_HEIGHT):
+    """ Return the (shared) Geometry of a width x height board """
+    return Geometry(width, height)
+
+
+def geometry_of(state):
+    """ Return the Geometry of a state; plain Isolation states are standard """
+    return getattr(state, "geometry", None) or get_geometry()
+
+
+def _restore(width, height, board, ply_count, locs):
+    return get_geometry(width, height).state_class(board, ply_count, locs)
+
+
+def _make_state_class(geometry):
+    offsets = geometry.offsets
+    actionset = frozenset(offsets)
+    size = geometry.size
+    blank_board = geometry.blank_board
+
+    class BoardState(Isolation):
+        __slots__ = ()
+
+        def __new__(cls, board=blank_board, ply_count=0, locs=(None, None)):
+            return tuple.__new__(cls, (board, ply_count, locs))
+
+        def __reduce__(self):
+            return _restore, (geometry.width, geometry.height) + tuple(self)
+
+        def actions(self):
+            loc = self.locs[self.ply_count % 2]
+            if loc is None:
+                return self.liberties(loc)
+            board = self.board
+            return [a for a in offsets if (a + loc) >= 0 and (board & (1 << (a + loc)))]
+
+        def result(self, action):
+            player_location = self.locs[self.ply_count % 2]
+            assert player_location is None or action in actionset, \
+                "{} is not a valid action from the set {}".format(action, list(offsets))
+            player_location = int(action) + (player_location or 0)
+            if not (self.board & (1 << player_location)):
+                raise RuntimeError("Invalid move: target cell blocked")
+            board = self.board ^ (1 << player_location)
+            locs = (self.locs[0], player_location) if self.ply_count % 2 else (player_location, self.locs[1])
+            return type(self)(board, self.ply_count + 1, locs)
+
+        def liberties(self, loc):
+            cells = range(size) if loc is None else (loc + a for a in offsets)
+            return [c for c in cells if c >= 0 and self.board & (1 << c)]
+
+    BoardState.geometry = geometry
+    BoardState.__name__ = BoardState.__qualname__ = "Isolation{}x{}".format(geometry.width, geometry.height)
+    return BoardState
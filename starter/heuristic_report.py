@@ -0,0 +1,153 @@
+"""Cost-aware comparison of the registered heuristics
+
+run_all.sh compares heuristics by win percentage only, but under a time
+limit a heuristic's cost decides how deep the search gets:
+heuristics_liberties_deep makes about nine times the liberties() calls of
+heuristics_liberties. report() plays games for every heuristic against a
+sample agent with iterative deepening under the time limit (see
+study.py), all heuristics' games on one pool, and measures
+
+  - cost_us: the CPU time of the search per node, in microseconds, over
+    all moves of the games; this is the cost the time limit charges,
+    evaluation and move generation together
+  - eval_us: the mean cost of one evaluation alone, in microseconds, of
+    the function the search calls (the IncrementalEvaluator score for
+    heuristics that have one, see my_custom_player._root_search), timed
+    offline on sample positions
+  - win_rate, mean_depth, nodes_per_second and timeout_rate of the games
+  - wins_per_cpu_second: wins over the CPU time spent searching
+
+and marks the Pareto frontier: the heuristics that no other heuristic
+beats on both cost_us and win rate.
+
+    $python heuristic_report.py -r 20 -t 150 -p 8 --output results/heuristics.csv
+"""
+import argparse
+import csv
+import textwrap
+import timeit
+
+from multiprocessing.pool import ThreadPool
+
+from benchmarks import sample_positions
+from incremental import IncrementalEvaluator
+from my_custom_player import HEURISTICS_FUNCTIONS, INCREMENTAL_HEURISTICS, get_heuristic
+from run_match import TEST_AGENTS
+from study import play_game, summarize
+
+
+MAX_DEPTH = 12  # deepest iteration; the time limit stops the search long before
+NUM_POSITIONS = 200
+FIELDS = ("heuristic", "cost_us", "eval_us", "games", "wins", "win_rate", "mean_depth", "nodes_per_second", "timeout_rate",
+          "wins_per_cpu_second", "pareto")
+
+
+def evaluation_cost(spec, positions, repeat=3):
+    """ Return the mean seconds per evaluation of heuristic spec (a name or
+    feature expression) over both players of positions """
+    heuristic = get_heuristic(spec)
+    score = INCREMENTAL_HEURISTICS.get(heuristic)
+    if score is None and hasattr(heuristic, "uses_graph"):
+        score = heuristic  # composed heuristics evaluate IncrementalEvaluators directly
+    if score is None:
+        evaluated = positions
+        score = heuristic
+    else:
+        evaluated = [IncrementalEvaluator(state, graph=getattr(heuristic, "uses_graph", False))
+                     for state in positions]
+
+    def evaluate():
+        for state in evaluated:
+            score(state, 0)
+            score(state, 1)
+    return min(timeit.repeat(evaluate, number=1, repeat=repeat)) / (2 * len(evaluated))
+
+
+def pareto_frontier(rows, cost="cost_us", value="win_rate"):
+    """ Return the rows not dominated by another row with lower or equal
+    cost and higher or equal value (strictly better in one of them) """
+    def dominates(a, b):
+        return a[cost] <= b[cost] and a[value] >= b[value] and (a[cost] < b[cost] or a[value] > b[value])
+    return [row for row in rows if not any(dominates(other, row) for other in rows)]
+
+
+def report(heuristics, games_per_heuristic, time_limit=150, opponent="MINIMAX", processes=1, seed=None,
+           positions=None, callback=None):
+    """ Return one row per heuristic (see FIELDS), cheapest first """
+    positions = positions or sample_positions(NUM_POSITIONS)
+    setting = (MAX_DEPTH, time_limit, True)
+    jobs = [(setting, opponent, index, seed, spec) for index in range(games_per_heuristic) for spec in heuristics]
+    games = {spec: [] for spec in heuristics}
+    with ThreadPool(processes) as pool:
+        for job, game in zip(jobs, pool.imap(play_game, jobs)):
+            games[job[4]].append(game)
+            if callback is not None:
+                callback(job[4], game[1])
+    rows = []
+    for spec in heuristics:
+        row = summarize(setting, opponent, games[spec])
+        moves = [move for _, _, reports in games[spec] for move in reports]
+        cpu_seconds = sum(move["cpu_seconds"] for move in moves)
+        nodes = sum(move["nodes"] for move in moves)
+        rows.append({"heuristic": spec, "cost_us": 1e6 * cpu_seconds / nodes if nodes else None,
+                     "eval_us": 1e6 * evaluation_cost(spec, positions), "games": row["games"], "wins": row["wins"], "win_rate": row["win_rate"],
+                     "mean_depth": row["mean_depth"], "nodes_per_second": row["nodes_per_second"],
+                     "timeout_rate": row["timeout_rate"],
+                     "wins_per_cpu_second": row["wins"] / cpu_seconds if cpu_seconds else None})
+    frontier = pareto_frontier([row for row in rows if row["cost_us"] is not None])
+    for row in rows:
+        row["pareto"] = int(row in frontier)
+    return sorted(rows, key=lambda row: (row["cost_us"] is None, row["cost_us"] or 0))
+
+
+def format_report(rows):
+    lines = ["{:<46} {:>8} {:>8} {:>6} {:>6} {:>9} {:>7} {:>6}".format(
+        "heuristic", "cost us", "eval us", "win %", "depth", "nodes/s", "wins/s", "pareto")]
+    for row in rows:
+        lines.append("{:<46} {:>8.2f} {:>8.2f} {:>6.1f} {:>6.2f} {:>9.0f} {:>7.2f} {:>6}".format(
+            row["heuristic"][:46], row["cost_us"] or 0, row["eval_us"], 100 * row["win_rate"], row["mean_depth"] or 0,
+            row["nodes_per_second"] or 0, row["wins_per_cpu_second"] or 0, "*" if row["pareto"] else ""))
+    return "\n".join(lines)
+
+
+def main(args):
+    heuristics = args.heuristics or list(HEURISTICS_FUNCTIONS)
+    print("Playing {} games:".format(len(heuristics) * args.rounds))
+    rows = report(heuristics, args.rounds, args.time_limit, args.opponent.upper(), args.processes, args.seed,
+                  callback=lambda spec, won: print("+" if won else "-", end="", flush=True))
+    print()
+    print(format_report(rows))
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Wrote {}".format(args.output))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Compare heuristics by win rate against evaluation cost.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Compare every registered heuristic in 20 games each against the minimax agent
+              at 150 ms per move, 8 games at a time:
+
+                $python heuristic_report.py -r 20 -t 150 -p 8
+
+            - Compare two heuristics with a feature expression:
+
+                $python heuristic_report.py -e heuristics_liberties -e heuristics_liberties_deep \\
+                    -e "own_liberties - 2 * opp_liberties" -r 50 -p 8
+        """)
+    )
+    parser.add_argument('-e', '--heuristic', action='append', dest='heuristics',
+                        help="Heuristic name or feature expression; repeat the flag (default: all registered).")
+    parser.add_argument('-r', '--rounds', type=int, default=10, help="Games per heuristic.")
+    parser.add_argument('-t', '--time_limit', type=int, default=150)
+    parser.add_argument('-o', '--opponent', type=str, default='MINIMAX', choices=list(TEST_AGENTS.keys()))
+    parser.add_argument('-p', '--processes', type=int, default=1, help="Games played at once.")
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('--output', type=str, default="./results/heuristics.csv", metavar='FILE')
+    main(parser.parse_args())
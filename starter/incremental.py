@@ -0,0 +1,135 @@
+from isolation import Isolation
+from geometry import geometry_of
+from knight_graph import KnightGraphAnalyzer
+
+
+class IncrementalEvaluator:
+    """ Mutable mirror of an Isolation state that keeps liberty counts up
+    to date while moves are applied and undone in place
+
+    Blocking a cell only changes the open-neighbour count of the (at most
+    eight) cells a knight's move away from it, so apply() and undo() each
+    touch O(8) counters instead of rebuilding the board. The liberty
+    heuristics then read their mobility terms straight from the counters.
+    States of any geometry.Geometry are supported (graph=True requires the
+    standard board).
+
+    Attributes
+    ----------
+    board: int
+        Bitboard of open cells, identical to Isolation.board
+
+    ply_count: int
+        Cumulative count of the number of actions applied to the board
+
+    locs: list
+        Current location of each player (None until the piece is placed)
+
+    open_neighbors: list
+        open_neighbors[c] is the number of open cells one knight move
+        away from index c, i.e., len(state.liberties(c))
+
+    graph: KnightGraphAnalyzer or None
+        With graph=True, the articulation analysis of the open cells is
+        kept in sync by apply()/undo() as well; the graph features in
+        features.py read their regions from it
+    """
+    def __init__(self, state: Isolation, graph=False):
+        self.geometry = geometry_of(state)
+        self._neighbors = self.geometry.neighbors
+        self.board = state.board
+        self.graph = KnightGraphAnalyzer(state.board) if graph else None
+        self.ply_count = state.ply_count
+        self.locs = list(state.locs)
+        self.open_neighbors = [
+            sum(1 for n in neighbors if state.board & (1 << n)) for neighbors in self._neighbors
+        ]
+        self._history = []
+
+    def to_state(self) -> Isolation:
+        """ Return an immutable Isolation copy of the current position """
+        return self.geometry.state_class(self.board, self.ply_count, tuple(self.locs))
+
+    def player(self):
+        return self.ply_count % 2
+
+    def actions(self):
+        """ Same as Isolation.actions(), but returns plain int offsets """
+        loc = self.locs[self.ply_count % 2]
+        board = self.board
+        if loc is None:
+            return [c for c in range(self.geometry.size) if board & (1 << c)]
+        return [a for a in self.geometry.offsets if (a + loc) >= 0 and (board & (1 << (a + loc)))]
+
+    def apply(self, action):
+        """ Move the active player in place; reverse with undo() """
+        player = self.ply_count % 2
+        loc = self.locs[player]
+        target = int(action) if loc is None else loc + action
+        self.board ^= 1 << target
+        open_neighbors = self.open_neighbors
+        for n in self._neighbors[target]:
+            open_neighbors[n] -= 1
+        if self.graph is not None:
+            self.graph.block(target)
+        self._history.append(loc)
+        self.locs[player] = target
+        self.ply_count += 1
+
+    def undo(self):
+        """ Revert the most recent apply() """
+        self.ply_count -= 1
+        player = self.ply_count % 2
+        target = self.locs[player]
+        self.board |= 1 << target
+        open_neighbors = self.open_neighbors
+        for n in self._neighbors[target]:
+            open_neighbors[n] += 1
+        if self.graph is not None:
+            self.graph.undo()
+        self.locs[player] = self._history.pop()
+
+    def mobility(self, player_id):
+        """ Number of liberties of the given player (len(state.liberties(loc))) """
+        loc = self.locs[player_id]
+        if loc is None:
+            return bin(self.board).count("1")
+        return self.open_neighbors[loc]
+
+    def terminal_test(self):
+        return not (self._has_liberties(0) and self._has_liberties(1))
+
+    def utility(self, player_id):
+        if not self.terminal_test(): return 0
+        player_id_is_active = (player_id == self.player())
+        active_has_liberties = self._has_liberties(self.player())
+        active_player_wins = (active_has_liberties == player_id_is_active)
+        return float("inf") if active_player_wins else float("-inf")
+
+    def _has_liberties(self, player_id):
+        # Isolation._has_liberties() tests any(liberties), which treats a
+        # lone liberty at index 0 as no liberty at all; keep that behavior
+        loc = self.locs[player_id]
+        if loc is None:
+            return bool(self.board >> 1)
+        count = self.open_neighbors[loc]
+        if count == 1 and (self.board & 1) and 0 in self._neighbors[loc]:
+            return False
+        return count > 0
+
+    def liberties_score(self, player):
+        """ Incremental equivalent of my_custom_player.heuristics_liberties """
+        return self.mobility(player) - self.mobility(1 - player)
+
+    def deep_liberties_score(self, player):
+        """ Incremental equivalent of my_custom_player.heuristics_liberties_deep """
+        return self._deep_mobility(self.locs[player]) - self._deep_mobility(self.locs[1 - player])
+
+    def _deep_mobility(self, loc):
+        board = self.board
+        open_neighbors = self.open_neighbors
+        count = 0
+        for n in (self.geometry.cells if loc is None else self._neighbors[loc]):
+            if board & (1 << n):
+                count += 1 + open_neighbors[n]
+        return count
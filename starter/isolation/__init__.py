@@ -4,23 +4,35 @@
 ###############################################################################
 import inspect
 import logging
+import random
 import sys
 import textwrap
+import threading
 import time
+import tracemalloc
 
 from collections import namedtuple
 from enum import Enum
-from multiprocessing import Process, Pipe
+from multiprocessing import Process, Pipe, RawValue
+from multiprocessing.reduction import ForkingPickler
 from queue import Empty
 
 from .isolation import Isolation, DebugState
 
-__all__ = ['Isolation', 'DebugState', 'Status', 'play', 'fork_get_action']
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+__all__ = ['Isolation', 'DebugState', 'Status', 'VirtualClock', 'HarnessTrace', 'MemoryBudget', 'play',
+           'fork_get_action']
 logger = logging.getLogger(__name__)
 
 Agent = namedtuple("Agent", "agent_class name")
 
 PROCESS_TIMEOUT = 5  # time to interrupt agent search processes (in seconds)
+NODE_POLL = 0.005  # seconds between two reads of the node count of a search under a node budget
+NODE_GRACE = 0.05  # seconds a search past its node budget has to stop before it is terminated
 GAME_INFO = """\
 Initial game state: {}
 First agent: {!s}
@@ -41,6 +53,18 @@ History: {}
 Winner: {}
 Loser: {}
 """
+MOVE_INFO = """\
+Move Timing: ply {} by {}
+Setup: {}
+Pickle: {} ({} bytes)
+Start: {}
+Search: {}
+Put: {} ({} calls, {} bytes)
+Join: {}
+Get: {}
+Overhead: {}
+Memory: context {} bytes, traced peak {} bytes, process peak RSS {} bytes
+"""
 
 class Status(Enum):
     NORMAL = 0
@@ -53,31 +77,234 @@ class Status(Enum):
 class StopSearch(Exception): pass  # Exception class used to halt search
 
 
+class ContextTooLarge(StopSearch): pass  # halts a search whose context exceeds a hard MemoryBudget
+
+
+class VirtualClock:
+    """Simulated clock (in seconds) for running agents in-process with
+    deterministic timeouts. Time moves only when advance() is called or,
+    if step is set, by step seconds every time the clock is read; the
+    TimedQueue reads the clock once per .put(), so a step charges a fixed
+    cost to each action an agent reports.
+
+    With node_cost set, every node an agent counts with
+    BasePlayer.count_node() also advances the clock by node_cost seconds
+    and the time limit is checked right away, so the limit interrupts a
+    search between two puts just like a real timeout does.
+    """
+    def __init__(self, step=0., node_cost=0.):
+        self.now = 0.
+        self.step = step
+        self.node_cost = node_cost
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class MemoryBudget:
+    """Memory limits of an agent's search, handed to fork_get_action().
+
+    With context_bytes set, TimedQueue.put() pickles the agent's context on
+    every put, since that is what crosses the Pipe back to the harness. A
+    bigger context is logged as a warning once per move or, with hard_stop,
+    refused: the search stops as on a timeout, and the last action and
+    context put within the budget are used.
+
+    table_entries is handed to the agent as self.table_limit, the number of
+    entries any table it keeps across moves may hold (see
+    sample_players.BoundedTable), so memory stays bounded over long games
+    and many parallel processes. It is a hook for agents that keep such
+    tables: none of the sample agents or CustomPlayer does (CustomPlayer's
+    search_cache.SearchCache has a fixed size of its own), so for them it
+    changes nothing.
+    """
+    def __init__(self, context_bytes=None, hard_stop=False, table_entries=None):
+        self.context_bytes = context_bytes
+        self.hard_stop = hard_stop
+        self.table_entries = table_entries
+
+
+def _peak_rss():
+    """ Peak resident set size of this process in bytes, or None; a forked
+    process starts from the peak of its parent """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else 1024 * peak  # Linux reports kilobytes
+
+
+class HarnessTrace:
+    """Per-move timings of the harness path around an agent's search.
+
+    fork_get_action() records, for every move, the time spent creating the
+    queue (setup), starting the search process (start), in the agent's own
+    search (search), in TimedQueue.put() pipe transfers (put), waiting for
+    the process beyond the search itself (join) and reading the action
+    back (get). It also measures how long pickling the agent and the game
+    state takes (pickle), which is what a spawn-based platform pays on
+    every move. Each record is logged in the same format as the game
+    results, and summary() reports percentiles over all recorded moves.
+    Times are in seconds; search, put and join are None when the search
+    process was terminated before reporting.
+
+    With memory=True, every record also holds the largest pickled context
+    the agent put (context_bytes), the peak of the memory allocated by
+    Python during the search (traced_peak, measured with tracemalloc, which
+    slows the search down) and the peak RSS of the process doing the search
+    (process_peak). process_peak is the high-water mark of the whole
+    process, not the agent's own use: a forked search process inherits the
+    harness's peak, so it never drops from one move to the next. traced_peak
+    measures the agent. These are in bytes, and None when not measured.
+    """
+    PHASES = ("setup", "pickle", "start", "search", "put", "join", "get", "overhead")
+    MEMORY = ("context_bytes", "traced_peak", "process_peak")
+
+    def __init__(self, memory=False):
+        self.records = []
+        self.memory = memory
+        self._lock = threading.Lock()
+
+    def record(self, game_state, agent, times, stats):
+        search = put = join = None
+        if stats is not None:
+            search, put = stats["search"], stats["put"]
+            join = times["wait"] - search - put
+        total = times["setup"] + times["start"] + times["wait"] + times["get"]
+        record = dict(times, ply_count=game_state.ply_count, agent=type(agent).__name__,
+                      search=search, put=put, join=join,
+                      puts=stats and stats["puts"], put_bytes=stats and stats["bytes"],
+                      total=total, overhead=total - (search or 0),
+                      **{key: stats and stats.get(key) for key in self.MEMORY})
+        with self._lock:
+            self.records.append(record)
+        ms = lambda x: "n/a" if x is None else "{:.3f} ms".format(1000 * x)
+        logger.info(MOVE_INFO.format(
+            record["ply_count"], record["agent"], ms(record["setup"]), ms(record["pickle"]),
+            record["pickle_bytes"], ms(record["start"]), ms(search), ms(put), record["puts"],
+            record["put_bytes"], ms(join), ms(record["get"]), ms(record["overhead"]),
+            *(record[key] if record[key] is not None else "n/a" for key in self.MEMORY)))
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """ Return {phase: {percentile: seconds}} over all recorded moves """
+        with self._lock:
+            records = list(self.records)
+        summary = {}
+        for phase in self.PHASES + ("total",) + self.MEMORY:
+            values = sorted(r[phase] for r in records if r[phase] is not None)
+            if not values: continue
+            summary[phase] = {p: values[min(len(values) - 1, int(len(values) * p / 100))]
+                              for p in percentiles + (100,)}
+        return summary
+
+    def format_summary(self, percentiles=(50, 90, 99)):
+        summary = self.summary(percentiles)
+        columns = "".join("{:>10}".format("p{}".format(p)) for p in percentiles + (100,))
+        lines = ["{:<14}".format("phase (ms)") + columns]
+        for phase in self.PHASES + ("total",):
+            if phase in summary:
+                lines.append("{:<14}".format(phase) +
+                             "".join("{:>10.3f}".format(1000 * v) for v in summary[phase].values()))
+        if any(key in summary for key in self.MEMORY):
+            lines.append("{:<14}".format("memory (KB)") + columns)
+            for key in self.MEMORY:
+                if key in summary:
+                    lines.append("{:<14}".format(key) +
+                                 "".join("{:>10.1f}".format(v / 1024) for v in summary[key].values()))
+        return "\n".join(lines)
+
+
 class TimedQueue:
     """Modified queue class to block .put() after a time limit expires,
     and to include both a context object & action choice in the queue.
+    The deadline is measured with clock (time.perf_counter by default).
+    .put() is also blocked once the agent has counted more than
+    node_budget searched nodes (see _request_action), and checks the size
+    of the context against a MemoryBudget if one is given.
     """
-    def __init__(self, receiver, sender, time_limit):
+    def __init__(self, receiver, sender, time_limit, clock=None, node_budget=None, seed=None, trace=False,
+                 memory_budget=None, trace_memory=False):
         self.__sender = sender
         self.__receiver = receiver
         self.__time_limit = time_limit / 1000
         self.__stop_time = None
+        self.__clock = clock or time.perf_counter
+        self.node_budget = float("inf") if node_budget is None else node_budget
+        self.seed = seed
         self.agent = None
+        # called by the agent for every searched node (see VirtualClock)
+        self.node_clock = self.tick if getattr(clock, "node_cost", 0) else None
+        # with trace set, put() accumulates its cost here (see HarnessTrace)
+        self.stats = {"search": 0., "put": 0., "puts": 0, "bytes": 0} if trace else None
+        self.stats_sender = None
+        self.memory_budget = memory_budget
+        self.trace_memory = trace and trace_memory
+        self._warned = False
+        self.node_counter = None  # shared with the harness by fork_get_action() under a node budget
+
+    def publish_nodes(self):
+        """ Share the agent's node count with the harness, which terminates
+        a search that keeps counting past its node budget """
+        self.node_counter.value = self.agent.nodes
 
     def start_timer(self):
-        self.__stop_time = self.__time_limit + time.perf_counter()
+        self.__stop_time = self.__time_limit + self.__clock()
+
+    def tick(self):
+        """ Charge one searched node to the VirtualClock and stop the search
+        once the time limit has passed """
+        self.__clock.advance(self.__clock.node_cost)
+        if self.__stop_time is not None and self.__clock.now > self.__stop_time:
+            raise StopSearch
 
     def put(self, item, block=True, timeout=None):
-        if self.__stop_time and time.perf_counter() > self.__stop_time:
+        if self.__stop_time is not None and self.__clock() > self.__stop_time:
+            raise StopSearch
+        if getattr(self.agent, "nodes", 0) > self.node_budget:
             raise StopSearch
+        if self.memory_budget is not None or self.trace_memory:
+            self._check_context()
+        if self.stats is None:
+            if self.__receiver.poll():
+                self.__receiver.recv()
+            self.__sender.send((getattr(self.agent, "context", None), item))
+            return
+        start = time.perf_counter()
         if self.__receiver.poll():
             self.__receiver.recv()
-        self.__sender.send((getattr(self.agent, "context", None), item))
+        data = ForkingPickler.dumps((getattr(self.agent, "context", None), item))
+        self.__sender.send_bytes(data)
+        self.stats["put"] += time.perf_counter() - start
+        self.stats["puts"] += 1
+        self.stats["bytes"] += len(data)
+
+    def _check_context(self):
+        """ Measure the pickled context of the agent and enforce the MemoryBudget """
+        size = len(ForkingPickler.dumps(getattr(self.agent, "context", None)))
+        if self.trace_memory:
+            self.stats["context_bytes"] = max(self.stats.get("context_bytes") or 0, size)
+        limit = self.memory_budget and self.memory_budget.context_bytes
+        if limit is None or size <= limit:
+            return
+        if self.memory_budget.hard_stop:
+            logger.error("The context of {} is {} bytes, over its budget of {} bytes; the search "
+                         "was stopped".format(self.agent, size, limit))
+            raise ContextTooLarge
+        if not self._warned:
+            logger.warning("The context of {} is {} bytes, over its budget of {} bytes".format(
+                self.agent, size, limit))
+            self._warned = True
 
     def put_nowait(self, item):
         self.put(item, block=False)
 
     def get(self, block=True, timeout=None):
+        if not (block or self.__receiver.poll()):
+            raise Empty()  # the search process ended without putting an action
         return self.__receiver.recv()
 
     def get_nowait(self):
@@ -91,7 +318,8 @@ class TimedQueue:
 def play(args): return _play(*args)  # multithreading ThreadPool.map doesn't expand args
 
 
-def _play(agents, game_state, time_limit, match_id, debug=False):
+def _play(agents, game_state, time_limit, match_id, debug=False, clock=None, node_budget=None, seed=None,
+          trace=None, profiler=None, memory_budget=None):
     """ Run a match between two agents by alternately soliciting them to
     select a move and applying it to advance the game state.
 
@@ -109,6 +337,30 @@ def _play(agents, game_state, time_limit, match_id, debug=False):
         The maximum number of milliseconds to allow before timeout during
         each turn (see notes)
 
+    clock : VirtualClock, optional
+        If given, agents run in-process and time limits are measured on
+        this clock instead of wall time (see fork_get_action)
+
+    node_budget : int, optional
+        If given, each turn is limited to this many searched nodes instead
+        of time_limit milliseconds (see fork_get_action)
+
+    seed : optional
+        If given, the random number generators of the active agent are
+        reseeded from (seed, match_id, ply_count) before every turn, so
+        games with a node budget are exactly reproducible
+
+    trace : HarnessTrace, optional
+        If given, the harness overhead of every move is recorded into it
+
+    profiler : object, optional
+        If given, the search of every move runs as
+        profiler.run(_request_action, agent, queue, game_state) in the
+        process doing the search (see profiling.MoveProfiler)
+
+    memory_budget : MemoryBudget, optional
+        If given, limits the context and tables of both agents
+
     Returns
     -------
     (agent, list<[(int, int),]>, Status)
@@ -129,7 +381,9 @@ def _play(agents, game_state, time_limit, match_id, debug=False):
         winner, loser = agents[1 - active_idx], agents[active_idx]
 
         try:
-            action = fork_get_action(game_state, players[active_idx], time_limit, debug)
+            move_seed = None if seed is None else "{}:{}:{}".format(seed, match_id, game_state.ply_count)
+            action = fork_get_action(game_state, players[active_idx], time_limit, debug, clock,
+                                     node_budget, move_seed, trace, profiler, memory_budget)
         except Empty:
             status = Status.TIMEOUT
             logger.warn(textwrap.dedent("""\
@@ -161,36 +415,160 @@ def _play(agents, game_state, time_limit, match_id, debug=False):
     return winner, game_history, match_id
 
 
-def fork_get_action(game_state, active_player, time_limit, debug=False):
+def fork_get_action(game_state, active_player, time_limit, debug=False, clock=None,
+                    node_budget=None, seed=None, trace=None, profiler=None, memory_budget=None):
+    """ Ask active_player for an action within time_limit milliseconds
+
+    By default the search runs in a new process that is terminated after
+    the time limit. With debug=True it runs in the main process and the
+    caller sleeps for the time limit afterwards. With a clock (e.g. a
+    VirtualClock) it also runs in the main process, but the time limit is
+    enforced on that clock at every queue.put() and nothing sleeps, so
+    timeouts are deterministic.
+
+    With a node_budget the turn ends when the agent has searched that many
+    nodes (agents count them with BasePlayer.count_node()). Unless a clock
+    is given, the search still runs in its own process but the time limit
+    is not enforced. The agent shares its node count with this process,
+    which terminates the search once the count passes the budget and the
+    search has not stopped within NODE_GRACE; an agent that does not count
+    nodes is terminated after PROCESS_TIMEOUT. The outcome is then
+    independent of the host load.
+
+    With a trace (HarnessTrace) the cost of each phase is recorded. With a
+    profiler, the search runs under profiler.run() (see _play()). With a
+    memory_budget (MemoryBudget) the agent's context and tables are limited.
+    """
+    tic = time.perf_counter()
     receiver, sender = Pipe()
-    action_queue = TimedQueue(receiver, sender, time_limit)
-    if debug:  # run the search in the main process and thread
+    if node_budget is not None and clock is None:
+        queue_clock = VirtualClock()  # never advances: the budget replaces the time limit
+    else:
+        queue_clock = clock
+    action_queue = TimedQueue(receiver, sender, time_limit, queue_clock, node_budget, seed,
+                              trace is not None, memory_budget, trace is not None and trace.memory)
+    if node_budget is not None and not (debug or clock is not None):
+        action_queue.node_counter = RawValue("q", 0)
+        action_queue.node_clock = action_queue.publish_nodes
+    if trace is not None:
+        times = {"setup": time.perf_counter() - tic, "start": 0.}
+        times["pickle"], times["pickle_bytes"] = _pickle_cost(active_player, game_state)
+        stats_receiver = None
+    if debug or clock is not None:  # run the search in the main process and thread
         from copy import deepcopy
         active_player.queue = None
-        active_player = deepcopy(active_player)
-        active_player.queue = action_queue
-        _request_action(active_player, action_queue, game_state)
-        time.sleep(time_limit / 1000)
+        agent_copy = deepcopy(active_player)
+        agent_copy.queue = action_queue
+        tic = time.perf_counter()
+        if profiler is None:
+            _request_action(agent_copy, action_queue, game_state)
+        else:
+            profiler.run(_request_action, agent_copy, action_queue, game_state)
+        if trace is not None: times["wait"] = time.perf_counter() - tic
+        if clock is None: time.sleep(time_limit / 1000)
     else:  # spawn a new process to run the search function
+        if trace is not None:
+            stats_receiver, action_queue.stats_sender = Pipe(duplex=False)
         try:
-            p = Process(target=_request_action, args=(active_player, action_queue, game_state))
+            if profiler is None:
+                p = Process(target=_request_action, args=(active_player, action_queue, game_state))
+            else:
+                p = Process(target=profiler.run, args=(_request_action, active_player, action_queue, game_state))
+            tic = time.perf_counter()
             p.start()
-            p.join(timeout=PROCESS_TIMEOUT + time_limit / 1000)
+            if trace is not None: times["start"] = time.perf_counter() - tic
+            tic = time.perf_counter()
+            if action_queue.node_counter is None:
+                p.join(timeout=PROCESS_TIMEOUT + time_limit / 1000)
+            else:
+                _join_node_budget(p, action_queue.node_counter, node_budget, PROCESS_TIMEOUT + time_limit / 1000)
+            if trace is not None: times["wait"] = time.perf_counter() - tic
         finally:
             if p and p.is_alive(): p.terminate()
-    new_context, action = action_queue.get_nowait()  # raises Empty if agent did not respond
+    tic = time.perf_counter()
+    try:
+        new_context, action = action_queue.get_nowait()  # raises Empty if agent did not respond
+    finally:
+        if trace is not None:
+            times["get"] = time.perf_counter() - tic
+            if stats_receiver is None:
+                stats = action_queue.stats
+            else:
+                stats = stats_receiver.recv() if stats_receiver.poll() else None
+            trace.record(game_state, active_player, times, stats)
     active_player.context = new_context
     return action
 
 
+def _join_node_budget(process, node_counter, node_budget, timeout):
+    """ Wait for a search process under a node budget to end; return when its
+    node count has been past node_budget for NODE_GRACE seconds, or after
+    timeout seconds (the caller terminates it) """
+    deadline = time.perf_counter() + timeout
+    over = None
+    while process.is_alive():
+        now = time.perf_counter()
+        if over is None and node_counter.value > node_budget:
+            over = now
+        if now > deadline or (over is not None and now - over > NODE_GRACE):
+            return
+        process.join(NODE_POLL)
+
+
+def _pickle_cost(agent, game_state):
+    """ Return the time and size of pickling the agent and state, or (None, None) """
+    tic = time.perf_counter()
+    try:
+        size = len(ForkingPickler.dumps((agent, game_state)))
+    except Exception:
+        return None, None
+    return time.perf_counter() - tic, size
+
+
 def _request_action(agent, queue, game_state):
     """ Augment agent instances with a countdown timer on every method before
     calling the get_action() method and catch countdown timer exceptions.
+    Also resets the agent's node counter, hands it the node budget, the
+    per-node clock and the table limit of a MemoryBudget, reseeds its
+    random number generators if the queue carries a seed (restoring the
+    state of the global one afterwards) and measures the memory of the
+    search if it is traced (see HarnessTrace).
     """
     agent.queue = queue
     queue.agent = agent
+    agent.nodes = 0
+    agent.node_budget = queue.node_budget
+    agent.node_clock = queue.node_clock
+    if queue.memory_budget is not None:
+        agent.table_limit = queue.memory_budget.table_entries
+    if queue.seed is not None:
+        # in process, the harness's own draws must not follow the agent's
+        # seed: the global generator is restored after the search
+        saved_random = random.getstate()
+        random.seed(queue.seed)
+        if isinstance(getattr(agent, "random", None), random.Random):
+            agent.random.seed(queue.seed)
+    tracing = tracemalloc.is_tracing()
+    if queue.trace_memory:
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+    tic = time.perf_counter()
     try:
         queue.start_timer()
         agent.get_action(game_state)
     except StopSearch:
         pass
+    finally:
+        if queue.seed is not None:
+            random.setstate(saved_random)
+        if queue.stats is not None:
+            queue.stats["search"] = time.perf_counter() - tic - queue.stats["put"]
+            if queue.trace_memory:
+                queue.stats["traced_peak"] = tracemalloc.get_traced_memory()[1]
+                queue.stats["process_peak"] = _peak_rss()
+                if not tracing:
+                    tracemalloc.stop()
+            if queue.stats_sender is not None:
+                queue.stats_sender.send(queue.stats)
@@ -0,0 +1,239 @@
+"""Articulation points and biconnected regions of the knight graph
+
+The open cells of an Isolation board form a graph whose edges are knight
+moves. A cell whose removal disconnects that graph (an articulation point)
+is a chokepoint: the player who takes it may cut the other one off from
+most of the board.
+
+Blocking a cell only changes the connected component that contained it,
+so the analysis is kept per component and memoized on the component's
+bitboard. KnightGraphAnalyzer re-analyzes just that component after
+block() and restores the previous result on undo(); analyze() serves
+stateless callers from the same memo. The graph features in features.py
+read the analyzer of an incremental.IncrementalEvaluator when the search
+runs on one, and call analyze() otherwise.
+
+Once no component is adjacent to both players, the game is a race: each
+player moves on its own cells, and the one with the longer knight path
+wins. partition_winner() decides such positions exactly when the regions
+are small enough to search, which lets CustomPlayer(partition_cutoff=True)
+stop searching there.
+"""
+from collections import namedtuple
+
+from bitboard import NEIGHBORS, NEIGHBOR_MASKS, flood, popcount
+
+
+CACHE_SIZE = 50000  # maximum number of memoized components (and of memoized paths)
+ENDGAME_CELLS = 16  # partition_winner() solves positions where a player reaches at most this many cells
+
+Region = namedtuple("Region", "cells articulation blocks")
+Region.__doc__ = """ Analysis of one connected component of open cells
+
+cells: int
+    Bitboard of the cells in the component
+
+articulation: int
+    Bitboard of the articulation points of the component
+
+blocks: tuple
+    Bitboards of the biconnected blocks (maximal regions with no
+    chokepoint inside); articulation points belong to several blocks
+"""
+
+_cache = {}
+_paths = {}
+
+
+def biconnected(cells):
+    """ Run Tarjan's algorithm on one connected component
+
+    Parameters
+    ----------
+    cells : int
+        Bitboard of a connected set of open cells
+
+    Returns
+    -------
+    Region
+    """
+    region = _cache.get(cells)
+    if region is not None:
+        return region
+
+    root = (cells & -cells).bit_length() - 1
+    order = {root: 0}
+    low = {root: 0}
+    vertices = [root]
+    stack = [(root, iter(NEIGHBORS[root]))]
+    articulation = 0
+    root_children = 0
+    blocks = []
+    while stack:
+        v, neighbors = stack[-1]
+        for w in neighbors:
+            if not cells & (1 << w):
+                continue
+            if w not in order:
+                order[w] = low[w] = len(order)
+                vertices.append(w)
+                stack.append((w, iter(NEIGHBORS[w])))
+                break
+            low[v] = min(low[v], order[w])
+        else:
+            stack.pop()
+            if not stack:
+                continue
+            u = stack[-1][0]
+            low[u] = min(low[u], low[v])
+            if low[v] >= order[u]:
+                if u == root:
+                    root_children += 1
+                else:
+                    articulation |= 1 << u
+                block = 1 << u
+                while True:
+                    w = vertices.pop()
+                    block |= 1 << w
+                    if w == v: break
+                blocks.append(block)
+    if root_children > 1:
+        articulation |= 1 << root
+
+    region = Region(cells, articulation, tuple(blocks) or (cells,))
+    if len(_cache) >= CACHE_SIZE:
+        _cache.clear()
+    _cache[cells] = region
+    return region
+
+
+def components(board):
+    """ Yield the bitboard of each connected component of open cells """
+    while board:
+        cells = flood(board, (board & -board).bit_length() - 1)
+        yield cells
+        board &= ~cells
+
+
+def analyze(board):
+    """ Return a tuple with one Region per connected component of `board` """
+    return tuple(biconnected(cells) for cells in components(board))
+
+
+class KnightGraphAnalyzer:
+    """ Region analysis kept in sync with a board while cells are blocked
+
+    Use block() for every cell occupied during search and undo() when
+    backing up. The regions are only computed when they are read: from
+    the parent's regions if those were read, re-analyzing just the
+    component containing the blocked cell, and from the memo otherwise.
+    A search that reads them at its leaves therefore pays nothing for the
+    interior nodes, and the siblings of a leaf share one analysis.
+
+    Attributes
+    ----------
+    board: int
+        Bitboard of the open cells
+
+    regions: tuple
+        One Region per connected component of the open cells
+    """
+    def __init__(self, board):
+        self.board = board
+        self._regions = analyze(board)
+        self._history = []
+
+    @property
+    def regions(self):
+        if self._regions is None:
+            _, parent, cell = self._history[-1]
+            self._regions = analyze(self.board) if parent is None else _block(parent, cell)
+        return self._regions
+
+    def block(self, cell):
+        if not self.board & (1 << cell):
+            raise ValueError("cell {} is already blocked".format(cell))
+        self._history.append((self.board, self._regions, cell))
+        self.board ^= 1 << cell
+        self._regions = None
+
+    def undo(self):
+        """ Revert the most recent block() """
+        self.board, self._regions, _ = self._history.pop()
+
+
+def _block(regions, cell):
+    """ Return `regions` with `cell` removed from the component containing it """
+    bit = 1 << cell
+    for i, region in enumerate(regions):
+        if region.cells & bit: break
+    rest = region.cells ^ bit
+    if not rest:
+        new = ()
+    elif region.articulation & bit:
+        new = tuple(biconnected(cells) for cells in components(rest))
+    else:
+        new = (biconnected(rest),)
+    return regions[:i] + new + regions[i + 1:]
+
+
+def chokepoints(regions, loc, board):
+    """ Number of open neighbours of `loc` that are articulation points """
+    cells = NEIGHBOR_MASKS[loc] & board
+    return sum(popcount(cells & r.articulation) for r in regions if r.cells & cells)
+
+
+def block_area(regions, loc, board):
+    """ Size of the largest biconnected block next to `loc` """
+    cells = NEIGHBOR_MASKS[loc] & board
+    return max((popcount(b) for r in regions if r.cells & cells for b in r.blocks if b & cells), default=0)
+
+
+def partitioned(regions, own_loc, opp_loc, board):
+    """ True if no component of open cells is adjacent to both players """
+    own_cells = NEIGHBOR_MASKS[own_loc] & board
+    opp_cells = NEIGHBOR_MASKS[opp_loc] & board
+    return not any(r.cells & own_cells and r.cells & opp_cells for r in regions)
+
+
+def longest_path(board, loc, limit=None):
+    """ Most moves a knight at `loc` can make in a row on the open cells of
+    `board`, or `limit` if it can make at least that many; like
+    Isolation._has_liberties(), a lone liberty at cell 0 counts as none """
+    key = (board, loc, limit)
+    length = _paths.get(key)
+    if length is not None:
+        return length
+    moves = [n for n in NEIGHBORS[loc] if board & (1 << n)]
+    length = 0
+    if moves and moves != [0] and limit != 0:
+        bound = popcount(board) if limit is None else min(limit, popcount(board))
+        for n in moves:
+            length = max(length, 1 + longest_path(board ^ (1 << n), n, None if limit is None else limit - 1))
+            if length == bound: break
+    if len(_paths) >= CACHE_SIZE:
+        _paths.clear()
+    _paths[key] = length
+    return length
+
+
+def partition_winner(board, locs, active):
+    """ Winner of a non-terminal position whose players are partitioned
+
+    Neither player can block the other, so the active player wins exactly
+    if its longest path is longer than the other player's. The path of the
+    player with fewer reachable cells is searched in full, and the other
+    player's only as far as needed to beat it. Returns None if a component
+    is adjacent to both players, or if both players reach more than
+    ENDGAME_CELLS cells. The reachable cells are flood filled rather than
+    read from the regions, which a search would otherwise have to analyze
+    at every interior node.
+    """
+    reach = [flood(board | (1 << loc), loc) ^ (1 << loc) for loc in locs]
+    small = 0 if popcount(reach[0]) <= popcount(reach[1]) else 1
+    if reach[0] & reach[1] or popcount(reach[small]) > ENDGAME_CELLS:
+        return None
+    lengths = [None, None]
+    lengths[small] = longest_path(reach[small], locs[small])
+    lengths[1 - small] = longest_path(reach[1 - small], locs[1 - small], lengths[small] + 1)
+    return active if lengths[active] > lengths[1 - active] else 1 - active
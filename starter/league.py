@@ -0,0 +1,186 @@
+"""Glicko rating league over many agents and heuristic variants
+
+Instead of one fixed opponent per run_match.py invocation, a League keeps a
+Glicko rating (mu, rd) for every entrant and updates it after every single
+game. The next pairing is the one whose result is expected to shrink the
+rating variances the most: entrants with a large rd, matched against
+opponents of similar strength (expected score near 1/2). Games already in
+flight count against their pairing, so a pool of workers spreads over
+different pairs. The league stops after a number of games or once every rd
+is below a target, which ranks N entrants with far fewer games than a
+fixed round robin of N * (N - 1) / 2 pairs.
+
+Ratings follow Glickman's Glicko system with each game as its own rating
+period; rd never drops below min_rd, which keeps some exploration alive.
+
+    >>> league = League(entrants)
+    >>> run_league(league, make_match, num_games=500, processes=8)
+    >>> print(league.format_ranking())
+"""
+import math
+import random
+
+from collections import Counter
+from multiprocessing.pool import ThreadPool as Pool
+from queue import Queue
+
+from isolation import play
+
+
+INITIAL_RATING = 1500.
+INITIAL_RD = 350.
+MIN_RD = 30.
+
+_Q = math.log(10) / 400
+
+
+def _g(rd):
+    return 1 / math.sqrt(1 + 3 * (_Q * rd / math.pi) ** 2)
+
+
+class League:
+    """ Incremental Glicko ratings and uncertainty-driven pairings
+
+    Parameters
+    ----------
+    entrants : sequence
+        isolation.Agent tuples; their names must be unique
+
+    Attributes
+    ----------
+    ratings: dict
+        ratings[name] is the [mu, rd] of an entrant
+
+    games: collections.Counter
+        Games played per entrant name
+
+    pairings: collections.Counter
+        Games handed out per (first, second) name pair by next_pairing()
+    """
+    def __init__(self, entrants, initial_rating=INITIAL_RATING, initial_rd=INITIAL_RD, min_rd=MIN_RD,
+                 seed=None):
+        self.entrants = {agent.name: agent for agent in entrants}
+        if len(self.entrants) != len(entrants):
+            raise ValueError("league entrants need unique names")
+        if len(self.entrants) < 2:
+            raise ValueError("a league needs at least two entrants")
+        self.ratings = {name: [initial_rating, initial_rd] for name in self.entrants}
+        self.min_rd = min_rd
+        self.games = Counter()
+        self.pairings = Counter()
+        self.random = random.Random(seed)
+
+    def expected(self, name, opponent):
+        """ Expected score of name against opponent (Glicko E) """
+        mu, _ = self.ratings[name]
+        opp_mu, opp_rd = self.ratings[opponent]
+        return 1 / (1 + 10 ** (-_g(opp_rd) * (mu - opp_mu) / 400))
+
+    def period_rating(self, name, results):
+        """ Return the [mu, rd] of name after a rating period with the given
+        (opponent, score) results, against the current ratings """
+        mu, rd = self.ratings[name]
+        information = change = 0.
+        for opponent, score in results:
+            g = _g(self.ratings[opponent][1])
+            e = self.expected(name, opponent)
+            information += _Q ** 2 * g ** 2 * e * (1 - e)
+            change += g * (score - e)
+        variance = max(1 / (1 / rd ** 2 + information), self.min_rd ** 2)
+        return [mu + _Q * variance * change, math.sqrt(variance)]
+
+    def information(self, a, b):
+        """ Total reduction of the rating variances one game of a vs. b brings """
+        return sum(self.ratings[x][1] ** 2 - self.period_rating(x, [(y, 0.)])[1] ** 2 for x, y in ((a, b), (b, a)))
+
+    def update(self, winner, loser):
+        """ Record one game as a rating period of its own; both ratings are
+        updated from the pre-game values """
+        self.ratings.update({winner: self.period_rating(winner, [(loser, 1.)]),
+                             loser: self.period_rating(loser, [(winner, 0.)])})
+        self.games[winner] += 1
+        self.games[loser] += 1
+
+    def next_pairing(self, pending=None):
+        """ Return the (first, second) Agent pair to play next
+
+        pending counts the games in flight per unordered name pair; each one
+        divides the pair's priority, as its result is not known yet. The
+        entrant with fewer games as first player against the other moves
+        first.
+        """
+        pending = pending or Counter()
+        best, best_score = [], -1.
+        names = sorted(self.entrants)
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                score = self.information(a, b) / (1 + pending[a, b])
+                if score > best_score + 1e-9:
+                    best, best_score = [(a, b)], score
+                elif score > best_score - 1e-9:
+                    best.append((a, b))
+        a, b = self.random.choice(best)
+        if self.pairings[b, a] < self.pairings[a, b]:
+            a, b = b, a
+        self.pairings[a, b] += 1
+        return self.entrants[a], self.entrants[b]
+
+    def converged(self, target_rd):
+        return max(rd for _, rd in self.ratings.values()) <= target_rd
+
+    def ranking(self):
+        """ Return (name, mu, rd, games) tuples, strongest first """
+        return sorted(((name, mu, rd, self.games[name]) for name, (mu, rd) in self.ratings.items()),
+                      key=lambda entry: -entry[1])
+
+    def format_ranking(self):
+        lines = ["{:>4} {:<60} {:>7} {:>6} {:>6}".format("rank", "agent", "rating", "rd", "games")]
+        for rank, (name, mu, rd, games) in enumerate(self.ranking(), 1):
+            lines.append("{:>4} {:<60} {:>7.1f} {:>6.1f} {:>6}".format(rank, name[:60], mu, rd, games))
+        return "\n".join(lines)
+
+
+def run_league(league, make_match, num_games, processes=1, target_rd=None, callback=None):
+    """ Play up to num_games league games on a pool of workers
+
+    make_match(players, match_id) returns the run_match.Match to play for
+    a pairing. A new pairing is chosen whenever a game finishes, from the
+    ratings updated with every result so far, so at most `processes` games
+    are in flight. Stops early once league.converged(target_rd). Every
+    finished game is passed to callback(match, result) if given. Returns
+    the number of games played.
+    """
+    finished = Queue()
+    pending = Counter()
+    pool = Pool(processes)
+
+    def submit(match_id):
+        players = league.next_pairing(pending)
+        pending[tuple(sorted(p.name for p in players))] += 1
+        match = make_match(players, match_id)
+        pool.apply_async(play, (match,),
+                         callback=lambda result: finished.put((match, result)),
+                         error_callback=lambda err: finished.put((match, err)))
+
+    submitted = played = 0
+    try:
+        while submitted < min(processes, num_games):
+            submit(submitted)
+            submitted += 1
+        while played < submitted:
+            match, result = finished.get()
+            if isinstance(result, BaseException):
+                raise result
+            played += 1
+            pending[tuple(sorted(p.name for p in match.players))] -= 1
+            winner = result[0]
+            loser = match.players[0] if match.players[1] is winner else match.players[1]
+            league.update(winner.name, loser.name)
+            if callback is not None:
+                callback(match, result)
+            if submitted < num_games and not (target_rd is not None and league.converged(target_rd)):
+                submit(submitted)
+                submitted += 1
+    finally:
+        pool.terminate()
+    return played
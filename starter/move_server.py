@@ -0,0 +1,284 @@
+"""Long-running move server: best moves for many concurrent sessions
+
+fork_get_action() starts a process for every move, which is fine for a
+tournament but not for a service answering "best move for this position"
+for many sessions at once. A MoveServer keeps a pool of hot worker
+processes, each holding one CustomPlayer, and answers requests over TCP:
+
+  - solved positions are kept in an LRU cache keyed on the Isolation state
+    (the search settings are fixed per server)
+  - concurrent requests for a position that is being searched wait for
+    that search instead of starting another one
+  - metrics() reports the p50/p99 latency and the cache hit rate
+
+The protocol is one JSON object per line, answered in completion order:
+
+    {"id": 1, "state": "<codec.encode_state() hex>"}
+        -> {"id": 1, "action": 58, "score": 2, "source": "search"}
+    {"id": 2, "type": "metrics"}
+        -> {"id": 2, "metrics": {...}}
+
+"action" is null for a terminal state, "source" is one of "search",
+"cache" or "merged". The load generator replays positions from random games
+against a running server:
+
+    $python move_server.py serve --port 5600 -p 4 -d 4
+    $python move_server.py load --port 5600 --sessions 64 --requests 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import textwrap
+import time
+
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from codec import decode_state, encode_state
+from isolation import Isolation
+from my_custom_player import CustomPlayer, get_heuristic
+
+
+CACHE_SIZE = 65536
+LATENCY_HISTORY = 100000
+SEARCH_DEPTH = 3
+
+_player = None  # CustomPlayer of a worker process
+
+
+def _init_worker(heuristic):
+    global _player
+    _player = CustomPlayer(0, heuristic=get_heuristic(heuristic))
+
+
+def _solve(encoded, depth, time_limit):
+    """ Search one position in a worker process; returns (action, score) """
+    state = decode_state(encoded)
+    if state.terminal_test():
+        return None, None
+    _player.player = state.player()
+    best = _player.top_moves(state, 1, depth=depth, time_limit=time_limit)
+    if not best:  # not even depth 1 finished within the time limit
+        return int(state.actions()[0]), None
+    (action, score), = best
+    return int(action), score
+
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else None
+
+
+class MoveServer:
+    """ Serve best moves from hot worker processes with a position cache
+
+    Parameters
+    ----------
+    depth : int
+        Search depth (the maximum depth if time_limit is set)
+
+    time_limit : float, optional
+        Milliseconds per search; deepens iteratively (see CustomPlayer.top_moves)
+
+    heuristic : str
+        HEURISTICS_FUNCTIONS name or feature expression of the workers
+
+    processes : int
+        Number of worker processes
+
+    cache_size : int
+        Number of solved positions kept
+    """
+    def __init__(self, depth=SEARCH_DEPTH, time_limit=None, heuristic="heuristics_liberties", processes=1,
+                 cache_size=CACHE_SIZE):
+        get_heuristic(heuristic)  # fail here rather than in the workers
+        self.depth = depth
+        self.time_limit = time_limit
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.counts = {"search": 0, "cache": 0, "merged": 0}
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self.port = None
+        self._in_flight = {}
+        self._executor = ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(heuristic,))
+        self._server = None
+
+    async def best_move(self, state):
+        """ Return (action, score, source) for an Isolation state """
+        tic = time.perf_counter()
+        if state in self.cache:
+            self.cache.move_to_end(state)
+            (action, score), source = self.cache[state], "cache"
+        elif state in self._in_flight:
+            (action, score), source = await asyncio.shield(self._in_flight[state]), "merged"
+        else:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._executor, _solve, encode_state(state), self.depth, self.time_limit)
+            self._in_flight[state] = future
+            try:
+                action, score = await future
+            finally:
+                del self._in_flight[state]
+            self.cache[state] = action, score
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            source = "search"
+        self.counts[source] += 1
+        self.latencies.append(time.perf_counter() - tic)
+        return action, score, source
+
+    def metrics(self):
+        """ Request counts, cache hit rate and latency percentiles in milliseconds """
+        latencies = sorted(self.latencies)
+        requests = sum(self.counts.values())
+        metrics = dict(self.counts, requests=requests, cached_positions=len(self.cache),
+                       hit_rate=self.counts["cache"] / requests if requests else None)
+        for p in (50, 99, 100):
+            value = _percentile(latencies, p)
+            metrics["p{}_ms".format(p)] = None if value is None else 1000 * value
+        return metrics
+
+    async def start(self, host="127.0.0.1", port=0):
+        """ Start listening; port 0 picks a free port (see self.port) """
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(cancel_futures=True)
+
+    async def _answer(self, request, writer, lock):
+        if request.get("type") == "metrics":
+            response = {"id": request.get("id"), "metrics": self.metrics()}
+        else:
+            try:
+                action, score, source = await self.best_move(decode_state(bytes.fromhex(request["state"])))
+                response = {"id": request.get("id"), "action": action, "score": score, "source": source}
+            except Exception as err:
+                response = {"id": request.get("id"), "error": repr(err)}
+        async with lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def _serve_client(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(json.loads(line), writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def random_positions(num_positions, max_ply=12, seed=0):
+    """ Positions of random games in their first max_ply plies; early
+    positions repeat, as they would across many sessions """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        state = Isolation()
+        for _ in range(rng.randint(0, max_ply)):
+            if state.terminal_test(): break
+            state = state.result(rng.choice(state.actions()))
+        positions.append(state)
+    return positions
+
+
+async def generate_load(host, port, positions, sessions=16, requests=100, seed=0):
+    """ Run `sessions` concurrent clients sending `requests` requests each,
+    one at a time; returns (client latencies in seconds, wall time) """
+    latencies = []
+
+    async def session(index):
+        rng = random.Random("{}:{}".format(seed, index))
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for request_id in range(requests):
+                state = rng.choice(positions)
+                tic = time.perf_counter()
+                writer.write(json.dumps({"id": request_id, "state": encode_state(state).hex()}).encode() + b"\n")
+                await writer.drain()
+                response = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - tic)
+                if "error" in response:
+                    raise RuntimeError(response["error"])
+        finally:
+            writer.close()
+
+    tic = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return latencies, time.perf_counter() - tic
+
+
+async def _query_metrics(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({"id": 0, "type": "metrics"}).encode() + b"\n")
+    await writer.drain()
+    metrics = json.loads(await reader.readline())["metrics"]
+    writer.close()
+    return metrics
+
+
+def main(args):
+    if args.command == "serve":
+        async def serve():
+            server = MoveServer(args.depth, args.time_limit, args.heuristic, args.processes, args.cache_size)
+            await server.start(args.host, args.port)
+            print("Serving moves on {}:{}".format(args.host, server.port))
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await server.close()
+        asyncio.run(serve())
+        return
+    positions = random_positions(args.positions, seed=args.seed)
+    latencies, seconds = asyncio.run(generate_load(args.host, args.port, positions, args.sessions,
+                                                   args.requests, args.seed))
+    latencies.sort()
+    print("{} requests in {:.2f}s ({:.1f} requests/s)".format(len(latencies), seconds, len(latencies) / seconds))
+    print("client latency ms: p50 {:.2f}  p99 {:.2f}  max {:.2f}".format(
+        *(1000 * _percentile(latencies, p) for p in (50, 99, 100))))
+    print("server metrics: {}".format(asyncio.run(_query_metrics(args.host, args.port))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Serve CustomPlayer moves over TCP, or generate load against a running server.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Serve depth-4 moves from 4 worker processes, then send 64 sessions x 100
+              requests drawn from 500 positions:
+
+                $python move_server.py serve --port 5600 -p 4 -d 4
+                $python move_server.py load --port 5600 --sessions 64 --requests 100 --positions 500
+        """)
+    )
+    parser.add_argument('command', choices=("serve", "load"))
+    parser.add_argument('--host', type=str, default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=5600)
+    parser.add_argument('-p', '--processes', type=int, default=1, help="Worker processes (serve).")
+    parser.add_argument('-d', '--depth', type=int, default=SEARCH_DEPTH, help="Search depth (serve).")
+    parser.add_argument('-t', '--time_limit', type=float, default=None,
+                        help="Milliseconds per search, deepening up to --depth (serve).")
+    parser.add_argument('-e', '--heuristic', type=str, default="heuristics_liberties",
+                        help="Heuristic name or feature expression (serve).")
+    parser.add_argument('--cache_size', type=int, default=CACHE_SIZE, help="Cached positions (serve).")
+    parser.add_argument('--sessions', type=int, default=16, help="Concurrent client sessions (load).")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per session (load).")
+    parser.add_argument('--positions', type=int, default=1000, help="Distinct positions to draw from (load).")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    main(parser.parse_args())
@@ -3,8 +3,12 @@ import sys
 import math
 import timeit
 
-from isolation import Isolation, DebugState
+from isolation import Isolation, DebugState, StopSearch
 from sample_players import DataPlayer
+from incremental import IncrementalEvaluator
+from features import compose
+from knight_graph import partition_winner
+from search_cache import EXACT, LOWER, UPPER, heuristic_tag
 
 
 def heuristics_liberties(state: Isolation, player: int):
@@ -330,7 +334,27 @@ HEURISTICS_FUNCTIONS = {
     "heuristics_liberties_aggressive": heuristics_liberties_aggressive,
 }
 
+
+
+def get_heuristic(spec: str):
+    """Return the HEURISTICS_FUNCTIONS entry named `spec`, or compile `spec`
+    as a weighted feature expression (see features.compose)"""
+    if spec in HEURISTICS_FUNCTIONS:
+        return HEURISTICS_FUNCTIONS[spec]
+    return compose(spec)
+
+
+# Heuristics with an O(8) equivalent on IncrementalEvaluator; searches with
+# these (or with composed heuristics, see features.compose) run on a single
+# evaluator using apply()/undo() instead of result()
+INCREMENTAL_HEURISTICS = {
+    heuristics_liberties: IncrementalEvaluator.liberties_score,
+    heuristics_liberties_deep: IncrementalEvaluator.deep_liberties_score,
+}
+
 SEED = None
+MAX_DEPTH = 4
+PARTITION_DEPTH = 2  # least remaining depth at which partition_cutoff solves partitioned positions
 
 HEURISTIC_FUNC = heuristics_liberties
 
@@ -353,9 +377,18 @@ class CustomPlayer(DataPlayer):
     **********************************************************************
     """
 
-    def __init__(self, player_id, seed=SEED):
+    def __init__(self, player_id, seed=SEED, heuristic=None, cache=None, max_depth=MAX_DEPTH, iterative=False,
+                 partition_cutoff=False):
         self.player = player_id
         self.random = random.Random(seed)
+        self.heuristic = heuristic  # None: use the module-level HEURISTIC_FUNC
+        self.cache = cache  # optional search_cache.SearchCache shared across games
+        self.max_depth = max_depth
+        self.iterative = iterative  # put the best move of every depth up to max_depth
+        self.depth_reached = 0
+        # score partitioned positions exactly (see knight_graph.partition_winner)
+        # instead of searching them; applies to searches without a cache
+        self.partition_cutoff = partition_cutoff
 
     def get_action(self, state: Isolation) -> None:
         """Employ an adversarial search technique to choose an action
@@ -374,21 +407,55 @@ class CustomPlayer(DataPlayer):
           Refer to (and use!) the Isolation.play() function to run games.
         **********************************************************************
         """
+        self.depth_reached = 0
         self.queue.put(
             random.choice(state.actions())
         )  # fallback to make sure we do not get stuck
         next_move = None
         if state.ply_count < 2:
             next_move = self.get_opening_move(state)
+        elif self.iterative:
+            for depth in range(1, self.max_depth + 1):
+                next_move = self.get_next_move(state, max_depth=depth)
+                self.depth_reached = depth
+                self.queue.put(next_move)
+            return
         else:
+            max_depth = self.max_depth
             start = timeit.default_timer()
-            next_move = self.get_next_move(state, max_depth=4)
+            next_move = self.get_next_move(state, max_depth=max_depth)
             end = timeit.default_timer()
             took_ms = (end - start) * 1000
             if took_ms > 145:
                 print("Search took {}ms".format(took_ms, 2))
+            self.depth_reached = max_depth
         self.queue.put(next_move)
 
+    def iter_action(self, state: Isolation):
+        """Generator-style get_action() for scheduler.CooperativeScheduler
+
+        Same choice as get_action(), but the search deepens iteratively up
+        to self.max_depth and yields after every root move it scores, so the
+        scheduler can run other games' searches in between. The best move
+        of each finished depth is put on the queue.
+        """
+        self.queue.put(random.choice(state.actions()))
+        if state.ply_count < 2:
+            self.queue.put(self.get_opening_move(state))
+            return
+        moves = state.actions()
+        if len(moves) == 1:
+            self.queue.put(moves[0])
+            return
+        search = self._root_search(state)
+        for depth in range(1, self.max_depth + 1):
+            moves_and_scores = []
+            for move in moves:
+                moves_and_scores.append([move, search(move, depth, -sys.maxsize)])
+                yield
+            max_score = max(score for _, score in moves_and_scores)
+            self.queue.put(self.random.choice([move for move, score in moves_and_scores if score == max_score]))
+
     def get_opening_move(self, state: Isolation):
         return random.choice(state.actions())
 
@@ -398,12 +465,7 @@ class CustomPlayer(DataPlayer):
         if len(allowed_moves) == 1:
             return allowed_moves[0]
 
-        moves_and_scores = []
-        for move in allowed_moves:
-            minimax_score = self.minimax(
-                self.player, max_depth, state, move, -sys.maxsize, sys.maxsize
-            )
-            moves_and_scores.append([move, minimax_score])
+        moves_and_scores = self.score_moves(state, max_depth)
 
         scores = [item[1] for item in moves_and_scores]
         max_score = max(scores)
@@ -415,11 +477,98 @@ class CustomPlayer(DataPlayer):
 
         return self.random.choice(potential_moves)
 
+    def score_moves(self, state: Isolation, max_depth: int):
+        """Return [move, score] for every legal move of state, each scored by
+        a full-window minimax search of max_depth from self.player's view"""
+        search = self._root_search(state)
+        return [[move, search(move, max_depth, -sys.maxsize)] for move in state.actions()]
+
+    def top_moves(self, state: Isolation, k: int, depth: int = None, time_limit: float = None):
+        """Return the k best moves of state as [move, score], best first
+
+        The scores are exact minimax scores from self.player's view. Once k
+        moves are known, every further move is searched with the current
+        k-th score as alpha and dropped if it cannot beat it, instead of
+        running k separate full-window searches.
+
+        With a time_limit (in milliseconds) the search deepens iteratively,
+        one ply at a time up to depth (if given), and returns the result of
+        the deepest iteration that finished; self.depth_reached records
+        that depth. Raises ValueError if neither depth nor time_limit is set.
+        """
+        if depth is None and time_limit is None:
+            raise ValueError("top_moves() needs a depth or a time_limit")
+        if time_limit is None:
+            self.depth_reached = depth
+            return self._top_moves(state, state.actions(), k, depth)
+
+        deadline = timeit.default_timer() + time_limit / 1000
+
+        def check_deadline():
+            if timeit.default_timer() > deadline:
+                raise StopSearch
+            if saved is not None:
+                saved()  # keep any per-node clock set by the harness
+
+        best = []
+        self.depth_reached = 0
+        moves = state.actions()
+        saved = self.node_clock
+        self.node_clock = check_deadline
+        try:
+            for current_depth in range(1, (depth or sys.maxsize) + 1):
+                best = self._top_moves(state, moves, k, current_depth)
+                self.depth_reached = current_depth
+                # search the previous best moves first: they set a tight alpha early
+                ranked = [move for move, _ in best]
+                moves = ranked + [move for move in moves if move not in ranked]
+        except StopSearch:
+            pass
+        finally:
+            self.node_clock = saved
+        return best
+
+    def _top_moves(self, state, moves, k, depth):
+        search = self._root_search(state)
+        best = []
+        for move in moves:
+            alpha = best[-1][1] if len(best) == k else -sys.maxsize
+            score = search(move, depth, alpha)
+            if len(best) < k or score > alpha:  # otherwise score is only an upper bound
+                best.append([move, score])
+                best.sort(key=lambda item: -item[1])
+                del best[k:]
+        return best
+
+    def _root_search(self, state):
+        """Return search(move, depth, alpha), the score of move searched with
+        the window (alpha, +inf); exact whenever it is above alpha"""
+        heuristic = self.heuristic or HEURISTIC_FUNC
+        if getattr(self, "cache", None) is not None:
+            tag = heuristic_tag(heuristic, INCREMENTAL_HEURISTICS.get(heuristic))
+            return lambda move, depth, alpha: self.minimax_cached(
+                self.player, depth, state, move, alpha, sys.maxsize, tag
+            )
+        incremental_score = INCREMENTAL_HEURISTICS.get(heuristic)
+        if incremental_score is None and hasattr(heuristic, "uses_graph"):
+            incremental_score = heuristic  # composed heuristics read evaluators directly
+        if incremental_score is None and self.partition_cutoff:
+            incremental_score = lambda evaluator, player: heuristic(evaluator.to_state(), player)
+        if incremental_score is None:
+            return lambda move, depth, alpha: self.minimax(
+                self.player, depth, state, move, alpha, sys.maxsize
+            )
+        evaluator = IncrementalEvaluator(state, graph=getattr(heuristic, "uses_graph", False))
+        return lambda move, depth, alpha: self.minimax_incremental(
+            self.player, depth, evaluator, move, alpha, sys.maxsize, incremental_score
+        )
+
     def minimax(self, player, depth, state: Isolation, move, alpha, beta):
+        self.count_node()
         if state.terminal_test():
             return state.utility(player)
         if depth == 0:
-            return HEURISTIC_FUNC(state, player)
+            return (self.heuristic or HEURISTIC_FUNC)(state, player)
 
         test_board = state.result(move)
 
@@ -450,3 +599,91 @@ class CustomPlayer(DataPlayer):
                 return best_move
 
         return best_move
+
+    def minimax_incremental(self, player, depth, evaluator: IncrementalEvaluator, move, alpha, beta, score):
+        """Same search as minimax(), but on one IncrementalEvaluator that is
+        updated in place; score is one of the INCREMENTAL_HEURISTICS values.
+        With partition_cutoff, partitioned positions return their exact
+        score without being searched."""
+        self.count_node()
+        if evaluator.terminal_test():
+            return evaluator.utility(player)
+        if self.partition_cutoff and depth >= PARTITION_DEPTH:
+            winner = partition_winner(evaluator.board, evaluator.locs, evaluator.player())
+            if winner is not None:
+                return float("inf") if winner == player else float("-inf")
+        if depth == 0:
+            return score(evaluator, player)
+
+        evaluator.apply(move)
+
+        maxi = evaluator.player() == player
+
+        best_move = -sys.maxsize if maxi else sys.maxsize
+
+        for move_slot in evaluator.actions():
+            current_value = self.minimax_incremental(
+                player, depth - 1, evaluator, move_slot, alpha, beta, score
+            )
+
+            if maxi:
+                best_move = max(current_value, best_move)
+                alpha = max(alpha, best_move)
+            else:
+                best_move = min(current_value, best_move)
+                beta = min(beta, best_move)
+
+            if beta <= alpha:
+                evaluator.undo()
+                return best_move
+
+        evaluator.undo()
+        return best_move
+
+    def minimax_cached(self, player, depth, state: Isolation, move, alpha, beta, tag):
+        """Same search as minimax(), reading and storing the value of every
+        searched position in self.cache; tag is the heuristic_tag() of the
+        heuristic. The stored best move of a position is searched first."""
+        self.count_node()
+        if state.terminal_test():
+            return state.utility(player)
+        if depth == 0:
+            return (self.heuristic or HEURISTIC_FUNC)(state, player)
+
+        test_board = state.result(move)
+
+        move_options = test_board.actions()
+        entry = self.cache.probe(test_board, depth, player, tag)
+        if entry is not None:
+            bound, value, hint = entry
+            if bound == EXACT or (bound == LOWER and value >= beta) or (bound == UPPER and value <= alpha):
+                return value
+            if hint in move_options:
+                move_options.insert(0, move_options.pop(move_options.index(hint)))
+
+        maxi = test_board.player() == player
+
+        best_move = -sys.maxsize if maxi else sys.maxsize
+        best_slot = None
+        window = alpha, beta
+
+        for move_slot in move_options:
+            current_value = self.minimax_cached(
+                player, depth - 1, test_board, move_slot, alpha, beta, tag
+            )
+
+            if maxi:
+                if current_value > best_move: best_slot = move_slot
+                best_move = max(current_value, best_move)
+                alpha = max(alpha, best_move)
+            else:
+                if current_value < best_move: best_slot = move_slot
+                best_move = min(current_value, best_move)
+                beta = min(beta, best_move)
+
+            if beta <= alpha:
+                break
+
+        bound = UPPER if best_move <= window[0] else LOWER if best_move >= window[1] else EXACT
+        self.cache.store(test_board, depth, player, tag, bound, best_move, best_slot)
+        return best_move
@@ -0,0 +1,160 @@
+"""Per-move profiling of agents inside the search processes
+
+fork_get_action() runs every search in a child process that is terminated
+at the time limit, so a profiler started in the main process never sees
+the agent's code. A MoveProfiler is handed to the harness instead and
+wraps isolation._request_action in the process doing the search. Each move
+writes its own profile into a parts directory; the profile is flushed when
+the search returns, when it ends with StopSearch and when the process is
+terminated (SIGTERM). merge() then combines all parts into one file:
+
+    - "cprofile": deterministic profiling with cProfile; the merged file is
+      a pstats dump (python -m pstats FILE, snakeviz, gprof2dot, ...)
+    - "sample": a background thread samples the search thread's stack every
+      `interval` seconds; the merged file holds collapsed stacks
+      ("outer;inner;leaf count" per line) for flamegraph.pl or speedscope
+"""
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import uuid
+
+from collections import Counter
+
+
+MODES = ("cprofile", "sample")
+
+
+class StackSampler:
+    """ Low-overhead statistical profiler for one thread
+
+    Attributes
+    ----------
+    stacks: collections.Counter
+        Number of samples per collapsed stack (root first, ';' separated)
+    """
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, args=(target,), daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _sample(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def dump_stats(self, filename):
+        write_collapsed(self.stacks, filename)
+
+
+def write_collapsed(stacks, filename):
+    with open(filename, "w") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write("{} {}\n".format(stack, count))
+
+
+def read_collapsed(filename):
+    stacks = Counter()
+    with open(filename) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+class MoveProfiler:
+    """ Profile every move of the selected agents and merge the results
+
+    Parameters
+    ----------
+    output : str
+        Path of the merged profile written by merge()
+
+    mode : str
+        "cprofile" or "sample" (see the module docstring)
+
+    agent_class : type, optional
+        Only moves by instances of this class are profiled (default: all)
+
+    interval : float
+        Seconds between two stack samples in "sample" mode
+    """
+    def __init__(self, output, mode="cprofile", agent_class=None, interval=0.001):
+        if mode not in MODES:
+            raise ValueError("unknown profiler mode '{}' (choose from {})".format(mode, ", ".join(MODES)))
+        self.output = output
+        self.mode = mode
+        self.agent_class = agent_class
+        self.interval = interval
+        self.parts = output + ".parts"
+        os.makedirs(self.parts, exist_ok=True)
+
+    def run(self, request_action, agent, queue, game_state):
+        """ Call request_action(agent, queue, game_state) under the profiler """
+        if self.agent_class is not None and not isinstance(agent, self.agent_class):
+            return request_action(agent, queue, game_state)
+        profiler = cProfile.Profile() if self.mode == "cprofile" else StackSampler(self.interval)
+        filename = os.path.join(self.parts, uuid.uuid4().hex)
+        flushed = []
+
+        def flush():
+            if flushed: return
+            flushed.append(True)
+            profiler.disable()
+            profiler.dump_stats(filename + ".tmp")
+            os.replace(filename + ".tmp", filename)  # never leave a partial part behind
+
+        def on_terminate(signum, frame):
+            flush()
+            os._exit(0)
+
+        try:  # only possible in the main thread, i.e. inside the search process
+            previous = signal.signal(signal.SIGTERM, on_terminate)
+        except ValueError:
+            previous = None
+        profiler.enable()
+        try:
+            return request_action(agent, queue, game_state)
+        finally:
+            flush()
+            if previous is not None:
+                signal.signal(signal.SIGTERM, previous)
+
+    def merge(self):
+        """ Merge all per-move parts into self.output; returns the number of moves """
+        parts = [os.path.join(self.parts, name) for name in sorted(os.listdir(self.parts))
+                 if not name.endswith(".tmp")]
+        if self.mode == "cprofile":
+            if parts:
+                pstats.Stats(*parts).dump_stats(self.output)
+        else:
+            stacks = Counter()
+            for part in parts:
+                stacks.update(read_collapsed(part))
+            write_collapsed(stacks, self.output)
+        for part in parts:
+            os.remove(part)
+        return len(parts)
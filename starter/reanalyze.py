@@ -0,0 +1,147 @@
+"""Re-search the positions of stored games with other heuristics and depths
+
+Reads game records written by run_match.py --record (see codec.py), replays
+every game once and scores all legal moves of each position with
+CustomPlayer.score_moves() for every requested (heuristic, depth) setting.
+Games are read and spread over a process pool in bounded batches, so
+arbitrarily large record files stream through in constant memory.
+
+One CSV row is written per position and setting:
+
+    game, ply, player, heuristic, depth, played, best_moves, played_best,
+    best_score, played_score, played_delta, reference_best, reference_delta
+
+played_delta is how much worse the move actually played scores than the
+best move under this setting. The first setting is the reference: the
+reference_* columns tell whether this setting's choice is among the
+reference's best moves and how much worse it scores under the reference.
+"""
+import argparse
+import csv
+import itertools
+import math
+import sys
+import textwrap
+
+from multiprocessing import Pool
+
+from codec import read_games
+from my_custom_player import CustomPlayer, get_heuristic
+
+
+COLUMNS = ("game", "ply", "player", "heuristic", "depth", "played", "best_moves", "played_best",
+           "best_score", "played_score", "played_delta", "reference_best", "reference_delta")
+
+
+def _delta(best, score):
+    return 0. if best == score else best - score  # inf - inf would be nan
+
+
+def analyze_game(args):
+    """ Return the CSV rows of one game; args is (game index, GameRecord, settings) """
+    index, record, settings = args
+    agents = [(spec, depth, CustomPlayer(0, heuristic=get_heuristic(spec))) for spec, depth in settings]
+    rows = []
+    state = record.initial_state
+    for action in record.history:
+        if state.ply_count >= 2 and len(state.actions()) > 1:
+            reference = None
+            for spec, depth, agent in agents:
+                agent.player = state.player()
+                scores = {int(move): score for move, score in agent.score_moves(state, depth)}
+                best_score = max(scores.values())
+                best = sorted(m for m, s in scores.items() if s == best_score)
+                if reference is None:
+                    reference = (scores, set(best), best_score)
+                ref_scores, ref_best, ref_score = reference
+                choice = best[0]
+                rows.append((index, state.ply_count, state.player(), spec, depth, int(action),
+                             " ".join(map(str, best)), int(int(action) in best),
+                             best_score, scores[int(action)], _delta(best_score, scores[int(action)]),
+                             int(choice in ref_best), _delta(ref_score, ref_scores[choice])))
+        state = state.result(action)
+    return rows
+
+
+def reanalyze(records, settings, out, processes=1, chunksize=4):
+    """ Stream records through a pool of processes and write CSV rows to out
+
+    Returns a {(heuristic, depth): [positions, played_best, reference_best,
+    total reference_delta]} summary.
+    """
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    summary = {setting: [0, 0, 0, 0.] for setting in settings}
+    jobs = ((i, record, settings) for i, record in enumerate(records))
+    window = processes * chunksize * 8  # Pool.imap would read all records up front
+    with Pool(processes) as pool:
+        while True:
+            batch = list(itertools.islice(jobs, window))
+            if not batch: break
+            for rows in pool.imap(analyze_game, batch, chunksize):
+                writer.writerows(rows)
+                for row in rows:
+                    stats = summary[row[3], row[4]]
+                    stats[0] += 1
+                    stats[1] += row[7]
+                    stats[2] += row[11]
+                    stats[3] += row[12] if math.isfinite(row[12]) else 0
+    return summary
+
+
+def main(args):
+    if not args.heuristics:
+        args.heuristics = ["heuristics_liberties"]
+    settings = list(itertools.product(args.heuristics, args.depths or [3]))
+
+    def records():
+        for filename in args.games:
+            with open(filename, "rb") as f:
+                yield from read_games(f)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        summary = reanalyze(itertools.islice(records(), args.limit), settings, out, args.processes)
+    finally:
+        if out is not sys.stdout: out.close()
+    print("{:<48} {:>6} {:>10} {:>10} {:>10}".format("setting", "pos", "played%", "ref%", "ref delta"),
+          file=sys.stderr)
+    for (spec, depth), (positions, played, ref, delta) in summary.items():
+        print("{:<48} {:>6} {:>10.1f} {:>10.1f} {:>10.3f}".format(
+            "{} @ {}".format(spec, depth)[:48], positions, 100. * played / max(positions, 1),
+            100. * ref / max(positions, 1), delta / max(positions, 1)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Re-search every position of recorded games with several heuristics and depths.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Record 100 rounds, then compare two heuristics at depth 3 against the first:
+
+                $python run_match.py -r 100 --record games.bin
+                $python reanalyze.py games.bin -e heuristics_liberties -e heuristics_liberties_deep -o deltas.csv -p 8
+
+            - Check a weighted expression at two depths on the first 50 games:
+
+                $python reanalyze.py games.bin -e "own_liberties - 2 * opp_liberties" -d 2 -d 4 -l 50
+        """)
+    )
+    parser.add_argument('games', nargs='+', help="Game record files written by run_match.py --record.")
+    parser.add_argument(
+        '-e', '--heuristic', action='append', dest='heuristics',
+        help="""\
+            Heuristic name or feature expression to search with; repeat the flag for
+            several (default: heuristics_liberties). The first one is the reference.
+        """
+    )
+    parser.add_argument(
+        '-d', '--depth', action='append', dest='depths', type=int,
+        help="Search depth; repeat the flag for several (default: 3)."
+    )
+    parser.add_argument('-l', '--limit', type=int, default=None, help="Only analyze the first LIMIT games.")
+    parser.add_argument('-o', '--output', type=str, default=None, help="CSV file to write (default: stdout).")
+    parser.add_argument('-p', '--processes', type=int, default=1, help="Number of worker processes.")
+    main(parser.parse_args())
@@ -0,0 +1,196 @@
+"""Content-addressed cache of finished games
+
+run_all.sh plays every heuristic again from scratch, even after an edit
+that only touched one of them. A ResultCache stores every finished game
+under a key that hashes everything the game depends on:
+
+  - the source of each player's class (and of its base classes) and of
+    the heuristic it searches with; composed heuristics hash their
+    compiled source (see features.compose)
+  - the source files of every module of this directory the player can
+    reach: the modules of its classes and heuristic and, transitively,
+    every module they import or take names from (so an edit to
+    incremental.py or bitboard.py changes the keys too)
+  - the time limit, the virtual clock, the node and memory budgets and
+    the seed
+  - the match id (moves are seeded from it, see isolation.play()) and
+    the initial state
+  - the harness that plays the games (e.g. "cooperative" for
+    scheduler.py, which limits CPU time instead of wall time)
+
+so a game is replayed from the cache only when none of these changed.
+Edits outside this directory (Python, installed packages) do not change
+the keys; rerun with refresh=True (run_match.py --refresh) after those.
+Games that cannot be reproduced, those timed on the wall clock (the fork
+harness without a virtual clock or node budget) with no seed, are played
+and never stored. Entries are codec game records in files named after
+their key, written atomically, so parallel sweeps can share a directory.
+
+    >>> cache = ResultCache("results/games")
+    >>> winner, history, match_id = cache.play(match)
+"""
+import functools
+import hashlib
+import inspect
+import io
+import json
+import os
+import sys
+import threading
+
+from codec import GameRecord, encode_state, read_games, write_games
+from isolation import play
+from search_cache import source_of
+
+
+CACHE_VERSION = 1  # bump when the harness changes how games are played
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _local_module(name):
+    """ Return the module called name if its file is in this directory, else None """
+    module = sys.modules.get(name)
+    path = getattr(module, "__file__", None)
+    if path is None or not os.path.abspath(path).startswith(HERE + os.sep):
+        return None
+    return module
+
+
+def _reachable_modules(objects):
+    """ Return the local modules of objects and every local module they
+    reach through their globals, sorted by name """
+    pending = [vars(sys.modules[obj.__module__]) for obj in objects if obj.__module__ in sys.modules]
+    pending += [obj.__globals__ for obj in objects if hasattr(obj, "__globals__")]
+    modules = {}
+    while pending:
+        for value in list(pending.pop().values()):
+            name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            module = _local_module(name) if isinstance(name, str) else None
+            if module is not None and name not in modules:
+                modules[name] = module
+                pending.append(vars(module))
+    return [modules[name] for name in sorted(modules)]
+
+
+def _file_digest(module):
+    with open(module.__file__, "rb") as f:
+        return "{} {}".format(module.__name__, hashlib.sha256(f.read()).hexdigest())
+
+
+def agent_fingerprint(agent_class):
+    """ Return a string identifying the play of agent_class: the sources of
+    its classes, its heuristic and its other plain keyword arguments, and
+    the hashes of the local modules these reach (see _reachable_modules)
+
+    agent_class may be a functools.partial; a class taking a heuristic
+    argument that is not given searches with its module's HEURISTIC_FUNC
+    (see run_match.py -e).
+    """
+    keywords = {}
+    while isinstance(agent_class, functools.partial):
+        keywords = dict(agent_class.keywords, **keywords)
+        agent_class = agent_class.func
+    classes = [cls for cls in agent_class.__mro__ if cls is not object]
+    parts = [source_of(cls) for cls in classes]
+    if "heuristic" in inspect.signature(agent_class).parameters:
+        heuristic = keywords.get("heuristic") or getattr(sys.modules[agent_class.__module__], "HEURISTIC_FUNC", None)
+        parts.append(source_of(heuristic))
+        if heuristic is not None:
+            classes.append(heuristic)
+    parts.extend(_file_digest(module) for module in _reachable_modules(classes))
+    for name, value in sorted(keywords.items()):
+        if isinstance(value, (bool, int, float, str, type(None))):
+            parts.append("{}={!r}".format(name, value))
+    return "\n".join(parts)
+
+
+class ResultCache:
+    """ Finished games stored by the hash of their inputs
+
+    Parameters
+    ----------
+    directory : str
+        Where the games are stored; created if needed
+
+    refresh : bool
+        Play every game again and overwrite its stored result
+
+    harness : str
+        Name of the harness playing the games; part of every key
+
+    play() may be called from several threads at once (see
+    run_match._run_matches); the hits and misses counters are updated under
+    a lock.
+    """
+    def __init__(self, directory, refresh=False, harness="fork"):
+        self.directory = directory
+        self.refresh = refresh
+        self.harness = harness
+        self.hits = self.misses = 0
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def cacheable(self, match):
+        """ Whether the result of match can be reproduced: not when its moves
+        are timed on the wall clock and unseeded """
+        wall_clock = self.harness == "fork" and match.clock is None and match.node_budget is None
+        return not (wall_clock and match.seed is None)
+
+    def key(self, match):
+        """ Return the hex SHA-256 key of a run_match.Match """
+        for agent in match.players:
+            if agent not in self._fingerprints:
+                self._fingerprints[agent] = agent_fingerprint(agent.agent_class)
+        clock = match.clock and (match.clock.step, match.clock.node_cost)
+        memory = match.memory_budget and (match.memory_budget.context_bytes, match.memory_budget.hard_stop,
+                                          match.memory_budget.table_entries)
+        settings = json.dumps([CACHE_VERSION, self.harness, match.time_limit, clock, match.node_budget, memory,
+                               match.seed, match.match_id, encode_state(match.initial_state).hex()])
+        digest = hashlib.sha256(settings.encode())
+        for agent in match.players:
+            digest.update(hashlib.sha256(self._fingerprints[agent].encode()).digest())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, match):
+        """ Return the stored (winner agent, history, match_id) of match, or None """
+        if self.refresh or not self.cacheable(match):
+            return None
+        try:
+            with open(self._path(self.key(match)), "rb") as f:
+                record, = read_games(f)
+        except (OSError, ValueError):
+            return None
+        return match.players[record.winner], record.history, match.match_id
+
+    def put(self, match, result):
+        """ Store the (winner agent, history, match_id) result of match,
+        unless it is not cacheable() """
+        if not self.cacheable(match):
+            return
+        winner = next(i for i, agent in enumerate(match.players) if agent is result[0])
+        data = io.BytesIO()
+        write_games(data, [GameRecord(match.initial_state, result[1], winner)])
+        path = self._path(self.key(match))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = "{}.{}.tmp".format(path, os.getpid())
+        with open(temp, "wb") as f:
+            f.write(data.getvalue())
+        os.replace(temp, path)
+
+    def play(self, match):
+        """ isolation.play() that returns the stored result if there is one """
+        result = self.get(match)
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if result is not None:
+            return result
+        result = play(match)
+        self.put(match, result)
+        return result
@@ -1 +1 @@
-cat heuristics.txt | parallel python run_match.py -r 1 -o MINIMAX -r 1000 -t 1000 -p 2 -f -e {}
\ No newline at end of file
+cat heuristics.txt | parallel python run_match.py -r 1 -o MINIMAX -r 1000 -t 1000 -p 2 -f --result_cache results/games -e {}
\ No newline at end of file
@@ -3,6 +3,7 @@
 ###############################################################################
 import argparse
 import datetime
+import functools
 import logging
 import math
 import os
@@ -11,12 +12,20 @@ import textwrap
 
 from collections import namedtuple
 from multiprocessing.pool import ThreadPool as Pool
+from queue import Queue
 
-from isolation import Isolation, Agent, play
-from sample_players import RandomPlayer, GreedyPlayer, MinimaxPlayer
+from isolation import Isolation, Agent, HarnessTrace, MemoryBudget, VirtualClock, play
+from sample_players import RandomPlayer, GreedyPlayer, MinimaxPlayer, AlphaBetaMinimaxPlayer
 
 import my_custom_player
 from my_custom_player import CustomPlayer
+from codec import GameRecord, register_pickle, write_games
+from features import FEATURES
+from league import League, run_league
+from profiling import MODES, MoveProfiler
+from result_cache import ResultCache
+from scheduler import run_cooperative
+from search_cache import SearchCache
 
 
 logger = logging.getLogger(__name__)
@@ -28,45 +37,150 @@ TIME_LIMIT = 150  # number of milliseconds before timeout
 TEST_AGENTS = {
     "RANDOM": Agent(RandomPlayer, "Random Agent"),
     "GREEDY": Agent(GreedyPlayer, "Greedy Agent"),
-    "MINIMAX": Agent(MinimaxPlayer, "Minimax Agent"),
+    "MINIMAX": Agent(AlphaBetaMinimaxPlayer, "Minimax Agent"),  # same moves as MinimaxPlayer, only faster
+    "MINIMAX_REFERENCE": Agent(MinimaxPlayer, "Reference Minimax Agent"),
     "SELF": Agent(CustomPlayer, "Custom TestAgent")
 }
 
-Match = namedtuple("Match", "players initial_state time_limit match_id debug_flag")
+Match = namedtuple("Match", "players initial_state time_limit match_id debug_flag clock node_budget seed trace "
+                   "profiler memory_budget", defaults=(None, None, None, None, None, None))
 
 
-def _run_matches(matches, name, num_processes=NUM_PROCS, debug=False):
+def _run_matches(matches, name, num_processes=NUM_PROCS, debug=False, fair_matches=False, record=None,
+                 result_cache=None):
+    """ Play all matches on one pool of workers. If fair_matches is set, the
+    fair mirror of each game is queued on the same pool as soon as the
+    original game finishes, so no worker idles waiting for a second phase.
+    If record is a binary file, every finished game is appended to it as a
+    codec.GameRecord. Games stored in result_cache (a
+    result_cache.ResultCache) are not played again.
+    """
     results = []
+    finished = Queue()
     pool = Pool(1) if debug else Pool(num_processes)
-    print("Running {} games:".format(len(matches)))
-    for result in pool.imap_unordered(play, matches):
-        print("+" if result[0].name == name else '-', end="")
-        results.append(result)
+
+    def submit(match, is_original):
+        pool.apply_async(play if result_cache is None else result_cache.play, (match,),
+                         callback=lambda result: finished.put((is_original, match, result)),
+                         error_callback=lambda err: finished.put((None, match, err)))
+
+    print("Running {} games:".format(len(matches) * (1 + int(fair_matches))))
+    for match in matches:
+        submit(match, True)
+    pending = len(matches)
+    try:
+        while pending:
+            is_original, match, result = finished.get()
+            pending -= 1
+            if is_original is None:
+                raise result
+            print("+" if result[0].name == name else '-', end="", flush=True)
+            results.append(result)
+            if record is not None:
+                _record_game(record, match, result)
+            if fair_matches and is_original:
+                fair_match = make_fair_match(match, result[1])
+                if fair_match is not None:
+                    submit(fair_match, False)
+                    pending += 1
+    finally:
+        pool.terminate()
     print()
     return results
 
 
-def make_fair_matches(matches, results):
-    new_matches = []
-    for _, game_history, match_id in results:
-        if len(game_history) < 2:
-            logger.warn(textwrap.dedent("""\
-                Unable to duplicate match {}
-                -- one of the players forfeit at the first move
-                """.format(match_id)))
+def _record_game(record, match, result):
+    """ Append the result of a finished match to record as a codec.GameRecord """
+    winner = next((i for i, agent in enumerate(match.players) if agent is result[0]), None)
+    write_games(record, [GameRecord(match.initial_state, result[1], winner)])
+
+
+def _run_cooperative(matches, name, num_processes=NUM_PROCS, fair_matches=False, record=None, result_cache=None):
+    """ Same as _run_matches(), but every process interleaves its share of
+    the games on a scheduler.CooperativeScheduler; the fair mirror of a
+    game is started on the same scheduler as soon as the game finishes """
+    print("Running {} games cooperatively:".format(len(matches) * (1 + int(fair_matches))))
+    games, to_play = [], []
+    for match in matches:
+        result = None if result_cache is None else result_cache.get(match)
+        if result is None:
+            to_play.append(match)
             continue
-        match = matches[match_id]
-        state = Isolation().result(game_history[0]).result(game_history[1])
-        fair_match = Match(players=match.players[::-1],
-                          initial_state=state,
-                          time_limit=match.time_limit,
-                          match_id=-match.match_id,
-                          debug_flag=match.debug_flag)
-        new_matches.append(fair_match)
-    return new_matches
-
-
-def play_matches(custom_agent, test_agent, cli_args):
+        games.append((match, result))
+        mirror = _fair_follow_up(match, result[1]) if fair_matches else None
+        if mirror is not None:
+            mirror_result = result_cache.get(mirror)
+            if mirror_result is None:
+                to_play.append(mirror)
+            else:
+                games.append((mirror, mirror_result))
+    if result_cache is not None:
+        result_cache.hits += len(games)
+    if to_play:
+        if fair_matches:
+            results, added = run_cooperative(to_play, num_processes, follow_up=_fair_follow_up)
+            played = list(zip(to_play, results)) + added
+        else:
+            played = list(zip(to_play, run_cooperative(to_play, num_processes)))
+        if result_cache is not None:
+            for match, result in played:
+                result_cache.put(match, result)
+            result_cache.misses += len(played)
+        games += played
+    for match, result in games:
+        print("+" if result[0].name == name else '-', end="")
+        if record is not None:
+            _record_game(record, match, result)
+    print()
+    return [result for _, result in games]
+
+
+def _fair_follow_up(match, game_history):
+    """ make_fair_match() of a game from the empty board; the mirror of a
+    game that started after the opening moves is not defined """
+    if match.initial_state.ply_count:
+        return None
+    return make_fair_match(match, game_history)
+
+
+def make_fair_match(match, game_history):
+    """ Return the mirror of a finished match: the players swap initiative and
+    start from the position after the first two moves of game_history, or
+    None if either player forfeit on its first move.
+    """
+    if len(game_history) < 2:
+        logger.warn(textwrap.dedent("""\
+            Unable to duplicate match {}
+            -- one of the players forfeit at the first move
+            """.format(match.match_id)))
+        return None
+    state = Isolation().result(game_history[0]).result(game_history[1])
+    return Match(players=match.players[::-1],
+                 initial_state=state,
+                 time_limit=match.time_limit,
+                 match_id=-match.match_id,
+                 debug_flag=match.debug_flag,
+                 clock=match.clock,
+                 node_budget=match.node_budget,
+                 seed=match.seed,
+                 trace=match.trace,
+                 profiler=match.profiler,
+                 memory_budget=match.memory_budget)
+
+
+def make_clock(cli_args):
+    """ Return a new VirtualClock for one match if -c or --node_cost is set """
+    if cli_args.virtual_clock is None and cli_args.node_cost is None: return None
+    return VirtualClock(step=(cli_args.virtual_clock or 0) / 1000, node_cost=(cli_args.node_cost or 0) / 1e6)
+
+
+def make_memory_budget(cli_args):
+    """ Return the MemoryBudget of --context_limit and --table_limit, or None """
+    if cli_args.context_limit is None and cli_args.table_limit is None: return None
+    return MemoryBudget(cli_args.context_limit, cli_args.hard_stop, cli_args.table_limit)
+
+
+def play_matches(custom_agent, test_agent, cli_args, trace=None, profiler=None, record=None, result_cache=None):
     """ Play a specified number of rounds between two agents. Each round
     consists of two games, and each player plays as first player in one
     game and second player in the other. (This mitigates "unfair" games
@@ -78,6 +192,12 @@ def play_matches(custom_agent, test_agent, cli_args):
     player a victory. Playing "fair" matches this way will balance out the
     advantage of picking perfect openings (the player would win the first
     time, and then lose when their opponent uses that move against them).
+
+    If trace is a HarnessTrace, the harness overhead of every move is
+    recorded into it; a profiler (profiling.MoveProfiler) profiles the
+    search of every move. Games are appended to the binary file record
+    (see codec.write_games) if it is given, and games stored in
+    result_cache (see result_cache.py) are not played again.
     """
     matches = []
     for match_id in range(cli_args.rounds):
@@ -87,36 +207,124 @@ def play_matches(custom_agent, test_agent, cli_args):
             initial_state=state,
             time_limit=cli_args.time_limit,
             match_id=2 * match_id,
-            debug_flag=cli_args.debug))
+            debug_flag=cli_args.debug,
+            clock=make_clock(cli_args),
+            node_budget=cli_args.node_budget,
+            seed=cli_args.seed,
+            trace=trace,
+            profiler=profiler,
+            memory_budget=make_memory_budget(cli_args)))
         matches.append(Match(
             players=(custom_agent, test_agent),
             initial_state=state,
             time_limit=cli_args.time_limit,
             match_id=2 * match_id + 1,
-            debug_flag=cli_args.debug))
-
-    # Run all matches -- must be done before fair matches in order to populate
-    # the first move from each player; these moves are reused in the fair matches
-    results = _run_matches(matches, custom_agent.name, cli_args.processes)
+            debug_flag=cli_args.debug,
+            clock=make_clock(cli_args),
+            node_budget=cli_args.node_budget,
+            seed=cli_args.seed,
+            trace=trace,
+            profiler=profiler,
+            memory_budget=make_memory_budget(cli_args)))
 
-    if cli_args.fair_matches:
-        _matches = make_fair_matches(matches, results)
-        results.extend(_run_matches(_matches, custom_agent.name, cli_args.processes))
+    # Each fair match reuses the first move from each player of its original
+    # match, so it is queued on the shared pool once that original finishes
+    run = _run_cooperative if cli_args.cooperative else _run_matches
+    results = run(matches, custom_agent.name, cli_args.processes, fair_matches=cli_args.fair_matches,
+                  record=record, result_cache=result_cache)
 
     wins = sum(int(r[0].name == custom_agent.name) for r in results)
     return wins, len(matches) * (1 + int(cli_args.fair_matches))
 
 
+LEAGUE_AGENTS = ("RANDOM", "GREEDY", "MINIMAX")
+
+
+def league_entrants():
+    """ The sample agents and one CustomPlayer per HEURISTICS_FUNCTIONS entry """
+    entrants = [TEST_AGENTS[name] for name in LEAGUE_AGENTS]
+    for name, heuristic in my_custom_player.HEURISTICS_FUNCTIONS.items():
+        entrants.append(Agent(functools.partial(CustomPlayer, heuristic=heuristic), "Custom Agent " + name))
+    return entrants
+
+
+def play_league(cli_args, trace=None, profiler=None, record=None):
+    """ Rate the league entrants with cli_args.league games (see league.py)
+    and return the League; games use the same settings as play_matches() """
+    def make_match(players, match_id):
+        return Match(players=players, initial_state=Isolation(), time_limit=cli_args.time_limit,
+                     match_id=match_id, debug_flag=cli_args.debug, clock=make_clock(cli_args),
+                     node_budget=cli_args.node_budget, seed=cli_args.seed, trace=trace, profiler=profiler,
+                     memory_budget=make_memory_budget(cli_args))
+
+    def finished(match, result):
+        print(".", end="", flush=True)
+        if record is not None:
+            _record_game(record, match, result)
+
+    league = League(league_entrants(), seed=cli_args.seed)
+    print("Running up to {} league games:".format(cli_args.league))
+    run_league(league, make_match, cli_args.league, 1 if cli_args.debug else cli_args.processes,
+               target_rd=cli_args.target_rd, callback=finished)
+    print()
+    return league
+
+
+def heuristic_arg(value):
+    """ argparse type for -e: a registered heuristic name or a feature expression """
+    try:
+        my_custom_player.get_heuristic(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            "{!r} is not a registered heuristic name; as an expression: {}".format(value, err))
+    return value
+
+
 def main(args):
     test_agent = TEST_AGENTS[args.opponent.upper()]
     custom_agent = Agent(CustomPlayer, "Custom Agent")
-    wins, num_games = play_matches(custom_agent, test_agent, args)
+    if args.search_cache:
+        custom_agent = Agent(functools.partial(CustomPlayer, cache=SearchCache(args.search_cache)), "Custom Agent")
+    trace = HarnessTrace(memory=args.trace_memory) if args.trace or args.trace_memory else None
+    profiler = None
+    if args.profile:
+        output = args.profile_output or "./results/{}_profile.{}".format(
+            datetime.datetime.now().strftime("%Y%m%d_%H%M%S"), "prof" if args.profile == "cprofile" else "collapsed")
+        profiler = MoveProfiler(output, args.profile, agent_class=CustomPlayer)
+    record = open(args.record, "ab") if args.record else None
+    result_cache = None
+    if args.result_cache:
+        result_cache = ResultCache(args.result_cache, refresh=args.refresh,
+                                   harness="cooperative" if args.cooperative else "fork")
+    try:
+        if args.league:
+            league = play_league(args, trace, profiler, record)
+        else:
+            wins, num_games = play_matches(custom_agent, test_agent, args, trace, profiler, record, result_cache)
+    finally:
+        if record is not None: record.close()
 
-    logger.info("Your agent won {:.1f}% of matches against {}".format(
-       100. * wins / num_games, test_agent.name))
-    print("Your agent won {:.1f}% of matches against {}".format(
-       100. * wins / num_games, test_agent.name))
+    if args.league:
+        logger.info("League ranking:\n" + league.format_ranking())
+        print(league.format_ranking())
+    else:
+        logger.info("Your agent won {:.1f}% of matches against {}".format(
+           100. * wins / num_games, test_agent.name))
+        print("Your agent won {:.1f}% of matches against {}".format(
+           100. * wins / num_games, test_agent.name))
     print()
+    if result_cache is not None:
+        logger.info("Result cache: {} games reused, {} played".format(result_cache.hits, result_cache.misses))
+        print("Result cache: {} games reused, {} played".format(result_cache.hits, result_cache.misses))
+    if trace is not None:
+        logger.info("Harness overhead per move:\n" + trace.format_summary())
+        print("Harness overhead per move ({} moves):".format(len(trace.records)))
+        print(trace.format_summary())
+        print()
+    if profiler is not None:
+        moves = profiler.merge()
+        logger.info("Profile of {} moves written to {}".format(moves, profiler.output))
+        print("Profile of {} moves written to {}".format(moves, profiler.output))
 
 
 if __name__ == "__main__":
@@ -134,6 +342,29 @@ if __name__ == "__main__":
             - Run 100 rounds (100 rounds = 200 games) against the minimax agent with 1 process:
 
                 $python run_match.py -r 100
+
+            - Run 100 rounds with a budget of 20000 nodes per move, reproducibly on any machine:
+
+                $python run_match.py -r 100 -n 20000 -s 1 -p 8
+
+            - Run 100 rounds with a custom weighted heuristic (no new function needed):
+
+                $python run_match.py -r 100 -e "own_liberties - 2 * opp_liberties - distance / 4"
+
+            - Profile the custom agent over 10 rounds and inspect the hottest functions:
+
+                $python run_match.py -r 10 --profile cprofile --profile_output custom.prof
+                $python -m pstats custom.prof
+
+            - Run 100 rounds on 4 processes without a process per move, each process
+              interleaving the searches of its games:
+
+                $python run_match.py -r 100 -p 4 --cooperative
+
+            - Rank the sample agents and every registered heuristic in at most 600 games,
+              stopping once all rating deviations are below 60:
+
+                $python run_match.py --league 600 --target_rd 60 -n 20000 -s 1 -p 8
         """)
     )
     parser.add_argument(
@@ -145,6 +376,21 @@ if __name__ == "__main__":
             terminating your code.
         """
     )
+    parser.add_argument(
+        '-c', '--virtual_clock', type=float, default=None, metavar='STEP_MS',
+        help="""\
+            Run the agents in-process against a simulated clock that advances STEP_MS
+            milliseconds on every queue.put(). Time limits are enforced on that clock,
+            so timeouts are deterministic and nothing waits for real time to pass.
+        """
+    )
+    parser.add_argument(
+        '--node_cost', type=float, default=None, metavar='US',
+        help="""\
+            Charge US microseconds of simulated time for every node an agent searches
+            (implies the virtual clock of -c), so time limits cut searches off mid-move.
+        """
+    )
     parser.add_argument(
         '-f', '--fair_matches', action="store_true",
         help="""\
@@ -164,6 +410,120 @@ if __name__ == "__main__":
             or more--in order to increase the confidence in your results.
         """
     )
+    parser.add_argument(
+        '-n', '--node_budget', type=int, default=None,
+        help="""\
+            Give each agent a budget of searched nodes per move instead of a time limit
+            (-t then only sets a generous safety timeout). Combined with --seed, results
+            do not depend on the speed or load of the machine, so -p can use every core.
+        """
+    )
+    parser.add_argument(
+        '-s', '--seed', type=int, default=None,
+        help="""\
+            Reseed the agents' random number generators before every move from this seed,
+            the match id and the ply count, making node-budget matches reproducible.
+        """
+    )
+    parser.add_argument(
+        '--cooperative', action="store_true",
+        help="""\
+            Play all games of each process in one thread, interleaving the agents'
+            searches (see scheduler.py) instead of starting a process per move. Time
+            limits then apply to the CPU time of each search. Not combinable with
+            -c, --node_cost, --trace, --profile or --league.
+        """
+    )
+    parser.add_argument(
+        '--trace', action="store_true",
+        help="""\
+            Time the harness phases of every move (process start, pickling, queue puts,
+            join, get) next to the search itself, log them with the game records and
+            print percentile summaries at the end.
+        """
+    )
+    parser.add_argument(
+        '--trace_memory', action="store_true",
+        help="""\
+            Like --trace, and also measure the pickled context size, the tracemalloc peak
+            of every move's search and the peak RSS of its process (inherited from the harness
+            when forked), to size -p against the RAM of the machine. Tracing allocations
+            slows the searches down.
+        """
+    )
+    parser.add_argument(
+        '--context_limit', type=int, default=None, metavar='BYTES',
+        help="""\
+            Warn when an agent puts a context that pickles to more than BYTES bytes; it is
+            sent back through the Pipe with every queue.put().
+        """
+    )
+    parser.add_argument(
+        '--hard_stop', action="store_true",
+        help="Refuse contexts over --context_limit instead: the search stops as on a timeout."
+    )
+    parser.add_argument(
+        '--table_limit', type=int, default=None, metavar='ENTRIES',
+        help="""\
+            Maximum entries of each table an agent keeps across moves (see
+            sample_players.BoundedTable); only agents that keep such tables use it, which
+            none of the sample agents or CustomPlayer does.
+        """
+    )
+    parser.add_argument(
+        '--profile', choices=MODES, default=None,
+        help="""\
+            Profile every move of the custom agent inside its search process, either
+            deterministically (cprofile, a pstats file) or by sampling the call stack
+            (sample, collapsed stacks for flame graphs), and merge all moves into one file.
+        """
+    )
+    parser.add_argument(
+        '--profile_output', type=str, default=None, metavar='FILE',
+        help="File for the merged profile (default: a timestamped file in ./results/)."
+    )
+    parser.add_argument(
+        '--record', type=str, default=None, metavar='FILE',
+        help="""\
+            Append every finished game (initial state, moves and winner) to FILE in the
+            compact binary format of codec.py, e.g. for reanalysis of the positions.
+        """
+    )
+    parser.add_argument(
+        '--result_cache', type=str, default=None, metavar='DIR',
+        help="""\
+            Store every finished game in DIR, keyed by a hash of the players' source and
+            heuristics, the modules they use, the time limit, clock, node budget, seed,
+            match id and initial state, and reuse stored games instead of playing them again
+            (see result_cache.py). Games on the wall clock need --seed to be stored. Moves
+            of reused games are not traced or profiled.
+        """
+    )
+    parser.add_argument(
+        '--refresh', action="store_true",
+        help="Play every game again and overwrite its stored result in --result_cache."
+    )
+    parser.add_argument(
+        '--search_cache', type=str, default=None, metavar='FILE',
+        help="""\
+            Share the search results of the custom agent across moves, games and processes
+            through the memory-mapped cache FILE (see search_cache.py); the file is created
+            if needed and kept for later runs with the same heuristic.
+        """
+    )
+    parser.add_argument(
+        '--league', type=int, default=None, metavar='GAMES',
+        help="""\
+            Instead of matches against one opponent, rate the sample agents and a custom
+            agent per registered heuristic with Glicko ratings in up to GAMES games. Each
+            next game pairs the entrants whose ratings are the most uncertain (-o and -e
+            are ignored).
+        """
+    )
+    parser.add_argument(
+        '--target_rd', type=float, default=None, metavar='RD',
+        help="Stop the league early once every rating deviation is at most RD."
+    )
     parser.add_argument(
         '-o', '--opponent', type=str, default='MINIMAX', choices=list(TEST_AGENTS.keys()),
         help="""\
@@ -185,14 +545,29 @@ if __name__ == "__main__":
         help="Set the maximum allowed time (in milliseconds) for each call to agent.get_action()."
     )
     parser.add_argument(
-        '-e', '--heuristics', type=str, default='heuristics_liberties', choices=list(my_custom_player.HEURISTICS_FUNCTIONS.keys()),
+        '-e', '--heuristics', type=heuristic_arg, default='heuristics_liberties',
         help="""\
-            Choose the heuristics function for the custom player MINIMAX algorithm
-        """
+            Choose the heuristics function for the custom player MINIMAX algorithm:
+            either a name from my_custom_player.HEURISTICS_FUNCTIONS or a weighted sum
+            of features, e.g. "own_liberties - opp_liberties - distance / 2".
+            Features: {}
+        """.format(", ".join(FEATURES))
     )
 
     args = parser.parse_args()
-    my_custom_player.HEURISTIC_FUNC = my_custom_player.HEURISTICS_FUNCTIONS[args.heuristics]
+    if args.cooperative and (args.virtual_clock is not None or args.node_cost is not None or args.trace or
+                             args.trace_memory or args.context_limit is not None or args.table_limit is not None
+                             or args.profile or args.league):
+        parser.error("--cooperative cannot be combined with -c, --node_cost, --trace, --trace_memory, "
+                     "--context_limit, --table_limit, --profile or --league")
+    if args.hard_stop and args.context_limit is None:
+        parser.error("--hard_stop needs --context_limit")
+    if args.refresh and args.result_cache is None:
+        parser.error("--refresh needs --result_cache")
+    if args.result_cache and args.league:
+        parser.error("--result_cache cannot be combined with --league")
+    register_pickle()  # states cross the search process pipes in the compact codec format
+    my_custom_player.HEURISTIC_FUNC = my_custom_player.get_heuristic(args.heuristics)
 
     logging.basicConfig(filename="./results/" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + str(my_custom_player.HEURISTIC_FUNC.__name__) + ".log", filemode="w", level=logging.DEBUG)
     logging.info(
@@ -203,6 +578,21 @@ if __name__ == "__main__":
         "Time Limit: {}\n".format(args.time_limit) +
         "Processes: {}\n".format(args.processes) +
         "Debug Mode: {}\n".format(args.debug) +
+        "Virtual Clock Step: {}\n".format(args.virtual_clock) +
+        "Virtual Node Cost: {}\n".format(args.node_cost) +
+        "Node Budget: {}\n".format(args.node_budget) +
+        "Seed: {}\n".format(args.seed) +
+        "Cooperative: {}\n".format(args.cooperative) +
+        "Trace: {}\n".format(args.trace) +
+        "Trace Memory: {}\n".format(args.trace_memory) +
+        "Context Limit: {}{}\n".format(args.context_limit, " (hard stop)" if args.hard_stop else "") +
+        "Table Limit: {}\n".format(args.table_limit) +
+        "Profile: {}\n".format(args.profile) +
+        "Record: {}\n".format(args.record) +
+        "Result Cache: {}{}\n".format(args.result_cache, " (refresh)" if args.refresh else "") +
+        "Search Cache: {}\n".format(args.search_cache) +
+        "League Games: {}\n".format(args.league) +
+        "League Target RD: {}\n".format(args.target_rd) +
         "Custom Player Heuristics Function: {}\n".format(str(my_custom_player.HEURISTIC_FUNC.__name__)) + 
         "-------------------------------------------------------------------\n"
     )
@@ -5,10 +5,20 @@ import logging
 import pickle
 import random
 
+from collections import OrderedDict
+
+from isolation import StopSearch
+from bitboard import NEIGHBORS, NEIGHBOR_MASKS, popcount
+
 logger = logging.getLogger(__name__)
 
 
 class BasePlayer:
+    nodes = 0  # nodes searched during the current turn (reset by the harness)
+    node_budget = float("inf")  # set by the harness in fixed-node matches
+    node_clock = None  # set by the harness when a VirtualClock charges time per node
+    table_limit = None  # entries per table kept across moves (a hook, see MemoryBudget); set by the harness
+
     def __init__(self, player_id):
         self.player_id = player_id
         self.timer = None
@@ -23,6 +33,56 @@ class BasePlayer:
         """
         raise NotImplementedError
 
+    def count_node(self):
+        """ Count one searched node and stop the search (like a timeout) once
+        the node budget assigned by the harness is spent, or once the time
+        limit has passed on a VirtualClock that charges time per node. The
+        harness's node_clock sees every node, including the one past the
+        budget.
+        """
+        self.nodes += 1
+        if self.node_clock is not None:
+            self.node_clock()
+        if self.nodes > self.node_budget:
+            raise StopSearch
+
+
+class BoundedTable(OrderedDict):
+    """ Dict of at most limit entries (None: unbounded) that evicts the
+    least recently stored or read entry; reads through [], get() and `in`
+    all count. Size tables kept in self.context with the table_limit
+    handed by the harness:
+
+        if self.context is None:
+            self.context = BoundedTable(self.table_limit)
+    """
+    def __init__(self, limit=None):
+        super().__init__()
+        self.limit = limit
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        if super().__contains__(key):
+            return self[key]
+        return default
+
+    def __contains__(self, key):
+        if super().__contains__(key):
+            self.move_to_end(key)
+            return True
+        return False
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if self.limit is not None:
+            while len(self) > self.limit:
+                self.popitem(last=False)
+
 
 class DataPlayer(BasePlayer):
     def __init__(self, player_id):
@@ -45,6 +105,7 @@ class RandomPlayer(BasePlayer):
             An instance of `isolation.Isolation` encoding the current state of the
             game (e.g., player locations and blocked cells)
         """
+        self.count_node()
         self.queue.put(random.choice(state.actions()))
 
 
@@ -53,6 +114,7 @@ class GreedyPlayer(BasePlayer):
     equivalent to a minimax search agent with a search depth of one.
     """
     def score(self, state):
+        self.count_node()
         own_loc = state.locs[self.player_id]
         own_liberties = state.liberties(own_loc)
         return len(own_liberties)
@@ -110,6 +172,7 @@ class MinimaxPlayer(BasePlayer):
     def minimax(self, state, depth):
 
         def min_value(state, depth):
+            self.count_node()
             if state.terminal_test(): return state.utility(self.player_id)
             if depth <= 0: return self.score(state)
             value = float("inf")
@@ -118,6 +181,7 @@ class MinimaxPlayer(BasePlayer):
             return value
 
         def max_value(state, depth):
+            self.count_node()
             if state.terminal_test(): return state.utility(self.player_id)
             if depth <= 0: return self.score(state)
             value = float("-inf")
@@ -133,3 +197,81 @@ class MinimaxPlayer(BasePlayer):
         own_liberties = state.liberties(own_loc)
         opp_liberties = state.liberties(opp_loc)
         return len(own_liberties) - len(opp_liberties)
+
+
+class AlphaBetaMinimaxPlayer(MinimaxPlayer):
+    """ Drop-in replacement for MinimaxPlayer that returns exactly the same
+    move in every position, but searches with alpha-beta pruning on raw
+    bitboards instead of creating an Isolation state per node.
+
+    Root moves are searched in state.actions() order and only a strictly
+    better score replaces the current choice, which reproduces the
+    first-wins tie breaking of max() in MinimaxPlayer.minimax(). A root
+    move that fails low can only score <= the current best, so pruning
+    never changes the chosen move.
+
+    Leaves are scored with self.score(); the liberties difference of
+    MinimaxPlayer.score() is read straight from the bitboard unless a
+    subclass overrides score().
+    """
+    def minimax(self, state, depth):
+        player_id = self.player_id
+        inf = float("inf")
+        fast_score = type(self).score is MinimaxPlayer.score
+        state_class = type(state)
+
+        def has_liberties(board, loc):
+            # Isolation._has_liberties() uses any(), which ignores index 0
+            return bool(board & NEIGHBOR_MASKS[loc] & ~1)
+
+        def evaluate(board, locs, ply, depth):
+            """ utility() for terminal states, score() at the depth limit, else None """
+            own, opp = locs[player_id], locs[1 - player_id]
+            if not (has_liberties(board, own) and has_liberties(board, opp)):
+                active = ply % 2
+                active_wins = has_liberties(board, locs[active])
+                return inf if active_wins == (player_id == active) else -inf
+            if depth <= 0:
+                if fast_score:
+                    return popcount(board & NEIGHBOR_MASKS[own]) - popcount(board & NEIGHBOR_MASKS[opp])
+                return self.score(state_class(board, ply, locs))
+            return None
+
+        def min_value(board, locs, ply, depth, alpha, beta):
+            self.count_node()
+            value = evaluate(board, locs, ply, depth)
+            if value is not None: return value
+            value = inf
+            active = ply % 2
+            for target in NEIGHBORS[locs[active]]:
+                if board & (1 << target):
+                    child_locs = (locs[0], target) if active else (target, locs[1])
+                    value = min(value, max_value(board ^ (1 << target), child_locs, ply + 1, depth - 1, alpha, beta))
+                    if value <= alpha: return value
+                    beta = min(beta, value)
+            return value
+
+        def max_value(board, locs, ply, depth, alpha, beta):
+            self.count_node()
+            value = evaluate(board, locs, ply, depth)
+            if value is not None: return value
+            value = -inf
+            active = ply % 2
+            for target in NEIGHBORS[locs[active]]:
+                if board & (1 << target):
+                    child_locs = (locs[0], target) if active else (target, locs[1])
+                    value = max(value, min_value(board ^ (1 << target), child_locs, ply + 1, depth - 1, alpha, beta))
+                    if value >= beta: return value
+                    alpha = max(alpha, value)
+            return value
+
+        best_action, best_value = None, None
+        active = state.player()
+        for action in state.actions():
+            target = state.locs[active] + action
+            child_locs = (state.locs[0], target) if active else (target, state.locs[1])
+            alpha = -inf if best_value is None else best_value
+            value = min_value(state.board ^ (1 << target), child_locs, state.ply_count + 1, depth - 1, alpha, inf)
+            if best_value is None or value > best_value:
+                best_action, best_value = action, value
+        return best_action
@@ -0,0 +1,247 @@
+"""Cooperative scheduler: many games' searches interleaved in one process
+
+fork_get_action() starts a process for every move. A CooperativeScheduler
+instead plays many games in one thread and interleaves their searches:
+agents that define iter_action(state), a generator-style variant of
+get_action(), do a slice of their search, queue.put() their best action so
+far and yield; the scheduler then resumes the next game's search. Agents
+without iter_action() run get_action() as a single slice.
+
+Each move is limited by the CPU time spent in its own search (time.thread_time
+around every slice), not by wall time, so interleaving many games does not
+make anyone time out. The limit is also enforced inside a slice: the
+scheduler hands agents a node_clock (see BasePlayer.count_node) that raises
+StopSearch once the move's CPU time is spent. As with a timeout in
+fork_get_action(), the last action put before that is played.
+
+A seeded move reseeds the agent's random generator and, like
+fork_get_action(), the global random module. Since other games' slices
+run in between, every move keeps its own state of the global generator,
+which is swapped in around each of its slices.
+
+run_cooperative() splits matches over one scheduler process per core:
+
+    >>> results = run_cooperative(matches, processes=4)
+"""
+import logging
+import random
+import time
+
+from copy import deepcopy
+from multiprocessing import Pool
+
+from isolation import StopSearch
+
+
+logger = logging.getLogger(__name__)
+
+CHECK_EVERY = 64  # nodes between two CPU time checks inside a slice
+
+
+class _MoveQueue:
+    """ Keeps the last (context, action) pair put by an agent within its
+    move's CPU time; later puts are ignored, like TimedQueue's """
+    def __init__(self, move):
+        self.move = move
+        self.agent = None
+        self.item = None
+
+    def put(self, action, block=True, timeout=None):
+        if self.move.elapsed() <= self.move.limit:
+            self.item = (getattr(self.agent, "context", None), action)
+
+    put_nowait = put
+
+
+class _Move:
+    """ The search of one move: a generator of slices and its CPU time """
+    def __init__(self, agent, state, time_limit, node_budget=None, seed=None):
+        self.agent = agent
+        self.queue = _MoveQueue(self)
+        self.queue.agent = agent
+        self.cpu_time = 0.
+        self.limit = time_limit / 1000
+        self.failed = False
+        agent.queue = self.queue
+        agent.nodes = 0
+        agent.node_budget = float("inf") if node_budget is None else node_budget
+        agent.node_clock = self._check
+        self._random_state = None  # this move's global random state, if seeded
+        if seed is not None:
+            saved = random.getstate()
+            random.seed(seed)
+            self._random_state = random.getstate()
+            random.setstate(saved)
+            if isinstance(getattr(agent, "random", None), random.Random):
+                agent.random.seed(seed)
+        if hasattr(agent, "iter_action"):
+            self.slices = agent.iter_action(state)
+        else:
+            self.slices = self._single_slice(state)
+        self._slice_start = None
+
+    def _single_slice(self, state):
+        self.agent.get_action(state)
+        yield
+
+    def elapsed(self):
+        """ CPU seconds spent in this move's search so far """
+        return self.cpu_time + time.thread_time() - self._slice_start
+
+    def _check(self):
+        if self.agent.nodes % CHECK_EVERY == 0 and self.elapsed() > self.limit:
+            raise StopSearch
+
+    def step(self):
+        """ Run one slice; returns False once the move is finished """
+        if self._random_state is not None:
+            saved = random.getstate()
+            random.setstate(self._random_state)
+        self._slice_start = time.thread_time()
+        try:
+            next(self.slices)
+            running = True
+        except (StopIteration, StopSearch):
+            running = False
+        except Exception:
+            logger.exception("search of {} failed".format(self.agent))
+            self.failed = True  # like an exception in fork_get_action(): the agent loses
+            running = False
+        finally:
+            self.cpu_time += time.thread_time() - self._slice_start
+            if self._random_state is not None:
+                self._random_state = random.getstate()
+                random.setstate(saved)
+        if running and self.cpu_time > self.limit:
+            self.slices.close()
+            running = False
+        return running
+
+
+class _Game:
+    def __init__(self, match):
+        self.match = match
+        self.state = match.initial_state
+        self.players = [agent.agent_class(player_id=i) for i, agent in enumerate(match.players)]
+        self.history = []
+        self.winner = None
+        self.move = None
+
+    def start_move(self):
+        """ Start the next move; returns False if the game is over """
+        if self.state.terminal_test():
+            active = self.state.player()
+            self.winner = active if self.state.utility(active) > 0 else 1 - active
+            return False
+        player = self.players[self.state.player()]
+        player.queue = None
+        seed = self.match.seed
+        move_seed = None if seed is None else "{}:{}:{}".format(seed, self.match.match_id, self.state.ply_count)
+        self.move = _Move(deepcopy(player), self.state, self.match.time_limit, self.match.node_budget, move_seed)
+        return True
+
+    def finish_move(self):
+        """ Play the action of the finished move; returns False if the game is over """
+        active = self.state.player()
+        move, self.move = self.move, None
+        item = move.queue.item
+        if move.failed or item is None or item[1] not in self.state.actions():
+            self.winner = 1 - active  # timeout or invalid move: the active player loses
+            return False
+        self.players[active].context, action = item
+        self.state = self.state.result(action)
+        self.history.append(action)
+        return True
+
+
+class CooperativeScheduler:
+    """ Round-robin over the searches of many games in the calling thread
+
+    Parameters
+    ----------
+    matches : iterable
+        run_match.Match tuples; players, initial_state, time_limit,
+        match_id, node_budget and seed are used
+
+    max_games : int, optional
+        Number of games played at once (default: all)
+
+    follow_up : callable, optional
+        follow_up(match, history) is called when a game of matches ends;
+        a match it returns is started next on this scheduler (e.g.
+        run_match.make_fair_match), so it does not wait for a second batch
+    """
+    def __init__(self, matches, max_games=None, follow_up=None):
+        self.matches = list(matches)
+        self.max_games = max_games or len(self.matches)
+        self.follow_up = follow_up
+
+    def run(self):
+        """ Play all matches; returns (winner index, history, match_id) per
+        match, in the order of self.matches, which ends with the matches
+        added by follow_up """
+        num_matches = len(self.matches)
+        results = [None] * num_matches
+        waiting = list(enumerate(self.matches))[::-1]
+        active = []
+
+        def finished(index, game):
+            results[index] = (game.winner, game.history, game.match.match_id)
+            if self.follow_up is not None and index < num_matches:
+                match = self.follow_up(game.match, game.history)
+                if match is not None:
+                    self.matches.append(match)
+                    results.append(None)
+                    waiting.append((len(self.matches) - 1, match))
+
+        while waiting or active:
+            while waiting and len(active) < self.max_games:
+                index, match = waiting.pop()
+                game = _Game(match)
+                if game.start_move():
+                    active.append((index, game))
+                else:
+                    finished(index, game)
+            still_active = []
+            for index, game in active:
+                if game.move.step() or (game.finish_move() and game.start_move()):
+                    still_active.append((index, game))
+                else:
+                    finished(index, game)
+            active = still_active
+        return results
+
+
+def _run_share(matches, follow_up=None):
+    """ Return (the matches added by follow_up, the results of all matches) """
+    scheduler = CooperativeScheduler(matches, follow_up=follow_up)
+    results = scheduler.run()
+    return scheduler.matches[len(matches):], results
+
+
+def run_cooperative(matches, processes=1, follow_up=None):
+    """ Play matches on one CooperativeScheduler per process; returns
+    (winner agent, history, match_id) per match like isolation.play()
+
+    With follow_up (see CooperativeScheduler), returns (results, added)
+    instead, where added lists a (match, result) pair for every game that
+    follow_up added; follow_up must be picklable if processes > 1.
+    """
+    matches = list(matches)
+    shares = [matches[i::processes] for i in range(processes)]
+    if processes == 1:
+        share_results = [_run_share(matches, follow_up)]
+    else:
+        with Pool(processes) as pool:
+            share_results = pool.starmap(_run_share, [(share, follow_up) for share in shares])
+    results = [None] * len(matches)
+    added = []
+    for i, (share_added, share) in enumerate(share_results):
+        share_matches = matches[i::processes] + share_added
+        for j, (match, (winner, history, match_id)) in enumerate(zip(share_matches, share)):
+            result = (match.players[winner], history, match_id)
+            if j < len(share) - len(share_added):
+                results[i + j * processes] = result
+            else:
+                added.append((match, result))
+    return results if follow_up is None else (results, added)
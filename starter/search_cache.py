@@ -0,0 +1,181 @@
+"""Persistent search cache in a memory-mapped hash file
+
+A SearchCache stores the results of CustomPlayer searches (position, depth,
+bound, value and best move) in a fixed-size file that every process of a
+sweep maps into memory, so positions searched in one game or process are
+not searched again in the next. The file is an open-addressing table of
+fixed-width entries: an entry lives in one of the PROBES slots after the
+hash of its key, and a store replaces the shallowest of those entries when
+they are all taken.
+
+Entries are written without any lock. Every entry starts with a CRC32 of
+the rest of it, and a reader copies the entry before checking it, so an
+entry torn by two processes writing the same slot at once reads as a miss.
+Every entry also carries a tag of the heuristic, of the source code of the
+heuristic and of its incremental scorer, and of CACHE_VERSION (see
+heuristic_tag()), so the values of another or an edited heuristic, or of
+an older search, are never used.
+
+    >>> cache = SearchCache("search.cache")
+    >>> player = CustomPlayer(0, cache=cache)
+
+or run_match.py --search_cache search.cache.
+"""
+import hashlib
+import inspect
+import mmap
+import os
+import struct
+import zlib
+
+from codec import encode_state
+
+
+CACHE_VERSION = 1  # bump when the search changes the meaning of stored values
+DEFAULT_ENTRIES = 1 << 20
+PROBES = 4
+
+EMPTY, EXACT, LOWER, UPPER = range(4)  # bound of a stored value
+NO_MOVE = -0x8000
+
+_MAGIC = b"ISOCACHE"
+_HEADER = struct.Struct("<8sII")  # magic, entry size, number of entries
+_ENTRY = struct.Struct("<II18sBBBBh8s")  # crc32, tag, state, depth, bound, player, is float, move, value
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+
+_open_files = {}  # (pid, path) -> (file, mmap), shared by the SearchCaches of a process
+_tags = {}  # (heuristic, scorer) -> tag; sources do not change while a process runs
+
+
+def source_of(obj):
+    """ Source code of a class or function; composed heuristics (see
+    features.compose) have no file, but a source attribute """
+    if getattr(obj, "source", None) is not None:
+        return obj.source
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return "{}.{}".format(getattr(obj, "__module__", ""), getattr(obj, "__qualname__", repr(obj)))
+
+
+def heuristic_tag(heuristic, scorer=None):
+    """ Return the 32-bit tag of the entries stored by searches with heuristic
+
+    The tag covers the qualified name and the source of heuristic and of
+    scorer, its IncrementalEvaluator equivalent if it has one (see
+    my_custom_player.INCREMENTAL_HEURISTICS), so editing either one retires
+    the entries stored before.
+    """
+    key = (heuristic, scorer)
+    if key not in _tags:
+        name = "{}.{}".format(getattr(heuristic, "__module__", ""), getattr(heuristic, "__qualname__", heuristic))
+        sources = "\n".join(source_of(obj) for obj in (heuristic, scorer) if obj is not None)
+        digest = hashlib.sha256(sources.encode()).hexdigest()
+        _tags[key] = zlib.crc32("{}:{}:{}".format(CACHE_VERSION, name, digest).encode())
+    return _tags[key]
+
+
+def _map(path, entries):
+    """ Return the (file, mmap) of a cache file, creating it with `entries` slots if needed """
+    key = (os.getpid(), os.path.abspath(path))
+    if key not in _open_files:
+        if not os.path.exists(path):
+            # create the file under a temporary name and link it in place, so
+            # no process ever maps a file whose header is not written yet
+            temp = "{}.{}.tmp".format(path, os.getpid())
+            with open(temp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _ENTRY.size, entries))
+                f.truncate(_HEADER.size + entries * _ENTRY.size)
+            try:
+                os.link(temp, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temp)
+        f = open(path, "r+b")
+        magic, entry_size, entries = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or entry_size != _ENTRY.size:
+            f.close()
+            raise ValueError("{} is not a search cache of this version".format(path))
+        _open_files[key] = (f, mmap.mmap(f.fileno(), _HEADER.size + entries * _ENTRY.size))
+    return _open_files[key]
+
+
+class SearchCache:
+    """ Search results shared through a memory-mapped file
+
+    Parameters
+    ----------
+    path : str
+        Cache file; created if it does not exist
+
+    entries : int
+        Number of slots of a new file (an existing file keeps its size)
+
+    Pickling a SearchCache (e.g. deepcopy() in isolation.play() debug mode)
+    keeps the path only; the copy maps the file again.
+    """
+    def __init__(self, path, entries=DEFAULT_ENTRIES):
+        self.path = path
+        _, self._mmap = _map(path, entries)
+        self.entries = (len(self._mmap) - _HEADER.size) // _ENTRY.size
+        self.hits = self.misses = self.stores = 0
+
+    def __getstate__(self):
+        return {"path": self.path, "entries": self.entries}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["entries"])
+
+    def _slots(self, key, depth, player):
+        digest = hashlib.blake2b(key + bytes((depth, player)), digest_size=8).digest()
+        first = int.from_bytes(digest, "little") % self.entries
+        return [_HEADER.size + (first + i) % self.entries * _ENTRY.size for i in range(PROBES)]
+
+    def _read(self, offset):
+        """ Return the fields of the entry at offset, or None if it is empty or torn """
+        entry = self._mmap[offset:offset + _ENTRY.size]
+        fields = _ENTRY.unpack(entry)
+        if fields[4] == EMPTY or fields[0] != zlib.crc32(entry[4:]):
+            return None
+        return fields
+
+    def probe(self, state, depth, player, tag):
+        """ Return (bound, value, move) stored for the search of state to
+        depth from player's view, or None; move is None if not stored """
+        key = encode_state(state)
+        for offset in self._slots(key, depth, player):
+            fields = self._read(offset)
+            if fields is not None and fields[1:4] == (tag, key, depth) and fields[5] == player:
+                self.hits += 1
+                bound, _, is_float, move, value = fields[4:]
+                value = (_FLOAT if is_float else _INT).unpack(value)[0]
+                return bound, value, None if move == NO_MOVE else move
+        self.misses += 1
+        return None
+
+    def store(self, state, depth, player, tag, bound, value, move=None):
+        """ Store a search result, replacing the entry of the same search or
+        the shallowest entry of the probed slots """
+        key = encode_state(state)
+        slots = self._slots(key, depth, player)
+        target, target_depth = None, None
+        for offset in slots:
+            fields = self._read(offset)
+            if fields is None or fields[1] != tag or (fields[2:4] == (key, depth) and fields[5] == player):
+                target = offset
+                break
+            if target is None or fields[3] < target_depth:
+                target, target_depth = offset, fields[3]
+        is_float = isinstance(value, float)
+        body = _ENTRY.pack(0, tag, key, depth, bound, player, is_float, NO_MOVE if move is None else move,
+                           (_FLOAT if is_float else _INT).pack(value))[4:]
+        self._mmap[target:target + _ENTRY.size] = struct.pack("<I", zlib.crc32(body)) + body
+        self.stores += 1
+
+    def stats(self):
+        """ Hits, misses and stores of this process, and the used slots of the file """
+        used = sum(self._read(_HEADER.size + i * _ENTRY.size) is not None for i in range(self.entries))
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores,
+                "used": used, "entries": self.entries}
@@ -0,0 +1,232 @@
+"""Batched random-game simulator on NumPy arrays
+
+random_games() plays random games the scalar way, one Isolation.result()
+and actions() call per move. simulate() advances thousands of random games
+in lockstep instead: every game starts at ply 0, so all live games are at
+the same ply and the same player moves in all of them. Boards are stored as
+two 64-bit words per game (the 115-bit Isolation.board), and the legal
+moves of every game come from one lookup in the precomputed TARGETS table
+(the cell reached by each of the eight knight moves from every cell, -1 if
+off the board) and one bit test per target. Games follow the rules of
+Isolation exactly, including its terminal test: a player whose only
+liberty is cell 0 has none (see Isolation._has_liberties).
+
+The result holds the length and winner of every game and, on request, the
+moves, which records() turns into codec.GameRecords for position corpora.
+
+    $python simulate.py -n 100000 --compare 2000
+
+NumPy is optional for the rest of the repository; without it this module
+imports, and simulate() raises ImportError.
+"""
+import argparse
+import random
+import textwrap
+import time
+
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from codec import GameRecord
+from isolation import Isolation
+from isolation.isolation import Action, _BLANK_BOARD, _SIZE
+
+
+SimulationResult = namedtuple("SimulationResult", "lengths winners moves")
+SimulationResult.__doc__ = """ Outcome of simulate()
+
+lengths: numpy.ndarray
+    Number of moves of every game
+
+winners: numpy.ndarray
+    Winning player (0 moved first) of every game
+
+moves: list or None
+    moves[ply] is the (game indices, cell) arrays of the moves made at
+    that ply, if simulate() was asked to record them
+"""
+
+CELLS = tuple(c for c in range(_SIZE) if _BLANK_BOARD >> c & 1)
+_WORD = 64
+
+
+def random_games(num_games, seed=0):
+    """ Play random games with Isolation; returns (lengths, winners) lists """
+    rng = random.Random(seed)
+    lengths, winners = [], []
+    for _ in range(num_games):
+        state = Isolation()
+        while not state.terminal_test():
+            state = state.result(rng.choice(state.actions()))
+        active = state.player()
+        lengths.append(state.ply_count)
+        winners.append(active if state.utility(active) > 0 else 1 - active)
+    return lengths, winners
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the batched simulator needs NumPy (pip install numpy)")
+
+
+_tables = None
+
+
+def _get_tables():
+    """ Return the (TARGETS, CELLS, blank board words) arrays, built once """
+    global _tables
+    if _tables is None:
+        _require_numpy()
+        targets = np.full((_SIZE, len(Action)), -1, dtype=np.int64)
+        for c in range(_SIZE):
+            for i, a in enumerate(Action):
+                if 0 <= c + a < _SIZE and _BLANK_BOARD >> (c + a) & 1:
+                    targets[c, i] = c + a
+        mask = (1 << _WORD) - 1
+        words = np.array([_BLANK_BOARD & mask, _BLANK_BOARD >> _WORD], dtype=np.uint64)
+        _tables = targets, np.array(CELLS, dtype=np.int64), words
+    return _tables
+
+
+def _open(boards, cells):
+    """ Bool array: is cells[g, j] (>= 0) open on boards[g]? """
+    rows = np.arange(len(boards))[:, None]
+    words = boards[rows, cells >> 6]
+    return ((words >> (cells & (_WORD - 1)).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _legal(boards, locs, targets):
+    """ (targets, legal mask) of the knight moves from locs in every game """
+    t = targets[locs]
+    return t, (t >= 0) & _open(boards, np.maximum(t, 0))
+
+
+def simulate(num_games, seed=0, record=False):
+    """ Play num_games random games in lockstep; returns a SimulationResult """
+    targets, cells, blank = _get_tables()
+    rng = np.random.default_rng(seed)
+    lengths = np.zeros(num_games, dtype=np.int64)
+    winners = np.zeros(num_games, dtype=np.int64)
+    moves = [] if record else None
+    # boards and locations of the live games only; live maps them to game indices
+    live = np.arange(num_games)
+    boards = np.tile(blank, (num_games, 1))
+    locs = np.full((num_games, 2), -1, dtype=np.int64)
+    ply = 0
+    while len(live):
+        player = ply % 2
+        if ply < 2:  # opening moves: any open cell; unplaced players have liberties
+            choices = np.broadcast_to(cells, (len(live), len(cells)))
+            legal = _open(boards, choices)
+        else:
+            choices, legal = _legal(boards, locs[:, player], targets)
+            # Isolation._has_liberties() is any(liberties), so cell 0 alone is no liberty
+            has = [None, None]
+            has[player] = (legal & (choices > 0)).any(axis=1)
+            t, other = _legal(boards, locs[:, 1 - player], targets)
+            has[1 - player] = (other & (t > 0)).any(axis=1)
+            over = ~(has[0] & has[1])
+            if over.any():
+                ended = live[over]
+                lengths[ended] = ply
+                winners[ended] = np.where(has[player][over], player, 1 - player)
+                keep = ~over
+                live, boards, locs = live[keep], boards[keep], locs[keep]
+                choices, legal = choices[keep], legal[keep]
+                if not len(live): break
+
+        keys = np.where(legal, rng.random(choices.shape), -1.)
+        cell = choices[np.arange(len(live)), keys.argmax(axis=1)]
+        boards[np.arange(len(live)), cell >> 6] ^= np.uint64(1) << (cell & (_WORD - 1)).astype(np.uint64)
+        locs[:, player] = cell
+        if record:
+            moves.append((live, cell))
+        ply += 1
+    return SimulationResult(lengths, winners, moves)
+
+
+def records(result):
+    """ Return the recorded games of a SimulationResult as codec.GameRecords """
+    if result.moves is None:
+        raise ValueError("simulate() was not asked to record the moves")
+    histories = [[] for _ in range(len(result.lengths))]
+    locs = [[None, None] for _ in histories]
+    for ply, (games, cells) in enumerate(result.moves):
+        for game, cell in zip(games.tolist(), cells.tolist()):
+            loc = locs[game][ply % 2]
+            histories[game].append(cell if loc is None else Action(cell - loc))
+            locs[game][ply % 2] = cell
+    return [GameRecord(Isolation(), history, int(winner))
+            for history, winner in zip(histories, result.winners.tolist())]
+
+
+def opening_stats(result):
+    """ Return {first cell: (games, first player wins)} of a recorded result """
+    games, cells = result.moves[0]
+    stats = {}
+    for cell, winner in zip(cells.tolist(), result.winners[games].tolist()):
+        played, won = stats.get(cell, (0, 0))
+        stats[cell] = (played + 1, won + int(winner == 0))
+    return stats
+
+
+def main(args):
+    tic = time.perf_counter()
+    result = simulate(args.games, args.seed, record=args.record is not None or args.openings)
+    seconds = time.perf_counter() - tic
+    moves = int(result.lengths.sum())
+    print("batched: {} games, {} moves in {:.2f}s ({:.0f} games/s, {:.0f} moves/s)".format(
+        args.games, moves, seconds, args.games / seconds, moves / seconds))
+    if args.compare:
+        tic = time.perf_counter()
+        lengths, _ = random_games(args.compare, args.seed)
+        scalar = time.perf_counter() - tic
+        print("scalar:  {} games, {} moves in {:.2f}s ({:.0f} games/s, {:.0f} moves/s)".format(
+            args.compare, sum(lengths), scalar, args.compare / scalar, sum(lengths) / scalar))
+        print("speedup: {:.1f}x games/s".format((args.games / seconds) / (args.compare / scalar)))
+    print("first player wins {:.2f}%".format(100. * float(np.mean(result.winners == 0))))
+    counts = np.bincount(result.lengths)
+    print("game length: mean {:.2f}, p10 {}, p50 {}, p90 {}".format(
+        float(result.lengths.mean()), *(int(np.percentile(result.lengths, p)) for p in (10, 50, 90))))
+    for length in np.flatnonzero(counts):
+        print("    {:>3} {:>8} {}".format(length, counts[length], "#" * int(60 * counts[length] / counts.max())))
+    if args.openings:
+        stats = sorted(opening_stats(result).items(), key=lambda item: -item[1][1] / item[1][0])
+        print("best and worst first moves (cell: first player win rate):")
+        for cell, (played, won) in stats[:5] + stats[-5:]:
+            print("    {:>3}: {:.3f} of {}".format(cell, won / played, played))
+    if args.record:
+        from codec import write_games
+        with open(args.record, "ab") as f:
+            write_games(f, records(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Simulate random games in NumPy batches (needs NumPy).",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Simulate 100000 random games, compare with 2000 scalar games and show the
+              first-move statistics:
+
+                $python simulate.py -n 100000 --compare 2000 --openings
+
+            - Write a corpus of 10000 random games for tuning.py --from:
+
+                $python simulate.py -n 10000 --record random.bin
+        """)
+    )
+    parser.add_argument('-n', '--games', type=int, default=10000)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('--compare', type=int, default=0, metavar='GAMES',
+                        help="Also play GAMES scalar games and report the speedup.")
+    parser.add_argument('--openings', action="store_true", help="Report win rates per first move.")
+    parser.add_argument('--record', type=str, default=None, metavar='FILE',
+                        help="Append the games to FILE (see codec.py).")
+    main(parser.parse_args())
@@ -0,0 +1,192 @@
+"""Search depth and time limit scaling study
+
+The numbers behind plots/search_depth.png were typed in by hand. study()
+plays CustomPlayer against a sample agent for every combination of
+max_depth and time limit, with all games of all settings queued on one
+shared pool, and measures per setting:
+
+  - win_rate: fraction of the games won
+  - mean_depth: mean depth whose best move was played (0 if only the
+    fallback random move made it before the time limit)
+  - nodes_per_second: searched nodes over search time
+  - timeout_rate: fraction of moves that did not finish the search to
+    max_depth within the time limit
+
+Games run through isolation.fork_get_action() exactly like run_match.py
+games, so the time limits are real and the results belong to the machine
+they ran on. With iterative=True the player deepens from depth 1 and puts
+the best move of every finished depth, so a timeout costs depth instead
+of the whole search. The rows are written as a tidy CSV, one row per
+setting, for notebooks/plots.ipynb:
+
+    $python study.py --depths 1 2 3 4 5 --time_limits 50 150 500 -r 20 -p 8 --output results/study.csv
+"""
+import argparse
+import csv
+import itertools
+import textwrap
+import time
+
+from multiprocessing.pool import ThreadPool
+from queue import Empty
+
+from isolation import Isolation, fork_get_action
+from my_custom_player import CustomPlayer, get_heuristic
+from run_match import TEST_AGENTS
+
+
+REPORT_EVERY = 4096  # nodes between two progress reports of a StudyPlayer
+FIELDS = ("max_depth", "time_limit", "iterative", "opponent", "games", "wins", "win_rate", "moves", "mean_depth",
+          "nodes_per_second", "timeout_rate")
+
+
+class _ReportingQueue:
+    """ Sets the agent's context to its search progress before every put """
+    def __init__(self, agent, queue):
+        self.agent = agent
+        self.queue = queue
+
+    def put(self, action, block=True, timeout=None):
+        self.agent.best = action
+        self.agent.context = {"depth": self.agent.depth_reached, "nodes": self.agent.nodes,
+                              "seconds": time.perf_counter() - self.agent.start,
+                              "cpu_seconds": time.process_time() - self.agent.cpu_start}
+        self.queue.put(action)
+
+    put_nowait = put
+
+
+class StudyPlayer(CustomPlayer):
+    """ CustomPlayer whose context reports the depth, nodes, search time and
+    CPU time of the move, refreshed every REPORT_EVERY nodes; the report of
+    the last put before the time limit is the one the harness gets back """
+    def get_action(self, state):
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.best = None
+        self.queue = _ReportingQueue(self, self.queue)
+        super().get_action(state)
+
+    def count_node(self):
+        super().count_node()
+        if self.nodes % REPORT_EVERY == 0 and self.best is not None:
+            self.queue.put(self.best)  # raises StopSearch after the time limit
+
+
+def play_game(job):
+    """ Play one game; job is (setting, opponent name, game index, seed) or
+    (setting, opponent name, game index, seed, heuristic) and setting is
+    (max_depth, time_limit, iterative). heuristic is a HEURISTICS_FUNCTIONS
+    name or feature expression (default: HEURISTIC_FUNC). Returns (setting,
+    won, [context of every searched move]) """
+    setting, opponent, index, seed, *heuristic = job
+    max_depth, time_limit, iterative = setting
+    heuristic = get_heuristic(heuristic[0]) if heuristic and heuristic[0] else None
+    players = [StudyPlayer(0, heuristic=heuristic, max_depth=max_depth, iterative=iterative),
+               TEST_AGENTS[opponent].agent_class(1)]
+    if index % 2:
+        players = players[::-1]
+        for i, player in enumerate(players):
+            player.player_id = player.player = i
+    state = Isolation()
+    reports = []
+    while not state.terminal_test():
+        active = state.player()
+        player = players[active]
+        player.context = None
+        move_seed = None if seed is None else "{}:{}:{}".format(seed, index, state.ply_count)
+        try:
+            action = fork_get_action(state, player, time_limit, seed=move_seed)
+        except Empty:
+            action = None
+        if isinstance(player, StudyPlayer) and state.ply_count >= 2:
+            reports.append(player.context or {"depth": 0, "nodes": 0, "seconds": 0., "cpu_seconds": 0.})
+        if action not in state.actions():
+            return setting, not isinstance(player, StudyPlayer), reports  # no or invalid move: active player loses
+        state = state.result(action)
+    winner = players[active] if state.utility(active) > 0 else players[1 - active]
+    return setting, isinstance(winner, StudyPlayer), reports
+
+
+def summarize(setting, opponent, games):
+    """ Return the CSV row of a setting from its play_game() results """
+    max_depth, time_limit, iterative = setting
+    reports = [report for _, _, game_reports in games for report in game_reports]
+    wins = sum(won for _, won, _ in games)
+    seconds = sum(report["seconds"] for report in reports)
+    return {"max_depth": max_depth, "time_limit": time_limit, "iterative": int(iterative), "opponent": opponent,
+            "games": len(games), "wins": wins, "win_rate": wins / len(games) if games else None,
+            "moves": len(reports),
+            "mean_depth": sum(r["depth"] for r in reports) / len(reports) if reports else None,
+            "nodes_per_second": sum(r["nodes"] for r in reports) / seconds if seconds else None,
+            "timeout_rate": sum(r["depth"] < max_depth for r in reports) / len(reports) if reports else None}
+
+
+def study(depths, time_limits, games_per_setting, opponent="MINIMAX", iterative=False, processes=1, seed=None,
+          callback=None):
+    """ Play games_per_setting games for every (depth, time limit), all
+    queued on one pool that plays `processes` games at once; returns the
+    summarize() rows, in the order of the settings. callback(setting, won)
+    is called after every game. """
+    settings = [(depth, time_limit, iterative) for depth, time_limit in itertools.product(depths, time_limits)]
+    jobs = [(setting, opponent, index, seed) for index in range(games_per_setting) for setting in settings]
+    games = {setting: [] for setting in settings}
+    with ThreadPool(processes) as pool:
+        for setting, won, reports in pool.imap_unordered(play_game, jobs):
+            games[setting].append((setting, won, reports))
+            if callback is not None:
+                callback(setting, won)
+    return [summarize(setting, opponent, games[setting]) for setting in settings]
+
+
+def write_csv(rows, filename):
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(args):
+    print("Playing {} games:".format(len(args.depths) * len(args.time_limits) * args.rounds))
+    rows = study(args.depths, args.time_limits, args.rounds, args.opponent.upper(), args.iterative,
+                 args.processes, args.seed, callback=lambda setting, won: print("+" if won else "-", end="",
+                                                                                flush=True))
+    print()
+    write_csv(rows, args.output)
+    print("{:>6} {:>8} {:>9} {:>11} {:>13} {:>9}".format("depth", "time ms", "win rate", "mean depth",
+                                                       "nodes/s", "timeouts"))
+    for row in rows:
+        print("{:>6} {:>8} {:>9.3f} {:>11} {:>13} {:>9}".format(
+            row["max_depth"], row["time_limit"], row["win_rate"],
+            *("n/a" if row[key] is None else format(row[key], spec)
+              for key, spec in (("mean_depth", ".2f"), ("nodes_per_second", ".0f"), ("timeout_rate", ".3f")))))
+    print("Wrote {}".format(args.output))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Sweep the search depth and time limit of the custom agent.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - 20 games per setting of depths 1-5 and time limits 50, 150 and 500 ms against
+              the minimax agent, on 8 threads:
+
+                $python study.py --depths 1 2 3 4 5 --time_limits 50 150 500 -r 20 -p 8
+
+            - The same with iterative deepening up to each depth:
+
+                $python study.py --depths 2 4 6 8 --time_limits 150 -r 20 -p 8 --iterative
+        """)
+    )
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3, 4, 5], help="max_depth values.")
+    parser.add_argument('--time_limits', type=int, nargs='+', default=[150], help="Time limits in milliseconds.")
+    parser.add_argument('-r', '--rounds', type=int, default=10, help="Games per setting.")
+    parser.add_argument('-o', '--opponent', type=str, default='MINIMAX', choices=list(TEST_AGENTS.keys()))
+    parser.add_argument('--iterative', action="store_true", help="Deepen iteratively up to max_depth.")
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help="Games played at once; every move still searches in its own process.")
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('--output', type=str, default="./results/study.csv", metavar='FILE')
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+
+import unittest
+
+from bitboard import flood_layers, popcount, voronoi
+from features import compose
+
+from tests.test_incremental import random_states
+
+
+def bfs_distances(state, loc):
+    """ Reference knight-move distances from loc using Isolation.liberties() """
+    distances, frontier, depth = {}, [loc], 0
+    while frontier:
+        depth += 1
+        frontier = {c for f in frontier for c in state.liberties(f) if c not in distances}
+        for c in frontier:
+            distances[c] = depth
+    return distances
+
+
+def to_cells(bitboard):
+    return {c for c in range(bitboard.bit_length()) if bitboard & (1 << c)}
+
+
+class FloodFillTest(unittest.TestCase):
+    def setUp(self):
+        self.states = [s for s in random_states(6, seed=5) if None not in s.locs][::3]
+
+    def test_layers_match_bfs(self):
+        """ flood_layers() matches a cell-by-cell breadth-first search """
+        for state in self.states:
+            for loc in state.locs:
+                distances = bfs_distances(state, loc)
+                layers = flood_layers(state.board, loc)
+                self.assertEqual(len(layers), max(distances.values(), default=0))
+                for depth, layer in enumerate(layers, 1):
+                    self.assertEqual(to_cells(layer), {c for c, d in distances.items() if d == depth})
+
+    def test_voronoi_matches_bfs(self):
+        """ voronoi() assigns each cell to the player with the strictly shorter distance """
+        for state in self.states:
+            own, opp = (bfs_distances(state, loc) for loc in state.locs)
+            inf = float("inf")
+            cells = set(own) | set(opp)
+            own_first, opp_first = voronoi(state.board, *state.locs)
+            self.assertEqual(to_cells(own_first), {c for c in cells if own.get(c, inf) < opp.get(c, inf)})
+            self.assertEqual(to_cells(opp_first), {c for c in cells if opp.get(c, inf) < own.get(c, inf)})
+
+    def test_area_features(self):
+        area = compose("own_area - opp_area")
+        for state in self.states:
+            own, opp = (len(bfs_distances(state, loc)) for loc in state.locs)
+            self.assertEqual(area(state, 0), own - opp)
+
+
+class PopcountTest(unittest.TestCase):
+    def test_popcount(self):
+        for value in (0, 1, 0b1011, (1 << 114) | 1, (1 << 115) - 1):
+            self.assertEqual(popcount(value), bin(value).count("1"))
@@ -0,0 +1,65 @@
+
+import copyreg
+import io
+import pickle
+import unittest
+
+from random import Random
+
+from isolation import Isolation
+from codec import (GameRecord, STATE_BYTES, decode_actions, decode_state, decode_states, encode_actions,
+                   encode_state, encode_states, read_games, register_pickle, write_games)
+
+from tests.test_incremental import random_states
+
+
+def random_games(num_games, seed=0):
+    rng = Random(seed)
+    for i in range(num_games):
+        state = Isolation()
+        history = []
+        while not state.terminal_test():
+            action = rng.choice(state.actions())
+            history.append(action)
+            state = state.result(action)
+        yield GameRecord(Isolation(), history, i % 2 if i % 3 else None)
+
+
+class CodecTest(unittest.TestCase):
+    def test_states_round_trip(self):
+        states = list(random_states(10, seed=9))
+        for state in states[:50]:
+            data = encode_state(state)
+            self.assertEqual(len(data), STATE_BYTES)
+            self.assertEqual(decode_state(data), state)
+        data = encode_states(states)
+        self.assertEqual(len(data), STATE_BYTES * len(states))
+        decoded = decode_states(data)
+        self.assertEqual(decoded, states)
+        self.assertTrue(all(type(s) is Isolation for s in decoded))
+        with self.assertRaises(ValueError):
+            decode_states(data[:-1])
+
+    def test_actions_round_trip(self):
+        """ opening moves decode to cell indices and later moves to Actions """
+        for record in random_games(5, seed=1):
+            self.assertEqual(decode_actions(encode_actions(record.history)), record.history)
+            self.assertEqual(decode_actions(encode_actions(record.history[3:]), 3), record.history[3:])
+
+    def test_game_files(self):
+        records = list(random_games(20, seed=2))
+        f = io.BytesIO()
+        write_games(f, records)
+        f.seek(0)
+        self.assertEqual(list(read_games(f)), records)
+        with self.assertRaises(ValueError):
+            list(read_games(io.BytesIO(f.getvalue()[:-1])))
+
+    def test_register_pickle(self):
+        self.addCleanup(copyreg.dispatch_table.pop, Isolation, None)
+        state = Isolation().result(3).result(40)
+        default = pickle.dumps(state)
+        register_pickle()
+        compact = pickle.dumps(state)
+        self.assertLess(len(compact), len(default))
+        self.assertEqual(pickle.loads(compact), state)
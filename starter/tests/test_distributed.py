@@ -0,0 +1,91 @@
+
+import asyncio
+import json
+import socket
+import threading
+import unittest
+
+from multiprocessing import Process
+
+from distributed import Coordinator, describe_match, match_from_description, run_worker
+from isolation import Isolation
+
+
+def _worker(port, slots):
+    run_worker("127.0.0.1", port, slots)
+
+
+def _crashing_worker(port):
+    """ take one job and drop the connection without answering """
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.sendall(json.dumps({"type": "ready"}).encode() + b"\n")
+        sock.makefile().readline()
+
+
+class CoordinatorTest(unittest.TestCase):
+    def run_coordinator(self, coordinator, workers, crashing=0):
+        """ serve in a thread; start the worker processes once the port is known,
+        after `crashing` workers that each take one job and drop it """
+        started = threading.Event()
+        outcome = []
+
+        async def serve():
+            await coordinator.start()
+            started.set()
+            outcome.append(await coordinator.wait())
+
+        thread = threading.Thread(target=asyncio.run, args=(serve(),))
+        thread.start()
+        started.wait(10)
+        for _ in range(crashing):
+            p = Process(target=_crashing_worker, args=(coordinator.port,))
+            p.start()
+            p.join(10)
+        processes = [Process(target=_worker, args=(coordinator.port, slots)) for slots in workers]
+        for p in processes:
+            p.start()
+        thread.join(60)
+        for p in processes:
+            p.join(10)
+        self.assertFalse(thread.is_alive())
+        return outcome[0]
+
+    def descriptions(self, num_games):
+        return [describe_match(("GREEDY", "RANDOM")[::1 - 2 * (i % 2)], i, clock=(0., 0.), seed=i)
+                for i in range(num_games)]
+
+    def test_description_roundtrip(self):
+        state = Isolation().result(40).result(60)
+        description = json.loads(json.dumps(describe_match(("CUSTOM:heuristics_liberties", "MINIMAX"), 3,
+                                                           state, clock=(0.001, 0.), node_budget=100)))
+        match = match_from_description(description)
+        self.assertEqual(match.initial_state, state)
+        self.assertEqual(match.match_id, 3)
+        self.assertEqual(match.node_budget, 100)
+        self.assertEqual(match.clock.step, 0.001)
+        self.assertEqual(match.players[1].name, "Minimax Agent")
+        self.assertEqual(match.players[0].name, "Custom Agent heuristics_liberties")
+
+    def test_workers(self):
+        """ several worker processes share the games and every game is played once """
+        coordinator = Coordinator(self.descriptions(12))
+        results = self.run_coordinator(coordinator, [1, 2, 1])
+        self.assertEqual(coordinator.attempts, [1] * 12)
+        for game in results:
+            state = game.initial_state
+            for action in game.history:
+                state = state.result(action)
+            self.assertTrue(state.terminal_test())
+            self.assertEqual(state.utility(game.winner), float("inf"))
+
+    def test_retry_after_worker_dies(self):
+        """ the game taken by a dead worker is replayed by another one """
+        coordinator = Coordinator(self.descriptions(4))
+        results = self.run_coordinator(coordinator, [1], crashing=1)
+        self.assertNotIn(None, results)
+        self.assertEqual(sum(coordinator.attempts), 5)
+
+    def test_max_attempts(self):
+        coordinator = Coordinator(self.descriptions(1), max_attempts=1)
+        results = self.run_coordinator(coordinator, [], crashing=1)
+        self.assertEqual(results, [None])
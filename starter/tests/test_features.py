@@ -0,0 +1,56 @@
+
+import unittest
+
+from features import compose, compose_vector, FEATURES
+from my_custom_player import HEURISTICS_FUNCTIONS, get_heuristic
+
+from tests.test_incremental import random_states
+
+
+EQUIVALENT_EXPRESSIONS = {
+    "heuristics_liberties": "own_liberties - opp_liberties",
+    "heuristics_liberties_opponent_only": "-opp_liberties",
+    "heuristics_prioritize_higher_ply_counts": "ply_count",
+    "heuristics_liberties_deep": "own_deep_liberties - opp_deep_liberties",
+    "heuristics_liberties_and_keep_enemy_close_2": "own_liberties - opp_liberties - distance / 2",
+    "heuristics_liberties_and_keep_enemy_close_7": "own_liberties - opp_liberties - 8 * distance",
+    "heuristics_liberties_aggressive": "own_liberties - opp_liberties * 2",
+}
+
+
+class ComposeTest(unittest.TestCase):
+    def test_matches_registered_heuristics(self):
+        """ composed expressions reproduce the hand-written HEURISTICS_FUNCTIONS """
+        states = [s for s in random_states(5, seed=4) if None not in s.locs]
+        for name, expression in EQUIVALENT_EXPRESSIONS.items():
+            func = compose(expression)
+            for state in states:
+                for player in (0, 1):
+                    self.assertAlmostEqual(func(state, player), HEURISTICS_FUNCTIONS[name](state, player),
+                                           msg="{} != {}".format(expression, name))
+
+    def test_features_computed_once(self):
+        """ shared intermediate values are emitted once in the compiled source """
+        func = compose("own_liberties + own_deep_liberties - opp_deep_liberties")
+        self.assertEqual(func.source.count("own_cells = "), 1)
+        self.assertEqual(func.source.count("own_liberties = "), 1)
+        for name in FEATURES:
+            compose(name)  # every feature compiles on its own
+
+    def test_compose_vector(self):
+        names = ("opp_liberties", "own_deep_liberties", "distance")
+        vector = compose_vector(names)
+        for state in [s for s in random_states(10, seed=3) if None not in s.locs]:
+            self.assertEqual(vector(state, 0), tuple(compose(name)(state, 0) for name in names))
+        with self.assertRaises(ValueError):
+            compose_vector(("liberties",))
+
+    def test_rejects_invalid_expressions(self):
+        for expression in ("own_liberties * opp_liberties", "2 / distance", "liberties",
+                           "__import__('os')", "own_liberties +", "own_liberties ** 2"):
+            with self.assertRaises(ValueError, msg=expression):
+                compose(expression)
+
+    def test_get_heuristic(self):
+        self.assertIs(get_heuristic("heuristics_liberties"), HEURISTICS_FUNCTIONS["heuristics_liberties"])
+        self.assertEqual(get_heuristic("ply_count - 1").__doc__, "ply_count - 1")
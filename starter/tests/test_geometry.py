@@ -0,0 +1,62 @@
+
+import pickle
+import unittest
+
+from random import Random
+
+from isolation import Isolation
+from isolation.isolation import Action, _BLANK_BOARD, _SIZE
+from geometry import get_geometry, geometry_of
+from incremental import IncrementalEvaluator
+from my_custom_player import CustomPlayer
+
+KNIGHT_MOVES = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+
+
+def random_game(geometry, seed):
+    rng = Random(seed)
+    state = geometry.initial_state()
+    states = [state]
+    while not state.terminal_test():
+        state = state.result(rng.choice(state.actions()))
+        states.append(state)
+    return states
+
+
+class GeometryTest(unittest.TestCase):
+    def test_standard_geometry(self):
+        geometry = get_geometry()
+        self.assertIs(geometry.state_class, Isolation)
+        self.assertEqual((geometry.blank_board, geometry.size), (_BLANK_BOARD, _SIZE))
+        self.assertEqual(geometry.offsets, tuple(int(a) for a in Action))
+        self.assertIs(geometry_of(Isolation()), geometry)
+
+    def test_moves_are_knight_moves(self):
+        """ actions() on other board sizes are exactly the open cells a knight's move away """
+        for width, height in ((5, 4), (7, 7), (32, 32)):
+            geometry = get_geometry(width, height)
+            self.assertEqual(len(geometry.cells), width * height)
+            xy = {geometry.ind2xy(c): c for c in geometry.cells}
+            for state in random_game(geometry, seed=width)[2::3]:
+                self.assertIs(geometry_of(state), geometry)
+                loc = state.locs[state.player()]
+                x, y = geometry.ind2xy(loc)
+                expected = {xy[x + dx, y + dy] for dx, dy in KNIGHT_MOVES
+                            if (x + dx, y + dy) in xy and state.board & (1 << xy[x + dx, y + dy])}
+                self.assertEqual({loc + a for a in state.actions()}, expected)
+                self.assertEqual(pickle.loads(pickle.dumps(state)), state)
+
+    def test_search_on_large_board(self):
+        geometry = get_geometry(32, 32)
+        states = random_game(geometry, seed=1)
+        evaluator = IncrementalEvaluator(states[0])
+        for state, following in zip(states, states[1:]):
+            action = next(a for a in state.actions() if state.result(a) == following)
+            evaluator.apply(action)
+            self.assertEqual(evaluator.to_state(), following)
+            self.assertEqual(evaluator.terminal_test(), following.terminal_test())
+        agent = CustomPlayer(0)
+        state = states[10]
+        agent.player = state.player()
+        move = agent.get_next_move(state, max_depth=2)
+        self.assertIn(move, state.actions())
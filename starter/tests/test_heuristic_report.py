@@ -0,0 +1,35 @@
+
+import unittest
+
+from benchmarks import sample_positions
+from heuristic_report import evaluation_cost, pareto_frontier, report
+
+
+class HeuristicReportTest(unittest.TestCase):
+    def test_pareto_frontier(self):
+        rows = [{"name": "cheap", "cost_us": 1., "win_rate": 0.4},
+                {"name": "dominated", "cost_us": 2., "win_rate": 0.4},
+                {"name": "strong", "cost_us": 5., "win_rate": 0.7},
+                {"name": "tie", "cost_us": 5., "win_rate": 0.7},
+                {"name": "expensive", "cost_us": 9., "win_rate": 0.6}]
+        self.assertEqual([row["name"] for row in pareto_frontier(rows)], ["cheap", "strong", "tie"])
+
+    def test_evaluation_cost(self):
+        positions = sample_positions(50)
+        self.assertGreater(evaluation_cost("heuristics_liberties_deep", positions),
+                           evaluation_cost("heuristics_liberties", positions))
+        self.assertGreater(evaluation_cost("own_liberties - opp_liberties", positions), 0)
+        self.assertGreater(evaluation_cost("heuristics_prioritize_higher_ply_counts", positions), 0)
+
+    def test_report(self):
+        rows = report(["heuristics_liberties", "heuristics_liberties_deep"], 2, time_limit=30, opponent="RANDOM",
+                      processes=4, positions=sample_positions(20))
+        self.assertEqual(sorted(row["heuristic"] for row in rows), ["heuristics_liberties",
+                                                                     "heuristics_liberties_deep"])
+        self.assertLessEqual(rows[0]["cost_us"], rows[1]["cost_us"])
+        self.assertEqual(rows[0]["pareto"], 1)  # the cheapest heuristic is never dominated
+        for row in rows:
+            self.assertEqual(row["games"], 2)
+            self.assertGreater(row["mean_depth"], 0)
+            self.assertGreater(row["cost_us"], 0)
+            self.assertGreater(row["eval_us"], 0)
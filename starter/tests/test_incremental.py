@@ -0,0 +1,101 @@
+
+import sys
+import unittest
+
+from random import Random
+
+from isolation import Isolation
+from features import compose
+from incremental import IncrementalEvaluator
+from knight_graph import analyze
+from my_custom_player import CustomPlayer, HEURISTICS_FUNCTIONS, INCREMENTAL_HEURISTICS
+import my_custom_player
+
+
+def random_states(num_games, seed=0):
+    """ Yield every state visited in num_games random games """
+    rng = Random(seed)
+    for _ in range(num_games):
+        state = Isolation()
+        yield state
+        while not state.terminal_test():
+            state = state.result(rng.choice(state.actions()))
+            yield state
+
+
+class IncrementalEvaluatorTest(unittest.TestCase):
+    def test_matches_isolation_on_random_games(self):
+        """ apply() tracks result() and the scores match HEURISTICS_FUNCTIONS """
+        rng = Random(1)
+        for _ in range(20):
+            state = Isolation()
+            evaluator = IncrementalEvaluator(state)
+            while not state.terminal_test():
+                action = rng.choice(state.actions())
+                state = state.result(action)
+                evaluator.apply(action)
+                self.assertEqual(evaluator.to_state(), state)
+                self.assertEqual(evaluator.terminal_test(), state.terminal_test())
+                self.assertEqual(sorted(evaluator.actions()), sorted(int(a) for a in state.actions()))
+                for player in (0, 1):
+                    self.assertEqual(evaluator.utility(player), state.utility(player))
+                    if None in state.locs: continue
+                    self.assertEqual(evaluator.liberties_score(player),
+                                     HEURISTICS_FUNCTIONS["heuristics_liberties"](state, player))
+                    self.assertEqual(evaluator.deep_liberties_score(player),
+                                     HEURISTICS_FUNCTIONS["heuristics_liberties_deep"](state, player))
+
+    def test_undo_restores_state(self):
+        """ undo() reverts apply() exactly, including the neighbour counters """
+        for state in random_states(5, seed=2):
+            evaluator = IncrementalEvaluator(state)
+            counters = list(evaluator.open_neighbors)
+            for action in evaluator.actions():
+                evaluator.apply(action)
+                evaluator.undo()
+                self.assertEqual(evaluator.to_state(), state)
+                self.assertEqual(evaluator.open_neighbors, counters)
+
+
+class IncrementalSearchTest(unittest.TestCase):
+    def test_minimax_scores_match(self):
+        """ minimax_incremental() returns the same root scores as minimax() """
+        agent = CustomPlayer(0)
+        heuristic = my_custom_player.HEURISTIC_FUNC
+        states = [s for s in random_states(3, seed=3) if s.ply_count >= 2 and not s.terminal_test()]
+        try:
+            for func, score in INCREMENTAL_HEURISTICS.items():
+                my_custom_player.HEURISTIC_FUNC = func
+                for state in states[::4]:
+                    agent.player = state.player()
+                    evaluator = IncrementalEvaluator(state)
+                    for move in state.actions():
+                        expected = agent.minimax(agent.player, 2, state, move, -sys.maxsize, sys.maxsize)
+                        actual = agent.minimax_incremental(
+                            agent.player, 2, evaluator, move, -sys.maxsize, sys.maxsize, score)
+                        self.assertEqual(actual, expected)
+                        self.assertEqual(evaluator.to_state(), state)
+        finally:
+            my_custom_player.HEURISTIC_FUNC = heuristic
+
+    def test_composed_graph_heuristic(self):
+        """ composed heuristics search the evaluator, with the graph analysis kept in sync """
+        agent = CustomPlayer(0)
+        func = compose("own_liberties - opp_liberties - own_chokepoints + opp_block_area - partitioned")
+        heuristic = my_custom_player.HEURISTIC_FUNC
+        states = [s for s in random_states(2, seed=8) if s.ply_count >= 2 and not s.terminal_test()]
+        try:
+            my_custom_player.HEURISTIC_FUNC = func
+            for state in states[::5]:
+                agent.player = state.player()
+                evaluator = IncrementalEvaluator(state, graph=True)
+                for move in state.actions():
+                    expected = agent.minimax(agent.player, 2, state, move, -sys.maxsize, sys.maxsize)
+                    actual = agent.minimax_incremental(
+                        agent.player, 2, evaluator, move, -sys.maxsize, sys.maxsize, func)
+                    self.assertEqual(actual, expected)
+                    evaluator.apply(move)
+                    self.assertEqual(set(evaluator.graph.regions), set(analyze(evaluator.board)))
+                    evaluator.undo()
+        finally:
+            my_custom_player.HEURISTIC_FUNC = heuristic
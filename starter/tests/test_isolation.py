@@ -0,0 +1,208 @@
+
+import random
+import time
+import unittest
+
+from multiprocessing.reduction import ForkingPickler
+
+from isolation import (Isolation, Agent, HarnessTrace, MemoryBudget, StopSearch, VirtualClock, fork_get_action,
+                       play)
+from sample_players import BasePlayer, BoundedTable, GreedyPlayer, RandomPlayer
+from my_custom_player import CustomPlayer
+
+
+class CountingPlayer(BasePlayer):
+    """ Puts an action forever, the way an iterative deepening agent would """
+    def get_action(self, state):
+        self.context = 0
+        while True:
+            self.context += 1
+            self.queue.put(state.actions()[0])
+
+
+class GrowingPlayer(BasePlayer):
+    """ Puts an action with a context that grows by 1000 bytes per put """
+    def get_action(self, state):
+        self.context = b""
+        for _ in range(10):
+            self.context += bytes(1000)
+            self.queue.put(state.actions()[0])
+
+
+class TablePlayer(BasePlayer):
+    """ Keeps a table of every position it is asked about in its context """
+    def get_action(self, state):
+        if self.context is None:
+            self.context = BoundedTable(self.table_limit)
+        self.context[state] = state.actions()[0]
+        self.queue.put(state.actions()[0])
+
+
+class VirtualClockTest(unittest.TestCase):
+    def test_deadline_is_deterministic(self):
+        """ the time limit is enforced on the virtual clock at every put() """
+        state = Isolation()
+        for _ in range(3):
+            agent = CountingPlayer(0)
+            action = fork_get_action(state, agent, 100, clock=VirtualClock(step=0.015))
+            self.assertEqual(action, state.actions()[0])
+            self.assertEqual(agent.context, 6)  # puts at t=15ms .. 90ms pass, t=105ms stops
+
+    def test_clock_injection(self):
+        """ any callable can stand in for time.perf_counter """
+        clock = VirtualClock()
+        agent = CountingPlayer(0)
+        ticks = iter(range(1000))
+        fork_get_action(Isolation(), agent, 5000, clock=lambda: next(ticks))
+        self.assertEqual(agent.context, 5)
+        clock.advance(2)
+        self.assertEqual(clock(), 2)
+
+    def test_node_cost_interrupts_search(self):
+        """ a clock charging time per node stops a search between two puts """
+        state = Isolation().result(0).result(1)
+        clock = VirtualClock(node_cost=0.001)
+        action = fork_get_action(state, CustomPlayer(0), 5, clock=clock)
+        self.assertIn(action, state.actions())
+        self.assertAlmostEqual(clock.now, 0.006)  # the sixth node passes the 5 ms limit
+
+    def test_game_runs_without_sleeping(self):
+        """ a full game with a virtual clock takes far less than its time limits """
+        agents = (Agent(GreedyPlayer, "Player 1"), Agent(GreedyPlayer, "Player 2"))
+        start = time.perf_counter()
+        winner, history, _ = play((agents, Isolation(), 1000, 0, False, VirtualClock()))
+        self.assertIn(winner, agents)
+        self.assertLess(time.perf_counter() - start, 1000 / 1000 * len(history) / 10)
+
+
+class NodeCountingPlayer(BasePlayer):
+    """ Searches forever, reporting the node count as its context """
+    def get_action(self, state):
+        while True:
+            self.count_node()
+            self.context = self.nodes
+            self.queue.put(state.actions()[0])
+
+
+class RunawayPlayer(BasePlayer):
+    """ Puts one action, then keeps counting nodes past any StopSearch """
+    def get_action(self, state):
+        self.queue.put(state.actions()[0])
+        while True:
+            try:
+                self.count_node()
+            except StopSearch:
+                pass
+
+
+class NodeBudgetTest(unittest.TestCase):
+    def test_budget_stops_search(self):
+        """ the search is stopped after node_budget counted nodes, in or out of process """
+        for clock in (None, VirtualClock()):
+            agent = NodeCountingPlayer(0)
+            fork_get_action(Isolation(), agent, 150, clock=clock, node_budget=500)
+            self.assertEqual(agent.context, 500)
+
+    def test_runaway_search_is_terminated(self):
+        """ a search counting past its node budget is stopped long before PROCESS_TIMEOUT """
+        state = Isolation()
+        start = time.perf_counter()
+        self.assertEqual(fork_get_action(state, RunawayPlayer(0), 150, node_budget=1000), state.actions()[0])
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_seed_leaves_global_random_alone(self):
+        """ an in-process move with a seed restores the harness's global random state """
+        random.seed(5)
+        expected = random.random()
+        random.seed(5)
+        fork_get_action(Isolation(), RandomPlayer(0), 100, clock=VirtualClock(), seed=7)
+        self.assertEqual(random.random(), expected)
+
+    def test_seeded_games_are_reproducible(self):
+        """ node budget + seed replays the same game regardless of timing """
+        agents = (Agent(CustomPlayer, "Player 1"), Agent(RandomPlayer, "Player 2"))
+        histories = [play((agents, Isolation(), 150, 3, False, None, 2000, 42))[1] for _ in range(2)]
+        self.assertEqual(histories[0], histories[1])
+
+
+class HarnessTraceTest(unittest.TestCase):
+    def test_forked_moves_are_traced(self):
+        """ every phase is recorded for a move searched in a child process """
+        trace = HarnessTrace()
+        state = Isolation()
+        for _ in range(3):
+            fork_get_action(state, GreedyPlayer(0), 20, trace=trace)
+        self.assertEqual(len(trace.records), 3)
+        for record in trace.records:
+            self.assertEqual(record["puts"], 1)
+            self.assertGreater(record["put_bytes"], 0)
+            self.assertGreater(record["pickle_bytes"], 0)
+            self.assertGreater(record["start"], 0)
+            self.assertGreaterEqual(record["overhead"], record["setup"] + record["get"])
+        summary = trace.summary()
+        self.assertLessEqual(summary["search"][50], summary["search"][100])
+        self.assertIn("overhead", trace.format_summary())
+
+    def test_in_process_moves_are_traced(self):
+        trace = HarnessTrace()
+        agent = CountingPlayer(0)
+        fork_get_action(Isolation(), agent, 100, clock=VirtualClock(step=0.015), trace=trace)
+        record, = trace.records
+        self.assertEqual((record["start"], record["puts"]), (0, 6))
+        self.assertEqual(agent.context, 6)
+        action = Isolation().actions()[0]
+        sizes = [len(ForkingPickler.dumps((context, action))) for context in range(1, 7)]
+        self.assertEqual(record["put_bytes"], sum(sizes))  # total over the move, not the last put
+
+    def test_memory_is_traced(self):
+        trace = HarnessTrace(memory=True)
+        fork_get_action(Isolation(), GrowingPlayer(0), 100, trace=trace)
+        fork_get_action(Isolation(), GrowingPlayer(0), 100, clock=VirtualClock(), trace=trace)
+        for record in trace.records:
+            self.assertGreater(record["context_bytes"], 10000)
+            self.assertGreater(record["traced_peak"], 10000)
+            self.assertGreater(record["process_peak"], record["traced_peak"])
+        self.assertIn("traced_peak", trace.format_summary())
+
+
+class MemoryBudgetTest(unittest.TestCase):
+    def test_context_warning(self):
+        agent = GrowingPlayer(0)
+        with self.assertLogs("isolation", "WARNING") as logs:
+            fork_get_action(Isolation(), agent, 100, clock=VirtualClock(), memory_budget=MemoryBudget(5500))
+        self.assertEqual(len(logs.output), 1)  # once per move
+        self.assertEqual(len(agent.context), 10000)
+
+    def test_context_hard_stop(self):
+        """ the put over the budget is refused and the last context within it is kept """
+        agent = GrowingPlayer(0)
+        with self.assertLogs("isolation", "ERROR"):
+            action = fork_get_action(Isolation(), agent, 100, clock=VirtualClock(),
+                                     memory_budget=MemoryBudget(5500, hard_stop=True))
+        self.assertEqual(action, Isolation().actions()[0])
+        self.assertEqual(len(agent.context), 5000)
+
+    def test_table_limit(self):
+        """ tables kept in the context are bounded by the budget's table_limit """
+        agent = TablePlayer(0)
+        state = Isolation()
+        for action in state.actions()[:5]:
+            fork_get_action(state.result(action), agent, 100, clock=VirtualClock(),
+                            memory_budget=MemoryBudget(table_entries=3))
+        self.assertEqual(list(agent.context), [state.result(a) for a in state.actions()[2:5]])
+        agent.context[state.result(state.actions()[2])]  # reading an entry keeps it longest
+        agent.context[state] = None
+        self.assertEqual(list(agent.context), [state.result(state.actions()[4]), state.result(state.actions()[2]),
+                                               state])
+
+    def test_table_reads_refresh(self):
+        """ get() and `in` keep an entry as long as [] does """
+        table = BoundedTable(2)
+        table["a"], table["b"] = 1, 2
+        self.assertEqual(table.get("a"), 1)
+        table["c"] = 3
+        self.assertEqual(list(table), ["a", "c"])
+        self.assertIn("a", table)
+        table["d"] = 4
+        self.assertEqual(list(table), ["a", "d"])
+        self.assertIsNone(table.get("b"))
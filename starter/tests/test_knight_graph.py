@@ -0,0 +1,111 @@
+
+import unittest
+
+from random import Random
+
+from bitboard import NEIGHBOR_MASKS, NEIGHBORS, flood, popcount
+from features import compose
+from knight_graph import KnightGraphAnalyzer, analyze, components, partition_winner, partitioned
+
+from tests.test_incremental import random_states
+
+
+def brute_force_articulation(board):
+    """ Cells whose removal increases the number of connected components """
+    count = len(list(components(board)))
+    cells = [c for c in range(board.bit_length()) if board & (1 << c)]
+    return {c for c in cells if len(list(components(board ^ (1 << c)))) > count}
+
+
+def brute_force_blocks(board, cell):
+    """ Biconnected blocks through `cell`: v shares a block with it if they are
+    adjacent or no single other cell separates them """
+    reach = flood(board, cell)
+    cells = [c for c in range(reach.bit_length()) if reach & (1 << c) and c != cell]
+    without = {w: flood(board ^ (1 << w), cell) for w in cells}
+    common = 0
+    for v in cells:
+        if NEIGHBOR_MASKS[cell] & (1 << v) or all(without[w] & (1 << v) for w in cells if w != v):
+            common |= 1 << v
+    blocks = []
+    while common:
+        component = flood(common, (common & -common).bit_length() - 1)
+        blocks.append(component | (1 << cell))
+        common &= ~component
+    return blocks or [1 << cell]
+
+
+def solve(state, memo):
+    """ Winner of state under perfect play, by searching the whole game tree """
+    key = (state.board, state.locs, state.player())
+    if key not in memo:
+        active = state.player()
+        if state.terminal_test():
+            memo[key] = active if state.utility(active) > 0 else 1 - active
+        else:
+            memo[key] = active if any(solve(state.result(a), memo) == active for a in state.actions()) else 1 - active
+    return memo[key]
+
+
+class KnightGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.states = [s for s in random_states(4, seed=6) if None not in s.locs][::4]
+
+    def test_articulation_points(self):
+        """ Tarjan's articulation points match removing each cell in turn """
+        for state in self.states:
+            regions = analyze(state.board)
+            articulation = {c for r in regions for c in range(r.cells.bit_length()) if r.articulation & (1 << c)}
+            self.assertEqual(articulation, brute_force_articulation(state.board))
+            self.assertEqual(sum(popcount(r.cells) for r in regions), popcount(state.board))
+            for r in regions:
+                union = 0
+                for block in r.blocks:
+                    union |= block
+                    if popcount(block) > 2:  # no single cell disconnects a block
+                        for c in range(block.bit_length()):
+                            if block & (1 << c):
+                                self.assertEqual(len(list(components(block ^ (1 << c)))), 1)
+                self.assertEqual(union, r.cells)
+
+    def test_incremental_matches_rebuild(self):
+        """ block()/undo() keep the regions equal to a full re-analysis """
+        rng = Random(7)
+        state = self.states[0]
+        analyzer = KnightGraphAnalyzer(state.board)
+        snapshots = []
+        while analyzer.board:
+            snapshots.append((analyzer.board, analyzer.regions))
+            cells = [c for c in range(analyzer.board.bit_length()) if analyzer.board & (1 << c)]
+            analyzer.block(rng.choice(cells))
+            self.assertEqual(set(analyzer.regions), set(analyze(analyzer.board)))
+        while snapshots:
+            analyzer.undo()
+            self.assertEqual((analyzer.board, analyzer.regions), snapshots.pop())
+
+    def test_features(self):
+        """ graph features match chokepoints and blocks found by brute force """
+        for state in self.states:
+            board = state.board
+            articulation = brute_force_articulation(board)
+            for player in (0, 1):
+                liberties = [c for c in NEIGHBORS[state.locs[player]] if board & (1 << c)]
+                self.assertEqual(compose("own_chokepoints")(state, player), len(set(liberties) & articulation))
+                areas = [popcount(b) for c in liberties for b in brute_force_blocks(board, c)]
+                self.assertEqual(compose("own_block_area")(state, player), max(areas, default=0))
+            regions = analyze(board)
+            self.assertEqual(compose("partitioned")(state, 1), int(partitioned(regions, *state.locs, board)))
+
+    def test_partition_winner(self):
+        """ partition_winner() matches a full game-tree search of partitioned endgames """
+        solved = 0
+        for state in random_states(300, seed=8):
+            if None in state.locs or state.terminal_test():
+                continue
+            reach = [flood(state.board | (1 << loc), loc) ^ (1 << loc) for loc in state.locs]
+            if reach[0] & reach[1]:
+                self.assertIsNone(partition_winner(state.board, state.locs, state.player()))
+            elif popcount(reach[0] | reach[1]) <= 12:
+                self.assertEqual(partition_winner(state.board, state.locs, state.player()), solve(state, {}))
+                solved += 1
+        self.assertGreater(solved, 10)
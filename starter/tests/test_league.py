@@ -0,0 +1,91 @@
+
+import unittest
+
+from collections import Counter
+
+from isolation import Agent, Isolation, VirtualClock
+from league import League, run_league
+from run_match import Match, TEST_AGENTS, league_entrants
+from sample_players import RandomPlayer
+
+
+class LeagueTest(unittest.TestCase):
+    def setUp(self):
+        self.entrants = [Agent(RandomPlayer, name) for name in ("a", "b", "c")]
+
+    def test_update(self):
+        """ the winner gains what the loser drops and both deviations shrink """
+        league = League(self.entrants)
+        league.update("a", "b")
+        (mu_a, rd_a), (mu_b, rd_b) = league.ratings["a"], league.ratings["b"]
+        self.assertAlmostEqual(mu_a - 1500, 1500 - mu_b)
+        self.assertGreater(mu_a, 1500)
+        self.assertLess(rd_a, 350)
+        self.assertAlmostEqual(rd_a, rd_b)
+        self.assertEqual(league.ratings["c"], [1500, 350])
+        self.assertEqual(league.games["a"], 1)
+
+    def test_glicko_example(self):
+        """ Glickman's example: one player against three opponents in one rating period """
+        league = League([Agent(RandomPlayer, name) for name in ("p", "o1", "o2", "o3")], min_rd=0)
+        league.ratings = {"p": [1500, 200], "o1": [1400, 30], "o2": [1550, 100], "o3": [1700, 300]}
+        self.assertAlmostEqual(league.expected("p", "o1"), 0.639, places=3)
+        self.assertAlmostEqual(league.expected("p", "o3"), 0.303, places=3)
+        mu, rd = league.period_rating("p", [("o1", 1.), ("o2", 0.), ("o3", 0.)])
+        self.assertAlmostEqual(mu, 1464.1, delta=0.1)
+        self.assertAlmostEqual(rd, 151.4, delta=0.1)
+        expected = league.period_rating("p", [("o1", 1.)]), league.period_rating("o1", [("p", 0.)])
+        league.update("p", "o1")
+        self.assertEqual((league.ratings["p"], league.ratings["o1"]), expected)
+
+    def test_pairing_prefers_uncertain_ratings(self):
+        league = League(self.entrants, seed=0)
+        league.ratings["a"][1] = league.ratings["b"][1] = 50
+        self.assertNotIn(("a", "b"), [tuple(sorted(p.name for p in league.next_pairing()))
+                                      for _ in range(10)])
+
+    def test_pairing_spreads_pending_games(self):
+        league = League(self.entrants, seed=0)
+        pending = Counter({("a", "c"): 1, ("b", "c"): 1})
+        self.assertEqual(sorted(p.name for p in league.next_pairing(pending)), ["a", "b"])
+
+    def test_pairing_alternates_first_player(self):
+        league = League(self.entrants[:2], seed=0)
+        firsts = [league.next_pairing()[0].name for _ in range(4)]
+        self.assertEqual(sorted(firsts), ["a", "a", "b", "b"])
+
+    def test_unique_names(self):
+        with self.assertRaises(ValueError):
+            League(self.entrants + self.entrants[:1])
+
+    def test_run_league(self):
+        """ ratings follow streamed results and the random agent ranks last """
+        league = League([TEST_AGENTS["RANDOM"], TEST_AGENTS["GREEDY"], TEST_AGENTS["MINIMAX"]], seed=0)
+        played = []
+
+        def make_match(players, match_id):
+            return Match(players=players, initial_state=Isolation(), time_limit=150, match_id=match_id,
+                         debug_flag=False, clock=VirtualClock(), seed=match_id)
+
+        games = run_league(league, make_match, 30, processes=3, callback=lambda m, r: played.append(r))
+        self.assertEqual(games, 30)
+        self.assertEqual(len(played), 30)
+        self.assertEqual(sum(league.games[agent] for agent in league.entrants), 60)
+        self.assertEqual(league.ranking()[-1][0], TEST_AGENTS["RANDOM"].name)
+        self.assertLess(max(rd for _, rd in league.ratings.values()), 350)
+
+    def test_target_rd_stops_early(self):
+        league = League([TEST_AGENTS["RANDOM"], TEST_AGENTS["GREEDY"]], seed=0, min_rd=200)
+
+        def make_match(players, match_id):
+            return Match(players=players, initial_state=Isolation(), time_limit=150, match_id=match_id,
+                         debug_flag=False, clock=VirtualClock(), seed=match_id)
+
+        self.assertLess(run_league(league, make_match, 100, target_rd=200), 100)
+
+    def test_league_entrants(self):
+        entrants = league_entrants()
+        self.assertEqual(len({agent.name for agent in entrants}), len(entrants))
+        player = entrants[-1].agent_class(player_id=1)
+        self.assertEqual(player.player, 1)
+        self.assertIsNotNone(player.heuristic)
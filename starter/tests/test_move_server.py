@@ -0,0 +1,78 @@
+
+import asyncio
+import unittest
+
+from isolation import Isolation
+from move_server import MoveServer, generate_load, random_positions
+from my_custom_player import CustomPlayer
+
+
+class MoveServerTest(unittest.TestCase):
+    def run_server(self, scenario, **kwargs):
+        async def run():
+            server = MoveServer(**kwargs)
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_best_move(self):
+        state = Isolation().result(40).result(60)
+        player = CustomPlayer(state.player())
+        (expected, score), = player.top_moves(state, 1, depth=2)
+
+        async def scenario(server):
+            return [await server.best_move(state) for _ in range(2)]
+
+        first, second = self.run_server(scenario, depth=2)
+        self.assertEqual(first, (int(expected), score, "search"))
+        self.assertEqual(second, (int(expected), score, "cache"))
+
+    def test_merge_in_flight(self):
+        """ concurrent requests for one position share a single search """
+        state = Isolation().result(40).result(60)
+
+        async def scenario(server):
+            results = await asyncio.gather(*(server.best_move(state) for _ in range(4)))
+            return results, server.metrics()
+
+        results, metrics = self.run_server(scenario, depth=2, processes=2)
+        self.assertEqual(sorted(source for _, _, source in results), ["merged"] * 3 + ["search"])
+        self.assertEqual(len({action for action, _, _ in results}), 1)
+        self.assertEqual((metrics["search"], metrics["merged"], metrics["requests"]), (1, 3, 4))
+
+    def test_lru_eviction(self):
+        a, b = random_positions(2, seed=1)[:2]
+
+        async def scenario(server):
+            for state in (a, b, a):
+                await server.best_move(state)
+            return list(server.cache)
+
+        self.assertEqual(self.run_server(scenario, depth=1, cache_size=1), [a])
+
+    def test_terminal_state(self):
+        state = Isolation()
+        while not state.terminal_test():
+            state = state.result(state.actions()[0])
+
+        async def scenario(server):
+            return await server.best_move(state)
+
+        self.assertEqual(self.run_server(scenario, depth=1), (None, None, "search"))
+
+    def test_load_over_tcp(self):
+        positions = random_positions(5, seed=2)
+
+        async def scenario(server):
+            port = await server.start()
+            latencies, _ = await generate_load("127.0.0.1", port, positions, sessions=4, requests=5)
+            return latencies, server.metrics()
+
+        latencies, metrics = self.run_server(scenario, depth=1, processes=2)
+        self.assertEqual(len(latencies), 20)
+        self.assertEqual(metrics["requests"], 20)
+        self.assertLessEqual(metrics["search"], len(set(positions)))
+        self.assertGreater(metrics["hit_rate"], 0)
+        self.assertLessEqual(metrics["p50_ms"], metrics["p99_ms"])
@@ -5,14 +5,17 @@ from collections import deque
 from random import choice
 from textwrap import dedent
 
-from isolation import Isolation, Agent, fork_get_action, play, DebugState
+from isolation import Isolation, Agent, VirtualClock, fork_get_action, play, DebugState
 from sample_players import RandomPlayer
-from my_custom_player import CustomPlayer
+from my_custom_player import CustomPlayer, HEURISTICS_FUNCTIONS
+
+from tests.test_incremental import random_states
 
 
 class BaseCustomPlayerTest(unittest.TestCase):
     def setUp(self):
         self.time_limit = 150
+        self.node_cost = 1e-5  # simulated seconds per searched node (15000 nodes per move)
         self.move_0_state = Isolation()
         self.move_1_state = self.move_0_state.result(choice(self.move_0_state.actions()))
         self.move_2_state = self.move_1_state.result(choice(self.move_1_state.actions()))
@@ -25,7 +28,7 @@ class BaseCustomPlayerTest(unittest.TestCase):
 class CustomPlayerGetActionTest(BaseCustomPlayerTest):
     def _test_state(self, state):
         agent = CustomPlayer(state.ply_count % 2)
-        action = fork_get_action(state, agent, self.time_limit)
+        action = fork_get_action(state, agent, self.time_limit, clock=VirtualClock(node_cost=self.node_cost))
         self.assertTrue(action in state.actions(), dedent("""\
             Your agent did not call self.queue.put() with a valid action \
             within {} milliseconds from state {}
@@ -54,7 +57,8 @@ class CustomPlayerPlayTest(BaseCustomPlayerTest):
         agents = (Agent(CustomPlayer, "Player 1"),
                   Agent(CustomPlayer, "Player 2"))
         initial_state = Isolation()
-        winner, game_history, _ = play((agents, initial_state, self.time_limit, 0))
+        clock = VirtualClock(node_cost=self.node_cost)
+        winner, game_history, _ = play((agents, initial_state, self.time_limit, 0, False, clock))
         
         state = initial_state
         moves = deque(game_history)
@@ -67,3 +71,45 @@ class CustomPlayerPlayTest(BaseCustomPlayerTest):
                        
             raise Exception("Your agent did not play until a terminal state.")
 
+
+
+class TopMovesTest(unittest.TestCase):
+    def setUp(self):
+        self.states = [s for s in random_states(4, seed=11) if s.ply_count >= 2 and len(s.actions()) > 2][::6]
+
+    def test_scores_match_full_search(self):
+        """ top_moves() returns the k best exact scores of score_moves() """
+        for heuristic in (None, HEURISTICS_FUNCTIONS["heuristics_liberties_and_keep_enemy_close_2"]):
+            agent = CustomPlayer(0, heuristic=heuristic)
+            for state in self.states:
+                agent.player = state.player()
+                scores = dict((m, s) for m, s in agent.score_moves(state, 2))
+                for k in (1, 2, 3):
+                    top = agent.top_moves(state, k, depth=2)
+                    self.assertEqual([s for _, s in top], sorted(scores.values(), reverse=True)[:k])
+                    self.assertTrue(all(scores[m] == s for m, s in top))
+
+    def test_pruned_against_kth_score(self):
+        agent = CustomPlayer(0)
+        full = top = 0
+        for state in self.states:
+            agent.player = state.player()
+            agent.nodes = 0
+            agent.score_moves(state, 3)
+            full += agent.nodes
+            agent.nodes = 0
+            agent.top_moves(state, 1, depth=3)
+            top += agent.nodes
+        self.assertLess(top, full)
+
+    def test_time_limit(self):
+        agent = CustomPlayer(0)
+        state = self.states[0]
+        agent.player = state.player()
+        top = agent.top_moves(state, 2, time_limit=50)
+        self.assertEqual(len(top), 2)
+        self.assertGreaterEqual(agent.depth_reached, 1)
+        self.assertIsNone(agent.node_clock)
+        self.assertEqual(agent.top_moves(state, 2, depth=2, time_limit=10000), agent.top_moves(state, 2, depth=2))
+        with self.assertRaises(ValueError):
+            agent.top_moves(state, 2)
@@ -0,0 +1,65 @@
+
+import os
+import pstats
+import signal
+import tempfile
+import time
+import unittest
+
+from isolation import Isolation, fork_get_action
+from profiling import MoveProfiler, read_collapsed
+from sample_players import BasePlayer, GreedyPlayer, RandomPlayer
+
+
+class TerminatedPlayer(BasePlayer):
+    """ Is terminated by the harness in the middle of its search """
+    def get_action(self, state):
+        self.queue.put(state.actions()[0])
+        self.search(state)
+
+    def search(self, state):
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+class BusyPlayer(BasePlayer):
+    """ Searches for a fixed 20 ms of wall time before answering """
+    def get_action(self, state):
+        stop = time.perf_counter() + 0.02
+        while time.perf_counter() < stop:
+            state.liberties(None)
+        self.queue.put(state.actions()[0])
+
+
+class MoveProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_cprofile_merges_moves(self):
+        """ moves searched in child processes are merged into one pstats file """
+        profiler = MoveProfiler(os.path.join(self.tmp.name, "out.prof"), agent_class=GreedyPlayer)
+        state = Isolation()
+        for _ in range(3):
+            fork_get_action(state, GreedyPlayer(0), 20, profiler=profiler)
+        fork_get_action(state, RandomPlayer(0), 20, profiler=profiler)  # not profiled
+        self.assertEqual(profiler.merge(), 3)
+        functions = {name: stats for (_, _, name), stats in pstats.Stats(profiler.output).stats.items()}
+        self.assertEqual(functions["get_action"][1], 3)  # primitive calls
+        self.assertFalse(os.listdir(profiler.parts))
+
+    def test_flushed_on_termination(self):
+        profiler = MoveProfiler(os.path.join(self.tmp.name, "out.prof"))
+        fork_get_action(Isolation(), TerminatedPlayer(0), 20, profiler=profiler)
+        self.assertEqual(profiler.merge(), 1)
+        names = {name for _, _, name in pstats.Stats(profiler.output).stats}
+        self.assertIn("search", names)
+
+    def test_sampling(self):
+        profiler = MoveProfiler(os.path.join(self.tmp.name, "out.collapsed"), "sample", interval=0.0005)
+        for _ in range(2):
+            fork_get_action(Isolation(), BusyPlayer(0), 50, profiler=profiler)
+        self.assertEqual(profiler.merge(), 2)
+        stacks = read_collapsed(profiler.output)
+        self.assertTrue(any("get_action" in stack and "liberties" in stack for stack in stacks))
+        with self.assertRaises(ValueError):
+            MoveProfiler(profiler.output, "perf")
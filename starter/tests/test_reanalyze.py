@@ -0,0 +1,42 @@
+
+import csv
+import io
+import unittest
+
+from my_custom_player import CustomPlayer, HEURISTICS_FUNCTIONS
+from reanalyze import COLUMNS, analyze_game, reanalyze
+
+from tests.test_codec import random_games
+
+
+class ReanalyzeTest(unittest.TestCase):
+    def setUp(self):
+        self.records = list(random_games(3, seed=4))
+        self.settings = [("heuristics_liberties", 2), ("own_liberties - 2 * opp_liberties", 1)]
+
+    def test_rows_match_score_moves(self):
+        """ every searchable position gets one row per setting, scored like CustomPlayer """
+        record = self.records[0]
+        rows = analyze_game((0, record, self.settings))
+        state = record.initial_state
+        positions = []
+        for action in record.history:
+            if state.ply_count >= 2 and len(state.actions()) > 1:
+                positions.append((state, action))
+            state = state.result(action)
+        self.assertEqual(len(rows), len(positions) * len(self.settings))
+        agent = CustomPlayer(0, heuristic=HEURISTICS_FUNCTIONS["heuristics_liberties"])
+        for (state, action), row in zip(positions, rows[::2]):
+            agent.player = state.player()
+            scores = {int(m): s for m, s in agent.score_moves(state, 2)}
+            self.assertEqual(row[9], scores[int(action)])
+            self.assertEqual(row[8], max(scores.values()))
+            self.assertEqual((row[11], row[12]), (1, 0.))  # the reference agrees with itself
+
+    def test_reanalyze_streams_through_pool(self):
+        out = io.StringIO()
+        summary = reanalyze(iter(self.records), self.settings, out, processes=2, chunksize=1)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual(sorted({int(r[0]) for r in rows[1:]}), [0, 1, 2])
+        self.assertEqual(sum(s[0] for s in summary.values()), len(rows) - 1)
@@ -0,0 +1,66 @@
+
+import functools
+import os
+import tempfile
+import unittest
+
+from isolation import Agent, Isolation, VirtualClock
+from my_custom_player import CustomPlayer, heuristics_liberties, heuristics_liberties_deep
+from result_cache import ResultCache, agent_fingerprint
+from run_match import Match
+from sample_players import GreedyPlayer, RandomPlayer
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name)
+        self.match = Match(players=(Agent(GreedyPlayer, "Greedy"), Agent(RandomPlayer, "Random")),
+                           initial_state=Isolation(), time_limit=150, match_id=1, debug_flag=False,
+                           clock=VirtualClock(), seed=3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fingerprints(self):
+        liberties = agent_fingerprint(functools.partial(CustomPlayer, heuristic=heuristics_liberties))
+        self.assertIn("def heuristics_liberties(", liberties)
+        self.assertIn("class CustomPlayer(", liberties)
+        self.assertNotEqual(liberties, agent_fingerprint(functools.partial(CustomPlayer,
+                                                                           heuristic=heuristics_liberties_deep)))
+        self.assertNotEqual(liberties, agent_fingerprint(functools.partial(CustomPlayer, seed=1,
+                                                                           heuristic=heuristics_liberties)))
+        self.assertNotIn("heuristic", agent_fingerprint(GreedyPlayer).split("class GreedyPlayer")[0])
+        self.assertIn("\nincremental ", liberties)  # modules the agent runs, not only its classes
+        self.assertNotIn("\nincremental ", agent_fingerprint(GreedyPlayer))
+
+    def test_keys(self):
+        key = self.cache.key(self.match)
+        self.assertEqual(key, ResultCache(self.directory.name).key(self.match))
+        for change in (dict(seed=4), dict(node_budget=100), dict(match_id=2), dict(time_limit=100),
+                       dict(initial_state=Isolation().result(40)), dict(players=self.match.players[::-1])):
+            self.assertNotEqual(key, self.cache.key(self.match._replace(**change)), change)
+        self.assertNotEqual(key, ResultCache(self.directory.name, harness="cooperative").key(self.match))
+
+    def test_reuse_and_refresh(self):
+        winner, history, match_id = self.cache.play(self.match)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        cache = ResultCache(self.directory.name)
+        self.assertEqual(cache.play(self.match), (winner, history, match_id))
+        self.assertIs(cache.play(self.match)[0], winner)
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        refresh = ResultCache(self.directory.name, refresh=True)
+        self.assertIsNone(refresh.get(self.match))
+        refresh.play(self.match)
+        self.assertEqual(refresh.misses, 1)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+    def test_wall_clock_games_are_not_stored(self):
+        match = self.match._replace(clock=None, seed=None, time_limit=20)
+        self.assertFalse(self.cache.cacheable(match))
+        self.assertTrue(self.cache.cacheable(match._replace(seed=3)))
+        self.assertTrue(ResultCache(self.directory.name, harness="cooperative").cacheable(match))
+        self.cache.play(match)
+        self.cache.play(match)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        self.assertEqual(os.listdir(self.directory.name), [])
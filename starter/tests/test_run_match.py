@@ -0,0 +1,36 @@
+
+import io
+import unittest
+
+from codec import read_games
+from isolation import Isolation
+from run_match import Match, TEST_AGENTS, _run_matches
+
+
+class RunMatchesTest(unittest.TestCase):
+    def test_fair_matches_pipelined(self):
+        """ every original game gets its mirror game queued on the same pool """
+        players = (TEST_AGENTS["RANDOM"], TEST_AGENTS["GREEDY"])
+        matches = [Match(players=players, initial_state=Isolation(), time_limit=150,
+                         match_id=i, debug_flag=False) for i in (1, 2)]
+        results = _run_matches(matches, players[0].name, num_processes=2, fair_matches=True)
+        self.assertEqual(sorted(r[2] for r in results), [-2, -1, 1, 2])
+        for _, history, match_id in results:
+            self.assertGreater(len(history), 0, "match {} was not played".format(match_id))
+
+    def test_record_games(self):
+        """ recorded games replay to a terminal state won by the recorded player """
+        players = (TEST_AGENTS["RANDOM"], TEST_AGENTS["GREEDY"])
+        matches = [Match(players=players, initial_state=Isolation(), time_limit=150,
+                         match_id=i, debug_flag=False) for i in (0, 1)]
+        record = io.BytesIO()
+        results = _run_matches(matches, players[0].name, num_processes=2, record=record)
+        record.seek(0)
+        games = list(read_games(record))
+        self.assertEqual(len(games), len(results))
+        for game in games:
+            state = game.initial_state
+            for action in game.history:
+                state = state.result(action)
+            self.assertTrue(state.terminal_test())
+            self.assertEqual(state.utility(game.winner), float("inf"))
@@ -0,0 +1,43 @@
+
+import unittest
+
+from random import Random
+
+from isolation import Isolation
+from sample_players import MinimaxPlayer, AlphaBetaMinimaxPlayer
+
+
+def position_corpus(num_positions, seed):
+    """ Non-terminal positions past the opening, sampled from random games """
+    rng = Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        state = Isolation()
+        while not state.terminal_test():
+            if state.ply_count >= 2 and rng.random() < 0.2:
+                positions.append(state)
+            state = state.result(rng.choice(state.actions()))
+    return positions[:num_positions]
+
+
+class AlphaBetaMinimaxPlayerTest(unittest.TestCase):
+    def test_same_move_as_reference(self):
+        """ AlphaBetaMinimaxPlayer picks the MinimaxPlayer move (incl. ties) in every position """
+        for state in position_corpus(800, seed=8):
+            for player_id in (state.player(), 1 - state.player()):
+                expected = MinimaxPlayer(player_id).minimax(state, depth=3)
+                actual = AlphaBetaMinimaxPlayer(player_id).minimax(state, depth=3)
+                self.assertEqual(actual, expected, "different move in {}".format(state))
+
+    def test_overridden_score(self):
+        """ a subclass's score() is used at the leaves, like in MinimaxPlayer """
+        def score(self, state):
+            own, opp = state.locs[self.player_id], state.locs[1 - self.player_id]
+            return len(state.liberties(own)) - 2 * len(state.liberties(opp))
+
+        reference = type("Reference", (MinimaxPlayer,), {"score": score})
+        alpha_beta = type("AlphaBeta", (AlphaBetaMinimaxPlayer,), {"score": score})
+        for state in position_corpus(200, seed=9):
+            player_id = state.player()
+            self.assertEqual(alpha_beta(player_id).minimax(state, depth=3),
+                             reference(player_id).minimax(state, depth=3), "different move in {}".format(state))
@@ -0,0 +1,135 @@
+
+import random
+import unittest
+
+from queue import Queue
+
+from isolation import Agent, Isolation
+from my_custom_player import CustomPlayer
+from run_match import Match, TEST_AGENTS, make_fair_match
+from sample_players import BasePlayer
+from scheduler import CooperativeScheduler, _Game, run_cooperative
+
+
+class SpinningPlayer(BasePlayer):
+    """ puts a legal move, then searches forever """
+    def get_action(self, state):
+        self.queue.put(state.actions()[0])
+        while True:
+            self.count_node()
+
+
+class SilentPlayer(BasePlayer):
+    def get_action(self, state):
+        while True:
+            self.count_node()
+
+
+class SlicedPlayer(BasePlayer):
+    """ yields forever after putting a move; records the order of its slices """
+    log = []
+
+    def iter_action(self, state):
+        self.queue.put(random.choice(state.actions()))
+        while True:
+            SlicedPlayer.log.append(state)
+            yield
+
+
+def _match(players, match_id, time_limit=150):
+    return Match(players=players, initial_state=Isolation(), time_limit=time_limit, match_id=match_id,
+                 debug_flag=False)
+
+
+class CooperativeSchedulerTest(unittest.TestCase):
+    def test_games_finish(self):
+        players = (TEST_AGENTS["GREEDY"], TEST_AGENTS["RANDOM"])
+        matches = [_match(players[::1 - 2 * (i % 2)], i) for i in range(6)]
+        results = CooperativeScheduler(matches).run()
+        self.assertEqual([r[2] for r in results], list(range(6)))
+        for winner, history, _ in results:
+            state = Isolation()
+            for action in history:
+                state = state.result(action)
+            self.assertTrue(state.terminal_test())
+            self.assertEqual(state.utility(winner), float("inf"))
+
+    def test_cpu_time_limit(self):
+        """ a search past its CPU time is stopped and its last put move is played """
+        spinner = Agent(SpinningPlayer, "Spinning Agent")
+        winner, history, _ = CooperativeScheduler([_match((spinner, TEST_AGENTS["RANDOM"]), 0, 5)]).run()[0]
+        self.assertGreater(len(history), 2)
+
+    def test_no_move_loses(self):
+        silent = Agent(SilentPlayer, "Silent Agent")
+        results = CooperativeScheduler([_match((TEST_AGENTS["RANDOM"], silent), 0, 5)]).run()
+        winner, history, _ = results[0]
+        self.assertEqual((winner, len(history)), (0, 1))
+
+    def test_interleaving(self):
+        """ the slices of concurrent games alternate """
+        sliced = Agent(SlicedPlayer, "Sliced Agent")
+        SlicedPlayer.log = []
+        matches = [_match((sliced, TEST_AGENTS["RANDOM"]), i, 20) for i in range(2)]
+        CooperativeScheduler(matches).run()
+        first = [id(state) for state in SlicedPlayer.log[:6]]
+        self.assertEqual(len(set(first)), 2)
+        self.assertNotEqual(first[0], first[1])
+
+    def test_custom_player_iter_action(self):
+        """ with enough time, iter_action() picks one of get_next_move()'s best moves """
+        state = Isolation().result(40).result(60).result(Isolation().result(40).result(60).actions()[0])
+        player = CustomPlayer(state.player())
+        scores = player.score_moves(state, 4)
+        best = max(score for _, score in scores)
+        agent = Agent(CustomPlayer, "Custom Agent")
+        match = Match(players=(agent, agent), initial_state=state, time_limit=60000, match_id=0,
+                      debug_flag=False)
+        game = _Game(match)
+        game.start_move()
+        while game.move.step():
+            pass
+        _, action = game.move.queue.item
+        self.assertIn(action, [move for move, score in scores if score == best])
+
+    def test_iter_action_max_depth(self):
+        """ iter_action() deepens up to the player's max_depth, one slice per root move and depth """
+        state = Isolation().result(40).result(60)
+        for max_depth in (1, 2):
+            player = CustomPlayer(state.player(), max_depth=max_depth)
+            player.queue = Queue()
+            self.assertEqual(sum(1 for _ in player.iter_action(state)), max_depth * len(state.actions()))
+            self.assertEqual(player.queue.qsize(), 1 + max_depth)
+
+    def test_run_cooperative_processes(self):
+        players = (TEST_AGENTS["GREEDY"], TEST_AGENTS["RANDOM"])
+        matches = [_match(players, i) for i in range(5)]
+        results = run_cooperative(matches, processes=2)
+        self.assertEqual([r[2] for r in results], list(range(5)))
+        for match, (winner, _, _) in zip(matches, results):
+            self.assertIn(winner, match.players)
+
+    def test_seeded_games_are_reproducible(self):
+        """ a seeded game is the same alone or interleaved with another, as
+        every move draws from its own global random state """
+        agent = Agent(CustomPlayer, "Custom Agent")
+
+        def seeded(match_id, seed):
+            return Match(players=(agent, TEST_AGENTS["RANDOM"]), initial_state=Isolation(), time_limit=60000,
+                         match_id=match_id, debug_flag=False, node_budget=300, seed=seed)
+        alone = CooperativeScheduler([seeded(0, 7)]).run()[0]
+        random.seed(0)
+        together = CooperativeScheduler([seeded(0, 7), seeded(1, 8)]).run()[0]
+        self.assertEqual(together, alone)
+
+    def test_follow_up_games(self):
+        """ the fair mirror of every game is played in the same run """
+        players = (TEST_AGENTS["GREEDY"], TEST_AGENTS["RANDOM"])
+        matches = [_match(players, i) for i in range(4)]
+        results, added = run_cooperative(matches, processes=2, follow_up=make_fair_match)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sorted(-match.match_id for match, _ in added), list(range(4)))
+        for match, (winner, history, _) in added:
+            self.assertEqual(match.players, players[::-1])
+            self.assertEqual(match.initial_state.ply_count, 2)
+            self.assertIn(winner, match.players)
@@ -0,0 +1,91 @@
+
+import os
+import tempfile
+import unittest
+
+from copy import deepcopy
+from multiprocessing import Process
+
+from isolation import Isolation
+from my_custom_player import CustomPlayer, heuristics_liberties, heuristics_liberties_deep
+from search_cache import EXACT, LOWER, SearchCache, heuristic_tag
+from features import compose
+from incremental import IncrementalEvaluator
+
+from tests.test_incremental import random_states
+
+
+def _store_in_child(path, state, tag):
+    SearchCache(path).store(state, 3, 1, tag, EXACT, 7, 11)
+
+
+class SearchCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "search.cache")
+        self.state = Isolation().result(40).result(60)
+        self.tag = heuristic_tag(heuristics_liberties)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_and_probe(self):
+        cache = SearchCache(self.path, entries=64)
+        cache.store(self.state, 3, 0, self.tag, LOWER, 2.5, -15)
+        cache.store(self.state, 2, 0, self.tag, EXACT, float("-inf"))
+        self.assertEqual(cache.probe(self.state, 3, 0, self.tag), (LOWER, 2.5, -15))
+        self.assertEqual(cache.probe(self.state, 2, 0, self.tag), (EXACT, float("-inf"), None))
+        self.assertIsNone(cache.probe(self.state, 3, 1, self.tag))
+        self.assertIsNone(cache.probe(self.state.result(self.state.actions()[0]), 3, 0, self.tag))
+        self.assertEqual((cache.hits, cache.misses, cache.stores), (2, 2, 2))
+
+    def test_tags(self):
+        """ entries of another heuristic or expression are never used """
+        tags = {heuristic_tag(h) for h in (heuristics_liberties, heuristics_liberties_deep,
+                                          compose("own_liberties - opp_liberties"),
+                                          compose("own_liberties + opp_liberties"))}
+        self.assertEqual(len(tags), 4)
+        cache = SearchCache(self.path, entries=64)
+        cache.store(self.state, 3, 0, self.tag, EXACT, 1)
+        self.assertIsNone(cache.probe(self.state, 3, 0, heuristic_tag(heuristics_liberties_deep)))
+
+    def test_edited_heuristic_tag(self):
+        """ an edited heuristic or incremental scorer retires the old entries """
+        def heuristic(state, player):
+            return 0
+
+        def edited(state, player):
+            return 1
+        edited.__qualname__ = heuristic.__qualname__
+        self.assertNotEqual(heuristic_tag(heuristic), heuristic_tag(edited))
+        self.assertNotEqual(heuristic_tag(heuristics_liberties),
+                            heuristic_tag(heuristics_liberties, IncrementalEvaluator.liberties_score))
+
+    def test_torn_entry_is_a_miss(self):
+        cache = SearchCache(self.path, entries=1)
+        cache.store(self.state, 3, 0, self.tag, EXACT, 1)
+        cache._mmap[-1] ^= 0xFF
+        self.assertIsNone(cache.probe(self.state, 3, 0, self.tag))
+
+    def test_shared_between_processes(self):
+        """ entries stored by another process (or a copy) are read from the file """
+        SearchCache(self.path, entries=64)
+        p = Process(target=_store_in_child, args=(self.path, self.state, self.tag))
+        p.start()
+        p.join(10)
+        self.assertEqual(deepcopy(SearchCache(self.path)).probe(self.state, 3, 1, self.tag), (EXACT, 7, 11))
+
+    def test_same_search_fewer_nodes(self):
+        """ a player with a cache scores moves like one without and searches
+        fewer nodes once the positions are cached """
+        cache = SearchCache(self.path, entries=1 << 14)
+        states = [s for s in random_states(3, seed=3) if s.ply_count >= 2 and not s.terminal_test()]
+        for state in states[::8]:
+            expected = CustomPlayer(state.player(), heuristic=heuristics_liberties).score_moves(state, 3)
+            nodes = []
+            for _ in range(2):
+                agent = CustomPlayer(state.player(), heuristic=heuristics_liberties, cache=cache)
+                agent.nodes = 0
+                self.assertEqual(agent.score_moves(state, 3), expected)
+                nodes.append(agent.nodes)
+            self.assertLess(nodes[1], nodes[0])
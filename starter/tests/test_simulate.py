@@ -0,0 +1,48 @@
+
+import unittest
+
+from isolation import Isolation
+from simulate import np, opening_stats, random_games, records, simulate
+
+
+class RandomGamesTest(unittest.TestCase):
+    def test_random_games(self):
+        lengths, winners = random_games(5, seed=3)
+        self.assertEqual((lengths, winners), random_games(5, seed=3))
+        self.assertTrue(all(length >= 3 for length in lengths))
+        self.assertTrue(set(winners) <= {0, 1})
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class SimulateTest(unittest.TestCase):
+    def test_games_follow_the_rules(self):
+        """ every recorded game is legal, ends when Isolation says so and is won by its winner """
+        result = simulate(300, seed=1, record=True)
+        for game, length in zip(records(result), result.lengths.tolist()):
+            state = game.initial_state
+            for action in game.history:
+                self.assertFalse(state.terminal_test())
+                self.assertIn(action, state.actions())
+                state = state.result(action)
+            self.assertTrue(state.terminal_test())
+            self.assertEqual(len(game.history), length)
+            self.assertEqual(state.utility(game.winner), float("inf"))
+
+    def test_reproducible(self):
+        a, b = simulate(50, seed=4), simulate(50, seed=4)
+        self.assertEqual(a.lengths.tolist(), b.lengths.tolist())
+        self.assertEqual(a.winners.tolist(), b.winners.tolist())
+
+    def test_matches_scalar_distribution(self):
+        """ batched and scalar random games have the same mean length and first player win rate """
+        result = simulate(4000, seed=0)
+        lengths, winners = random_games(1000, seed=0)
+        self.assertAlmostEqual(float(result.lengths.mean()), sum(lengths) / len(lengths), delta=2.)
+        self.assertAlmostEqual(float((result.winners == 0).mean()), winners.count(0) / len(winners), delta=0.07)
+
+    def test_opening_stats(self):
+        result = simulate(200, seed=2, record=True)
+        stats = opening_stats(result)
+        self.assertEqual(sum(played for played, _ in stats.values()), 200)
+        self.assertEqual(sum(won for _, won in stats.values()), int((result.winners == 0).sum()))
+        self.assertTrue(all(Isolation().board >> cell & 1 for cell in stats))
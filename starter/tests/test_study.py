@@ -0,0 +1,42 @@
+import unittest
+
+from isolation import Isolation, fork_get_action
+from study import StudyPlayer, study, summarize
+
+
+class StudyTest(unittest.TestCase):
+    def setUp(self):
+        self.state = Isolation().result(40).result(60)
+
+    def test_report(self):
+        for iterative in (False, True):
+            agent = StudyPlayer(0, max_depth=2, iterative=iterative)
+            action = fork_get_action(self.state, agent, 1000)
+            self.assertIn(action, self.state.actions())
+            self.assertEqual(agent.context["depth"], 2)
+            self.assertGreater(agent.context["nodes"], 0)
+            self.assertGreater(agent.context["cpu_seconds"], 0)
+            self.assertLessEqual(agent.context["cpu_seconds"], agent.context["seconds"] + 0.01)
+
+    def test_report_on_timeout(self):
+        """ the last report within the time limit comes back, short of max_depth """
+        agent = StudyPlayer(0, max_depth=12, iterative=True)
+        fork_get_action(self.state, agent, 50)
+        self.assertLess(agent.context["depth"], 12)
+        self.assertGreater(agent.context["nodes"], 0)
+
+    def test_summarize(self):
+        games = [(None, True, [{"depth": 3, "nodes": 100, "seconds": 0.1}, {"depth": 1, "nodes": 50, "seconds": 0.2}]),
+                 (None, False, [{"depth": 3, "nodes": 150, "seconds": 0.2}])]
+        row = summarize((3, 150, True), "GREEDY", games)
+        self.assertEqual((row["games"], row["wins"], row["win_rate"], row["moves"]), (2, 1, 0.5, 3))
+        self.assertAlmostEqual(row["mean_depth"], 7 / 3)
+        self.assertAlmostEqual(row["nodes_per_second"], 600)
+        self.assertAlmostEqual(row["timeout_rate"], 1 / 3)
+
+    def test_study(self):
+        rows = study([1, 2], [100], 2, opponent="RANDOM", processes=4, seed=0)
+        self.assertEqual([(row["max_depth"], row["games"]) for row in rows], [(1, 2), (2, 2)])
+        for row in rows:
+            self.assertGreater(row["moves"], 0)
+            self.assertGreater(row["nodes_per_second"], 0)
@@ -0,0 +1,58 @@
+
+import random
+import unittest
+
+from features import compose
+from tuning import expression, feature_rows, fit, np, scaled_loss, self_play
+
+
+class SelfPlayTest(unittest.TestCase):
+    def test_games(self):
+        """ self-play is reproducible and every game ends won by its recorded winner """
+        games = self_play(3, depth=1, seed=7)
+        self.assertEqual(games, self_play(3, depth=1, seed=7))
+        for game in games:
+            state = game.initial_state
+            for action in game.history:
+                state = state.result(action)
+            self.assertTrue(state.terminal_test())
+            self.assertEqual(state.utility(game.winner), float("inf"))
+
+    def test_feature_rows(self):
+        games = self_play(2, depth=1, seed=1)
+        rows, labels = feature_rows(games, ("own_liberties", "distance"))
+        self.assertEqual(len(rows), sum(len(game.history) - 2 for game in games))
+        state = games[0].initial_state.result(games[0].history[0]).result(games[0].history[1])
+        self.assertEqual(rows[0], (compose("own_liberties")(state, state.player()),
+                                   compose("distance")(state, state.player())))
+        self.assertEqual(labels[0], int(state.player() == games[0].winner))
+
+    def test_expression(self):
+        self.assertEqual(expression(("own_liberties", "opp_liberties"), (0.5, -1.0)),
+                         "0.5 * own_liberties - 1 * opp_liberties")
+        compose(expression(("own_liberties", "opp_liberties"), (0.5, -1.0)))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class FitTest(unittest.TestCase):
+    def test_recovers_weights(self):
+        rng = random.Random(0)
+        true_weights = (1.5, -0.5)
+        rows, labels = [], []
+        for _ in range(20000):
+            x = (rng.gauss(0, 1), rng.gauss(0, 1))
+            z = sum(w * v for w, v in zip(true_weights, x)) + 0.2
+            rows.append(x)
+            labels.append(int(rng.random() < 1 / (1 + 2.718281828459045 ** -z)))
+        weights, bias, loss = fit(rows, labels, l2=0.)
+        for fitted, expected in zip(weights, true_weights):
+            self.assertAlmostEqual(fitted, expected, delta=0.1)
+        self.assertAlmostEqual(bias, 0.2, delta=0.1)
+        self.assertLess(loss, 0.6931)
+
+    def test_scaled_loss(self):
+        """ the fitted weights are at least as good as any fixed weighting """
+        rows, labels = feature_rows(self_play(20, depth=1), ("own_liberties", "opp_liberties"))
+        _, _, loss = fit(rows, labels, l2=0.)
+        fixed = scaled_loss([own - opp for own, opp in rows], labels)
+        self.assertLessEqual(loss, fixed + 1e-9)
@@ -0,0 +1,207 @@
+"""Texel-style tuning of feature weights on self-play positions
+
+Instead of one tournament per hand-picked weight (the
+heuristics_liberties_and_keep_enemy_close_* family), the weights of a
+weighted feature expression (see features.py) are fitted to game outcomes:
+
+  1. self_play() plays games between CustomPlayers in a process pool,
+     starting each game with a few random moves for variety; the games are
+     codec.GameRecords, so run_match.py --record files can be used as well
+  2. feature_rows() turns every position into the feature vector of the
+     player to move and a label (1 if that player won the game)
+  3. fit() minimizes the logistic loss of sigmoid(features . weights + bias)
+     against the labels with Newton's method on NumPy arrays
+
+The fitted weights form a feature expression for run_match.py -e. NumPy is
+only needed for the fit; without it the module still imports, and fit()
+raises ImportError.
+
+    $python tuning.py --games 2000 -p 8 -f own_liberties -f opp_liberties -f distance
+"""
+import argparse
+import itertools
+import math
+import random
+import textwrap
+
+from multiprocessing import Pool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from codec import GameRecord, read_games, write_games
+from features import compose_vector
+from isolation import Isolation
+from my_custom_player import CustomPlayer, get_heuristic
+
+
+TUNING_FEATURES = ("own_liberties", "opp_liberties", "distance")
+RANDOM_PLIES = 6
+SELF_PLAY_DEPTH = 2
+
+
+def play_game(args):
+    """ Play one self-play game; args is (seed, depth, random_plies, heuristic spec) """
+    seed, depth, random_plies, heuristic = args
+    rng = random.Random(seed)
+    player = CustomPlayer(0, seed=rng.random(), heuristic=get_heuristic(heuristic))
+    state = initial_state = Isolation()
+    history = []
+    while not state.terminal_test():
+        if state.ply_count < random_plies:
+            action = rng.choice(state.actions())
+        else:
+            player.player = state.player()
+            action = player.get_next_move(state, depth)
+        state = state.result(action)
+        history.append(action)
+    active = state.player()
+    return GameRecord(initial_state, history, active if state.utility(active) > 0 else 1 - active)
+
+
+def self_play(num_games, processes=1, depth=SELF_PLAY_DEPTH, random_plies=RANDOM_PLIES,
+              heuristic="heuristics_liberties", seed=0):
+    """ Return num_games self-play GameRecords, played on a process pool """
+    jobs = [("{}:{}".format(seed, i), depth, random_plies, heuristic) for i in range(num_games)]
+    if processes == 1:
+        return [play_game(job) for job in jobs]
+    with Pool(processes) as pool:
+        return pool.map(play_game, jobs, chunksize=max(1, num_games // (4 * processes)))
+
+
+def positions(records):
+    """ Yield (state, label) for every non-terminal position after the
+    opening moves; label is 1 if the player to move won the game """
+    for record in records:
+        state = record.initial_state
+        for action in record.history:
+            if state.ply_count >= 2:
+                yield state, int(state.player() == record.winner)
+            state = state.result(action)
+
+
+def feature_rows(records, names=TUNING_FEATURES):
+    """ Return (rows, labels): the features in `names` of the player to
+    move in every position of the records, and the game outcomes """
+    vector = compose_vector(tuple(names))
+    rows, labels = [], []
+    for state, label in positions(records):
+        rows.append(vector(state, state.player()))
+        labels.append(label)
+    return rows, labels
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("weight fitting needs NumPy (pip install numpy)")
+
+
+def logistic_loss(z, y):
+    """ Mean logistic loss of the logits z against 0/1 labels y """
+    return float(np.mean(np.logaddexp(0, z) - y * z))
+
+
+def fit(rows, labels, l2=1e-4, iterations=50, tolerance=1e-9):
+    """ Fit weights and a bias minimizing the logistic loss (plus an L2
+    penalty on the weights) with Newton's method
+
+    Returns (weights, bias, loss) with weights as a NumPy array.
+    """
+    _require_numpy()
+    X = np.asarray(rows, dtype=float)
+    y = np.asarray(labels, dtype=float)
+    n, k = X.shape
+    X = np.hstack([X, np.ones((n, 1))])
+    penalty = np.full(k + 1, l2)
+    penalty[k] = 0.  # no penalty on the bias
+    w = np.zeros(k + 1)
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(X @ w)))
+        gradient = X.T @ (p - y) / n + penalty * w
+        hessian = (X.T * (p * (1 - p))) @ X / n + np.diag(penalty + 1e-12)
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.max(np.abs(step)) < tolerance:
+            break
+    return w[:k], float(w[k]), logistic_loss(X @ w, y)
+
+
+def scaled_loss(values, labels):
+    """ Logistic loss of a fixed evaluation after fitting only its scale and
+    a bias, e.g. to compare a hand-picked heuristic with the fitted weights """
+    _require_numpy()
+    values = np.asarray(values, dtype=float).reshape(-1, 1)
+    return fit(values, labels, l2=0.)[2]
+
+
+def expression(names, weights):
+    """ Return the weighted feature expression, scaled so the largest weight is 1 """
+    scale = max(abs(w) for w in weights) or 1.
+    terms = ["{:.4g} * {}".format(w / scale, name) for name, w in zip(names, weights)]
+    return " + ".join(terms).replace("+ -", "- ")
+
+
+def main(args):
+    names = tuple(args.features or TUNING_FEATURES)
+    if args.games_files:
+        def read():
+            for filename in args.games_files:
+                with open(filename, "rb") as f:
+                    yield from read_games(f)
+        records = list(itertools.islice(read(), args.games))
+    else:
+        records = self_play(args.games, args.processes, args.depth, args.random_plies, args.heuristic, args.seed)
+        if args.record:
+            with open(args.record, "ab") as f:
+                write_games(f, records)
+    rows, labels = feature_rows(records, names)
+    print("{} positions from {} games".format(len(rows), len(records)))
+    weights, bias, loss = fit(rows, labels, args.l2)
+    print("fitted loss {:.5f} (bias {:.4f})".format(loss, bias))
+    for name, weight in zip(names, weights):
+        print("    {:<24} {:>10.5f}".format(name, weight))
+    print("expression: {}".format(expression(names, weights)))
+    for spec in args.compare or ["heuristics_liberties", "heuristics_liberties_and_keep_enemy_close_1"]:
+        heuristic = get_heuristic(spec)
+        values = [heuristic(state, state.player()) for state, _ in positions(records)]
+        values = [v if math.isfinite(v) else math.copysign(1e3, v) for v in values]
+        print("{:<60} loss {:.5f}".format(spec[:60], scaled_loss(values, labels)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Fit feature weights to self-play outcomes with a logistic loss (needs NumPy).",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Tune the liberties/distance weights on 2000 self-play games with 8 processes:
+
+                $python tuning.py --games 2000 -p 8 -f own_liberties -f opp_liberties -f distance
+
+            - Fit on recorded tournament games instead and compare with a heuristic:
+
+                $python tuning.py --from games.bin -f own_liberties -f opp_liberties -f own_area3 \\
+                    --compare heuristics_liberties_deep
+        """)
+    )
+    parser.add_argument('-f', '--feature', action='append', dest='features',
+                        help="Feature to weigh; repeat the flag (default: {}).".format(", ".join(TUNING_FEATURES)))
+    parser.add_argument('--games', type=int, default=1000, help="Number of games to play or read.")
+    parser.add_argument('--from', action='append', dest='games_files', metavar='FILE',
+                        help="Read games from a record file (run_match.py --record) instead of self-play.")
+    parser.add_argument('--record', type=str, default=None, metavar='FILE',
+                        help="Append the self-play games to FILE.")
+    parser.add_argument('-p', '--processes', type=int, default=1)
+    parser.add_argument('-d', '--depth', type=int, default=SELF_PLAY_DEPTH, help="Self-play search depth.")
+    parser.add_argument('--random_plies', type=int, default=RANDOM_PLIES,
+                        help="Random moves at the start of each self-play game.")
+    parser.add_argument('-e', '--heuristic', type=str, default="heuristics_liberties",
+                        help="Heuristic of the self-play agents.")
+    parser.add_argument('--l2', type=float, default=1e-4, help="L2 penalty on the weights.")
+    parser.add_argument('--compare', action='append', metavar='HEURISTIC',
+                        help="Heuristic name or expression whose loss to report; repeat the flag.")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    main(parser.parse_args())